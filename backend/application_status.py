@@ -1,60 +1,208 @@
 """
 Module: application_status
 This module provides functions related to application status.
+
+Applications are looked up in batches: any number of application ids and/or user
+ids, optionally narrowed to some statuses, in one query backed by the primary key
+and the (user_id, status) index, paged by application_id.
 """
 
+import json
 import sqlite3
 from flask import request, jsonify
+from utils import connect_to_database
+from auth import require_identity
+from catalogue import parse_limit, encode_cursor, decode_cursor
+
+APPLICATION_COLUMNS = (
+    "application_id", "user_id", "pet_name", "location", "submission_date", "status",
+)
+DEFAULT_PAGE_SIZE = 100
+MAX_BATCH_IDS = 5000
+
+
+def parse_id_list(values, field):
+    """
+    Parses ids given as repeated values, comma-separated strings or a JSON list.
+
+    :raises ValueError: If an id is not an integer or there are too many.
+    """
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        values = [values]
+    ids = []
+    for value in values:
+        parts = value.split(",") if isinstance(value, str) else [value]
+        for part in parts:
+            if isinstance(part, str) and not part.strip():
+                continue
+            if isinstance(part, bool):
+                raise ValueError(f"{field} must be integers")
+            try:
+                ids.append(int(part))
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"{field} must be integers") from exc
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} {field} can be requested at once")
+    return ids
+
+
+def parse_status_list(values):
+    """Parses statuses given as repeated values, comma-separated strings or a JSON list."""
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        values = [values]
+    return [part.strip() for value in values for part in str(value).split(",") if part.strip()]
+
+
+def fetch_applications(cursor, application_ids, user_ids, statuses, limit, after=0, owner_id=None):
+    """
+    Fetches the applications matching any of the ids, oldest first.
+
+    Id lists are bound as one JSON array each, so the statement stays the same
+    whatever their length. The application ids and each user's applications are
+    looked up separately, the latter through `idx_applications_user` from the
+    page cursor on, and their UNION is then read by primary key; an OR of the two
+    lookups would make SQLite scan the table.
+
+    :param owner_id: If given, only applications of this user are returned.
+    :return: A tuple of (applications, next_cursor).
+    """
+    lookups = []
+    binds = []
+    if application_ids:
+        lookups.append("SELECT value FROM json_each(?)")
+        binds.append(json.dumps(application_ids))
+    if user_ids:
+        lookups.append(
+            "SELECT application_id FROM adoption_applications "
+            "WHERE user_id IN (SELECT value FROM json_each(?)) AND application_id > ?"
+        )
+        binds.extend([json.dumps(user_ids), after])
+
+    where = [f"application_id IN ({' UNION '.join(lookups)})", "application_id > ?"]
+    binds.append(after)
+    if owner_id is not None:
+        where.append("user_id = ?")
+        binds.append(owner_id)
+    if statuses:
+        where.append("status IN (SELECT value FROM json_each(?))")
+        binds.append(json.dumps(statuses))
+    binds.append(limit + 1)  # One extra row tells whether another page exists
+
+    cursor.execute(
+        f'''
+        SELECT {", ".join(APPLICATION_COLUMNS)} FROM adoption_applications
+        WHERE {" AND ".join(where)}
+        ORDER BY application_id
+        LIMIT ?
+        ''',
+        binds
+    )
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("applications", [rows[-1]["application_id"]])
+    applications = [{column: row[column] for column in APPLICATION_COLUMNS} for row in rows]
+    return applications, next_cursor
+
+
+def lookup_applications(application_ids, user_ids, statuses, limit, token):
+    """Scopes the lookup to the caller, runs it and builds the response."""
+    # A user's token limits them to their own applications; admins see all
+    owner_id = None
+    identity = require_identity()
+    if identity is not None and identity["role"] != "admin":
+        if any(user_id != identity["uid"] for user_id in user_ids):
+            return jsonify({"message": "Not allowed to view this user's applications"}), 403
+        owner_id = identity["uid"]
+        if not application_ids:
+            user_ids = [owner_id]
+
+    if not application_ids and not user_ids:
+        return jsonify({"message": "Application ID or User ID is required"}), 400
+
+    try:
+        after = decode_cursor(token, "applications", 1)[0] if token else 0
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        _, cursor = connect_to_database()
+        applications, next_cursor = fetch_applications(
+            cursor, application_ids, user_ids, statuses,
+            limit or DEFAULT_PAGE_SIZE, after, owner_id
+        )
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
 
-DATABASE = 'database.db'
+    return jsonify({"applications": applications, "next_cursor": next_cursor}), 200
 
-def get_db_connection():
-    """Establishes a database connection and returns the connection object."""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # Allows us to access columns by name
-    return conn
 
 def get_application_status():
     """
-    Retrieves the status of an application from the database based on application_id or user_id.
+    Retrieves the applications matching any of the given application or user ids.
 
     ---
     tags:
       - Application Status
     parameters:
       - name: application_id
-        in: body
+        in: query
         required: false
-        description: The ID of the application to retrieve the status for.
-        schema:
-          type: integer
+        description: Application ids, repeated or comma-separated.
+        type: string
       - name: user_id
-        in: body
+        in: query
         required: false
-        description: The ID of the user whose application status to retrieve.
-        schema:
-          type: integer
+        description: User ids whose applications to retrieve, repeated or comma-separated.
+        type: string
+      - name: status
+        in: query
+        required: false
+        description: Only return applications with these statuses (e.g. "pending,approved").
+        type: string
+      - name: limit
+        in: query
+        required: false
+        description: Page size, 1 to 100 (default 100).
+        type: integer
+      - name: cursor
+        in: query
+        required: false
+        description: The `next_cursor` returned by the previous page.
+        type: string
     responses:
       200:
-        description: Successfully retrieved the application status.
+        description: The matching applications, oldest first.
         schema:
           type: object
           properties:
-            application_id:
-              type: integer
-            user_id:
-              type: integer
-            pet_id:
-              type: integer
-            submission_date:
-              type: string
-              format: date
-            status:
-              type: string
-              description: The current status of the application (e.g., "pending", "approved").
-            decision_by_admin:
+            applications:
+              type: array
+              items:
+                type: object
+                properties:
+                  application_id:
+                    type: integer
+                  user_id:
+                    type: integer
+                  pet_name:
+                    type: string
+                  location:
+                    type: string
+                  submission_date:
+                    type: string
+                    format: date
+                  status:
+                    type: string
+                    description: The current status of the application (e.g., "pending", "approved").
+            next_cursor:
               type: string
-              description: The decision made by the admin regarding the application.
       400:
         description: Bad request, application_id or user_id is required.
         schema:
@@ -63,48 +211,36 @@ def get_application_status():
             message:
               type: string
               example: "Application ID or User ID is required"
-      404:
-        description: Application not found based on the provided ID.
-        schema:
-          type: object
-          properties:
-            message:
-              type: string
-              example: "Application not found"
+      403:
+        description: The token's user may not view another user's applications.
     """
-    # Retrieve application ID or user ID from the request (assuming either can be provided)
-    data = request.get_json()
-    application_id = data.get("application_id")
-    user_id = data.get("user_id")
+    args = request.args
+    try:
+        application_ids = parse_id_list(args.getlist("application_id"), "application_id")
+        user_ids = parse_id_list(args.getlist("user_id"), "user_id")
+        statuses = parse_status_list(args.getlist("status"))
+        limit = parse_limit(args.get("limit"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return lookup_applications(application_ids, user_ids, statuses, limit, args.get("cursor"))
 
-    if not application_id and not user_id:
-        return jsonify({"message": "Application ID or User ID is required"}), 400
 
-    # Query the database for the application status
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    if application_id:
-        cursor.execute(
-            'SELECT * FROM adoption_applications WHERE application_id = ?', (application_id,)
-        )
-    else:
-        cursor.execute(
-            'SELECT * FROM adoption_applications WHERE user_id = ?', (user_id,)
-        )
+def get_application_status_batch():
+    """
+    Retrieves applications for id lists too long for a query string.
 
-    application = cursor.fetchone()
-    conn.close()
-
-    if application:
-        status = {
-            "application_id": application["application_id"],
-            "user_id": application["user_id"],
-            "pet_id": application["pet_id"],
-            "submission_date": application["submission_date"],
-            "status": application["status"],
-            "decision_by_admin": application["decision_by_admin"]
-        }
-        return jsonify(status), 200
-
-    return jsonify({"message": "Application not found"}), 404
+    The JSON body takes `application_ids` and/or `user_ids` (lists of integers, at
+    most 5000 each), and optional `status` (a list), `limit` and `cursor`; the
+    response is the same as GET /status.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "A JSON object body is required"}), 400
+    try:
+        application_ids = parse_id_list(data.get("application_ids"), "application_ids")
+        user_ids = parse_id_list(data.get("user_ids"), "user_ids")
+        statuses = parse_status_list(data.get("status"))
+        limit = parse_limit(data.get("limit"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return lookup_applications(application_ids, user_ids, statuses, limit, data.get("cursor"))
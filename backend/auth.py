@@ -0,0 +1,173 @@
+"""
+Module: auth
+This module issues and verifies signed session tokens.
+
+`login_user` hands out a token signed with itsdangerous that carries the user's
+id, role and a unique token id. Clients send it back as `Authorization: Bearer
+<token>`, and it is checked in memory: no database round-trip per request.
+`POST /logout` revokes a token by adding its id to an in-memory denylist until
+it would have expired anyway.
+
+The signing key comes from SECRET_KEY. When several worker processes serve the
+app they must share that key, and revocations only reach the process that
+handled the logout, so keep TOKEN_MAX_AGE short.
+
+The admin role is granted server-side: a user is an admin when their username is
+listed in the `admins` table (`python database.py grant-admin <username>`), never
+because of anything chosen at signup. Admin routes always require a valid admin
+token. Other requests without a token still fall back to the legacy email
+parameters unless AUTH_REQUIRED=1.
+"""
+
+import functools
+import os
+import secrets
+import threading
+import time
+from flask import g, request, jsonify
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+SECRET_KEY = os.environ.get("SECRET_KEY") or secrets.token_hex(32)
+TOKEN_MAX_AGE = int(os.environ.get("TOKEN_MAX_AGE", "3600"))
+AUTH_REQUIRED = os.environ.get("AUTH_REQUIRED", "0") == "1"
+
+serializer = URLSafeTimedSerializer(SECRET_KEY, salt="session-token")
+
+
+class AuthError(Exception):
+    """Raised when a request carries a missing, invalid or insufficient token."""
+
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def handle_auth_error(error):
+    """Flask error handler turning an AuthError into a JSON response."""
+    response = jsonify({"message": error.message})
+    if error.status == 401:
+        response.headers["WWW-Authenticate"] = "Bearer"
+    return response, error.status
+
+
+class TokenDenylist:
+    """Thread-safe set of revoked token ids, each kept only until the token expires."""
+
+    def __init__(self):
+        self._expiries = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id, expires_at):
+        now = time.time()
+        with self._lock:
+            self._expiries = {
+                jti: expiry for jti, expiry in self._expiries.items() if expiry > now
+            }
+            self._expiries[token_id] = expires_at
+
+    def is_revoked(self, token_id):
+        with self._lock:
+            return token_id in self._expiries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._expiries)
+
+
+denylist = TokenDenylist()
+
+
+def role_for_user(cursor, username):
+    """Admins are the users whose username is listed in the `admins` table."""
+    cursor.execute('SELECT 1 FROM admins WHERE username = ?', (username,))
+    return "admin" if cursor.fetchone() else "user"
+
+
+def issue_token(user_id, role):
+    """Returns a signed token for the user, valid for TOKEN_MAX_AGE seconds."""
+    return serializer.dumps({"uid": user_id, "role": role, "jti": secrets.token_hex(8)})
+
+
+def verify_token(token):
+    """
+    Checks a token's signature, age and revocation.
+
+    :return: The claims dict with `uid`, `role`, `jti` and `exp`.
+    :raises AuthError: If the token is invalid, expired or revoked.
+    """
+    try:
+        claims, signed_at = serializer.loads(token, max_age=TOKEN_MAX_AGE, return_timestamp=True)
+    except SignatureExpired as exc:
+        raise AuthError("Token expired") from exc
+    except BadSignature as exc:
+        raise AuthError("Invalid token") from exc
+    if denylist.is_revoked(claims["jti"]):
+        raise AuthError("Token revoked")
+    return {**claims, "exp": signed_at.timestamp() + TOKEN_MAX_AGE}
+
+
+def current_identity():
+    """
+    Returns the claims of the request's bearer token, or None without one.
+
+    :raises AuthError: If an Authorization header is present but not a valid token.
+    """
+    if "identity" not in g:
+        header = request.headers.get("Authorization")
+        if header is None:
+            identity = None
+        else:
+            scheme, _, token = header.partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                raise AuthError("Authorization must be a Bearer token")
+            identity = verify_token(token.strip())
+        g.identity = identity
+    return g.identity
+
+
+def require_identity():
+    """
+    Returns the request's identity, insisting on one when AUTH_REQUIRED is set.
+
+    :return: The claims dict, or None for legacy unauthenticated requests.
+    """
+    identity = current_identity()
+    if identity is None and AUTH_REQUIRED:
+        raise AuthError("Authentication required")
+    return identity
+
+
+def admin_required(view):
+    """Decorator for admin-only routes: requires a valid token carrying the admin role."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        identity = current_identity()
+        if identity is None:
+            raise AuthError("Authentication required")
+        if identity["role"] != "admin":
+            raise AuthError("Admin access required", status=403)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def logout_user():
+    """
+    Revokes the bearer token sent with the request.
+
+    ---
+    tags:
+      - User
+    responses:
+      200:
+        description: Token revoked.
+      401:
+        description: Missing or invalid token.
+    """
+    identity = current_identity()
+    if identity is None:
+        raise AuthError("Authentication required")
+    denylist.revoke(identity["jti"], identity["exp"])
+    return jsonify({"message": "Logged out"}), 200
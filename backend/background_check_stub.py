@@ -0,0 +1,89 @@
+"""
+Module: background_check_stub
+This module is a local stand-in for the background check provider, for development and tests.
+
+It implements the provider API described in `background_checks.py`: a check fails
+when the email's local part contains "fail" and passes otherwise. Setting
+`failures_before_success` makes the next requests answer 503 so retries can be
+exercised, and `delay` slows every answer down like the real service.
+
+Usage:
+    python background_check_stub.py [port]    # Defaults to 8081
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubProvider(ThreadingHTTPServer):
+    """An HTTP server answering background check requests."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0, failures_before_success=0):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.delay = delay
+        self.failures_before_success = failures_before_success
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/check"
+
+    def start(self):
+        """Serves in a background thread and returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Handles POST /check."""
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        if self.path != "/check":
+            self._reply(404, {"message": "Not found"})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server._lock:  # pylint: disable=protected-access
+            server.requests.append(body)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            unavailable = server.failures_before_success > 0
+            if unavailable:
+                server.failures_before_success -= 1
+        time.sleep(server.delay)
+        with server._lock:  # pylint: disable=protected-access
+            server.in_flight -= 1
+        if unavailable:
+            self._reply(503, {"message": "Try again later"})
+            return
+        local_part = str(body.get("email", "")).split("@")[0]
+        self._reply(200, {"passed": "fail" not in local_part})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass  # Keep test output quiet
+
+
+if __name__ == "__main__":
+    stub = StubProvider(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8081)
+    print(f"Stub background check provider listening on {stub.url}")
+    stub.serve_forever()
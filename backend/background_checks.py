@@ -0,0 +1,69 @@
+"""
+Module: background_checks
+This module runs adopter background checks as jobs on the `jobs` queue.
+
+`register_user` enqueues a check in the same transaction as the new user, whose
+`background_check_status` starts as 'pending'. A job worker then calls the
+screening provider at BACKGROUND_CHECK_URL and records 'passed' or 'failed'; if
+the provider stays unreachable through every retry, the status becomes 'error'.
+
+The provider receives `{"user_id", "username", "email"}` as JSON and answers with
+`{"passed": true|false}`. `background_check_stub.py` implements the same API for
+development and tests.
+"""
+
+import logging
+import os
+import requests
+
+from jobs import register_handler, enqueue, PermanentJobError
+
+logger = logging.getLogger("background_checks")
+
+JOB_KIND = "background_check"
+BACKGROUND_CHECK_URL = os.environ.get("BACKGROUND_CHECK_URL", "http://localhost:8081/check")
+REQUEST_TIMEOUT = float(os.environ.get("BACKGROUND_CHECK_TIMEOUT", "30"))
+# Checks running at once per worker process, to stay within the provider's limits
+CONCURRENCY = int(os.environ.get("BACKGROUND_CHECK_CONCURRENCY", "2"))
+
+
+def enqueue_background_check(conn, user_id):
+    """Queues a background check for a user. Does not commit."""
+    return enqueue(conn, JOB_KIND, {"user_id": user_id})
+
+
+def set_status(conn, user_id, status):
+    conn.execute(
+        'UPDATE users SET background_check_status = ? WHERE user_id = ?', (status, user_id)
+    )
+
+
+def give_up(conn, payload, error):
+    """Marks the check as errored once the job has exhausted its retries."""
+    logger.error("Background check for user %s failed: %r", payload["user_id"], error)
+    set_status(conn, payload["user_id"], "error")
+
+
+@register_handler(JOB_KIND, concurrency=CONCURRENCY, on_give_up=give_up)
+def run_background_check(conn, payload):
+    """
+    Asks the provider to screen a user and stores the verdict.
+
+    Network errors and 5xx/429 answers raise, so the job is retried; other 4xx
+    answers mean the request itself is wrong and fail the job at once.
+    """
+    user = conn.execute(
+        'SELECT user_id, username, email FROM users WHERE user_id = ?', (payload["user_id"],)
+    ).fetchone()
+    if user is None:
+        return  # The user was deleted meanwhile; nothing to check
+
+    response = requests.post(
+        BACKGROUND_CHECK_URL,
+        json={"user_id": user["user_id"], "username": user["username"], "email": user["email"]},
+        timeout=REQUEST_TIMEOUT
+    )
+    if 400 <= response.status_code < 500 and response.status_code != 429:
+        raise PermanentJobError(f"Provider rejected the request: {response.status_code}")
+    response.raise_for_status()
+    set_status(conn, user["user_id"], "passed" if response.json().get("passed") else "failed")
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the backend. Run them from the /backend folder, e.g.
+`python -m benchmarks.login_throughput`.
+"""
@@ -0,0 +1,230 @@
+"""
+Module: benchmarks.datagen
+This module builds deterministic synthetic databases for benchmarks.
+
+Every table created by the migrations is filled: admins, users, pets, favorites,
+questionnaires and adoption_applications. The same seed and sizes always produce
+the same rows, so results from different commits are comparable. Every user's
+password is BENCH_PASSWORD and their email is `user<N>@example.com` (N from 1).
+The ADMINS accounts `admin<N>` are listed in `admins` and added to `users` after
+everyone else, so they can log in without shifting the regular users' ids.
+
+The sizes used are recorded in a `bench_meta` table; `ensure_dataset` reuses an
+existing file when they match, since building the large preset takes a while.
+
+Usage:
+    python -m benchmarks.datagen --scale large --output bench/database.db
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# pylint: disable=wrong-import-position
+from connection_pool import create_connection
+from geo import GAZETTEER_PATH
+from migrations import migrate
+from passwords import compute_hash
+
+BENCH_PASSWORD = "bench-password"
+DEFAULT_SEED = 42
+ADMINS = 3
+
+SCALES = {
+    "tiny": {"pets": 200, "users": 50, "favorites": 1000, "applications": 200},
+    "small": {"pets": 10000, "users": 2000, "favorites": 50000, "applications": 10000},
+    "large": {"pets": 100000, "users": 20000, "favorites": 1000000, "applications": 100000},
+}
+
+PET_TYPES = {
+    "dog": ["Lab", "Beagle", "German Shepherd", "Golden Retriever", "Poodle", "Bulldog", "Boxer"],
+    "cat": ["Tabby", "Persian", "Siamese", "Maine Coon", "Ragdoll", "Sphynx"],
+    "rabbit": ["Lop", "Rex", "Lionhead"],
+    "bird": ["Parakeet", "Cockatiel", "Canary"],
+}
+NAMES = ["Jay", "Bella", "Max", "Luna", "Rocky", "Mittens", "Daisy", "Charlie", "Milo", "Coco",
+         "Buddy", "Lucy", "Oliver", "Nala", "Toby", "Rosie", "Leo", "Zoe", "Finn", "Pepper"]
+ADJECTIVES = ["Playful", "Quiet", "Friendly", "Energetic", "Gentle", "Curious", "Shy", "Loyal"]
+HABITS = ["loves cuddles", "enjoys long walks", "likes to climb", "naps all day",
+          "gets along with kids", "is house trained", "needs a yard", "loves treats"]
+PET_STATUSES = ["available"] * 8 + ["pending", "adopted"]
+APPLICATION_STATUSES = ["pending"] * 6 + ["approved"] * 2 + ["rejected"] * 2
+BATCH_SIZE = 10000
+
+
+def load_places():
+    """Returns the gazetteer place names, so generated pets can be found by /pets/nearby."""
+    with open(GAZETTEER_PATH, encoding="utf-8") as handle:
+        return [line.rsplit(",", 2)[0].strip('"') for line in handle.readlines()[1:] if line.strip()]
+
+
+def generate_pets(rng, count, places):
+    """Yields pet rows; names carry a sequence number so (name, location) stays unique."""
+    for number in range(1, count + 1):
+        pet_type = rng.choice(list(PET_TYPES))
+        breed = rng.choice(PET_TYPES[pet_type])
+        name = f"{rng.choice(NAMES)}{number}"
+        description = f"{rng.choice(ADJECTIVES)} {breed.lower()} who {rng.choice(HABITS)}"
+        yield (
+            name, str(rng.randint(0, 15)), description, breed,
+            f"/{pet_type}.jpg", rng.choice(PET_STATUSES), pet_type, rng.choice(places)
+        )
+
+
+def _insert_batches(conn, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            conn.executemany(sql, batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+
+
+def generate(path, pets, users, favorites, applications, seed=DEFAULT_SEED):
+    """
+    Creates a database at `path` (replacing any file there) and fills every table.
+
+    :return: The sizes and seed used, as stored in `bench_meta`.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    rng = random.Random(seed)
+    places = load_places()
+    password_hash = compute_hash(BENCH_PASSWORD)  # Hashing once keeps generation fast
+    meta = {"seed": seed, "pets": pets, "users": users, "favorites": favorites,
+            "applications": applications, "admins": ADMINS}
+
+    conn = create_connection(path)
+    try:
+        migrate(conn)
+        conn.execute("PRAGMA synchronous = OFF")  # A lost benchmark database is simply rebuilt
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO admins (username, password) VALUES (?, ?)',
+            [(f"admin{number}", password_hash) for number in range(1, ADMINS + 1)]
+        )
+        _insert_batches(
+            conn,
+            '''
+            INSERT INTO users (username, password, email, phone_number, address,
+                               background_check_status)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''',
+            (
+                (f"user{number}", password_hash, f"user{number}@example.com",
+                 f"555-{number % 10000:04d}", f"{number} Main St, {rng.choice(places)}",
+                 rng.choice(["passed", "passed", "passed", "pending", "failed"]))
+                for number in range(1, users + 1)
+            )
+        )
+
+        pet_keys = []
+        def remember(rows):
+            for row in rows:
+                pet_keys.append((row[0], row[7]))
+                yield row
+        _insert_batches(
+            conn,
+            '''
+            INSERT INTO pets (name, age, description, breed, picture_url, status, type, location)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            remember(generate_pets(rng, pets, places))
+        )
+
+        # Spread favorites evenly, each user picking distinct pets
+        per_user, remainder = divmod(min(favorites, users * pets), users) if users else (0, 0)
+        def favorite_rows():
+            for user_id in range(1, users + 1):
+                count = per_user + (1 if user_id <= remainder else 0)
+                for index in rng.sample(range(pets), count):
+                    yield (user_id, *pet_keys[index])
+        _insert_batches(
+            conn,
+            'INSERT INTO favorites (user_id, pet_name, pet_location) VALUES (?, ?, ?)',
+            favorite_rows()
+        )
+
+        _insert_batches(
+            conn,
+            '''
+            INSERT INTO adoption_applications (user_id, pet_name, location, submission_date, status)
+            VALUES (?, ?, ?, ?, ?)
+            ''',
+            (
+                (rng.randint(1, users), *rng.choice(pet_keys),
+                 f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                 rng.choice(APPLICATION_STATUSES))
+                for _ in range(applications if users and pets else 0)
+            )
+        )
+        _insert_batches(
+            conn,
+            'INSERT INTO questionnaires (user_id, submission_date, status) VALUES (?, ?, ?)',
+            (
+                (user_id, f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                 rng.choice(["pending", "complete"]))
+                for user_id in range(1, users + 1, 2)
+            )
+        )
+        conn.executemany(
+            'INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
+            [(f"admin{number}", password_hash, f"admin{number}@example.com") for number in range(1, ADMINS + 1)]
+        )
+
+        conn.execute('CREATE TABLE bench_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        conn.execute("INSERT INTO bench_meta VALUES ('dataset', ?)", (json.dumps(meta, sort_keys=True),))
+        conn.commit()
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    return meta
+
+
+def read_meta(path):
+    """Returns the parameters a benchmark database was built with, or None."""
+    if not os.path.exists(path):
+        return None
+    conn = create_connection(path)
+    try:
+        row = conn.execute("SELECT value FROM bench_meta WHERE key = 'dataset'").fetchone()
+    except Exception:  # pylint: disable=broad-except
+        return None
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def ensure_dataset(path, scale="small", seed=DEFAULT_SEED):
+    """Builds the dataset at `path` unless an identical one is already there."""
+    meta = {"seed": seed, "admins": ADMINS, **SCALES[scale]}
+    if read_meta(path) == meta:
+        return meta
+    return generate(path, seed=seed, **SCALES[scale])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a synthetic benchmark database.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default=os.path.join("bench", "database.db"))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    meta = generate(args.output, seed=args.seed, **SCALES[args.scale])
+    print(f"Built {args.output} in {time.perf_counter() - start:.1f}s: {json.dumps(meta)}")
+
+
+if __name__ == "__main__":
+    main()
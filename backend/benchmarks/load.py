@@ -0,0 +1,381 @@
+"""
+Module: benchmarks.load
+This module drives mixed, concurrent traffic against a running server.
+
+Virtual users, each an asyncio task with its own keep-alive HTTP/1.1 connection,
+pick actions from a weighted traffic mix:
+
+    browse    GET /pets pages, sometimes following next_cursor
+    search    GET /pets/search
+    favorite  POST then DELETE /favorites with the user's session token
+    login     POST /login
+    edit      PUT /pets as an admin, rewriting a pet's description
+
+The run goes through one stage per concurrency level given with --stages, so the
+saturation point of a single server process shows up as the stage where throughput
+stops growing while p99 latency climbs. For every stage it reports p50/p95/p99
+latency and error counts per route, with "database is locked" failures counted
+separately, plus throughput per interval. The report is also written as JSON (see
+results.py).
+
+The target is --url, or with --serve a `main.py` process started on a synthetic
+dataset from benchmarks.datagen, whose users all share BENCH_PASSWORD.
+
+Usage:
+    python -m benchmarks.load --serve --scale small --stages 1,8,32,64 --duration 10
+    python -m benchmarks.load --url http://127.0.0.1:5000 --mix browse=70,favorite=20,edit=10
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.datagen import BENCH_PASSWORD, DEFAULT_SEED, SCALES, ensure_dataset, PET_TYPES
+from benchmarks.results import summarize_latencies, write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = {"browse": 60, "search": 10, "favorite": 15, "login": 5, "edit": 10}
+ADMIN = {"username": "admin1", "password": BENCH_PASSWORD}  # Created by datagen
+REQUEST_TIMEOUT = 30.0
+LOCKED_MARKER = b"database is locked"
+
+
+class HTTPClient:
+    """A minimal keep-alive HTTP/1.1 client for JSON requests on asyncio streams."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        """
+        Sends one request, reconnecting once if a kept-alive connection was closed.
+
+        :return: A tuple of (status, body bytes).
+        """
+        for attempt in range(2):
+            reused = self._writer is not None
+            if not reused:
+                await self._connect()
+            try:
+                return await self._exchange(method, path, body, token)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt or not reused:
+                    raise
+        raise ConnectionError("unreachable")
+
+    async def _exchange(self, method, path, body, token):
+        payload = b"" if body is None else json.dumps(body).encode()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(payload)}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        if token:
+            lines.append(f"Authorization: Bearer {token}")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        version, status = status_line.split(b" ", 2)[:2]
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b"".join(chunks)
+        elif "content-length" in headers:
+            data = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await self._reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close" or version == b"HTTP/1.0":
+            self.close()
+        return int(status), data
+
+
+class Recorder:
+    """Collects latencies, errors and a per-interval timeline for one stage."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.defaultdict(collections.Counter)
+        self.timeline = collections.defaultdict(lambda: {"requests": 0, "errors": 0})
+
+    def record(self, route, latency, error=None):
+        self.latencies[route].append(latency)
+        bucket = self.timeline[int((time.perf_counter() - self.start) // self.interval)]
+        bucket["requests"] += 1
+        if error:
+            self.errors[route][error] += 1
+            bucket["errors"] += 1
+
+
+def classify(status, data, expected):
+    """Returns an error label for an unexpected response, or None."""
+    if status in expected:
+        return None
+    if LOCKED_MARKER in data:
+        return "database_locked"
+    return f"http_{status}"
+
+
+async def timed(client, recorder, route, method, path, body=None, token=None, expected=(200,)):
+    """Issues a request, records it under `route` and returns (status, body) or None."""
+    start = time.perf_counter()
+    try:
+        status, data = await asyncio.wait_for(client.request(method, path, body, token), REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        client.close()
+        recorder.record(route, time.perf_counter() - start, "timeout")
+        return None
+    except OSError:
+        client.close()
+        recorder.record(route, time.perf_counter() - start, "connection_error")
+        return None
+    recorder.record(route, time.perf_counter() - start, classify(status, data, expected))
+    return status, data
+
+
+class VirtualUser:
+    """One simulated visitor with its own connection, session and random stream."""
+
+    def __init__(self, index, context):
+        self.context = context
+        self.rng = random.Random(f"{context['seed']}-{index}")
+        self.client = HTTPClient(context["host"], context["port"])
+        self.username = f"user{self.rng.randint(1, context['users'])}"
+        self.token = None
+
+    async def login(self, recorder):
+        result = await timed(self.client, recorder, "POST /login", "POST", "/login",
+                             {"username": self.username, "password": BENCH_PASSWORD})
+        if result and result[0] == 200:
+            self.token = json.loads(result[1])["token"]
+
+    async def browse(self, recorder):
+        params = {"limit": 20}
+        if self.rng.random() < 0.5:
+            params["type"] = self.rng.choice(list(PET_TYPES))
+        result = await timed(self.client, recorder, "GET /pets", "GET", "/pets?" + urlencode(params))
+        if result and result[0] == 200 and self.rng.random() < 0.3:
+            next_cursor = json.loads(result[1]).get("next_cursor")
+            if next_cursor:
+                params["cursor"] = next_cursor
+                await timed(self.client, recorder, "GET /pets", "GET", "/pets?" + urlencode(params))
+
+    async def search(self, recorder):
+        term = self.rng.choice([breed for breeds in PET_TYPES.values() for breed in breeds])
+        await timed(self.client, recorder, "GET /pets/search", "GET",
+                    "/pets/search?" + urlencode({"q": term.split()[0], "limit": 20}))
+
+    async def favorite(self, recorder):
+        if self.token is None:
+            await self.login(recorder)
+            if self.token is None:
+                return
+        pet = self.rng.choice(self.context["pets"])
+        body = {"pet_name": pet["name"]}
+        await timed(self.client, recorder, "POST /favorites", "POST", "/favorites", body,
+                    self.token, expected=(200, 409))
+        await timed(self.client, recorder, "DELETE /favorites", "DELETE", "/favorites", body,
+                    self.token, expected=(200, 404))
+
+    async def edit(self, recorder):
+        pet = dict(self.rng.choice(self.context["pets"]))
+        pet["description"] = f"Edited by load test {self.rng.randint(0, 10 ** 6)}"
+        await timed(self.client, recorder, "PUT /pets", "PUT", "/pets", pet, self.context["admin_token"])
+
+    async def run(self, recorder, deadline, actions, weights, think_time):
+        try:
+            while time.perf_counter() < deadline:
+                action = self.rng.choices(actions, weights)[0]
+                await getattr(self, action)(recorder)
+                if think_time:
+                    await asyncio.sleep(self.rng.expovariate(1 / think_time))
+        finally:
+            self.client.close()
+
+
+async def prepare(context):
+    """Fetches pets to act on and an admin session token."""
+    client = HTTPClient(context["host"], context["port"])
+    try:
+        _, data = await client.request("GET", "/pets?limit=100")
+        context["pets"] = [
+            {key: pet[key] for key in ("name", "location", "age", "breed", "picture_url", "status", "type")}
+            | {"description": "Load test pet"}
+            for pet in json.loads(data)["pets"]
+        ]
+        status, data = await client.request("POST", "/login", ADMIN)
+        context["admin_token"] = json.loads(data)["token"] if status == 200 else None
+    finally:
+        client.close()
+
+
+async def run_stage(context, concurrency, duration, mix, think_time, interval):
+    """Runs `concurrency` virtual users for `duration` seconds and summarizes the stage."""
+    recorder = Recorder(interval)
+    deadline = time.perf_counter() + duration
+    users = [VirtualUser(index, context) for index in range(concurrency)]
+    await asyncio.gather(*(
+        user.run(recorder, deadline, list(mix), list(mix.values()), think_time) for user in users
+    ))
+    elapsed = time.perf_counter() - recorder.start
+
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        errors = recorder.errors[route]
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": sum(errors.values()),
+            "error_rate": round(sum(errors.values()) / len(latencies), 4),
+            "error_kinds": dict(errors),
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "latency_ms": summarize_latencies(latencies),
+        }
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "database_locked": sum(errors["database_locked"] for errors in recorder.errors.values()),
+        "latency_ms": summarize_latencies(
+            [latency for latencies in recorder.latencies.values() for latency in latencies]
+        ),
+        "routes": routes,
+        "timeline": [
+            {"second": round(bucket * interval, 2), **recorder.timeline[bucket]}
+            for bucket in sorted(recorder.timeline)
+        ],
+    }
+
+
+def parse_mix(text):
+    """Parses "browse=60,edit=10" into an action -> weight dict."""
+    mix = {}
+    for part in text.split(","):
+        action, _, weight = part.partition("=")
+        if action not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action {action!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[action] = float(weight or 1)
+    return mix
+
+
+def serve(workdir, port, command=None, env=None):
+    """
+    Starts a server on the dataset in `workdir` and waits until it accepts connections.
+
+    :param command: The server command line; defaults to the `main.py` development server.
+    :param env: Extra environment variables for the server.
+    """
+    process = subprocess.Popen(
+        command or [sys.executable, os.path.join(BACKEND_DIR, "main.py"), "--port", str(port)],
+        cwd=workdir, env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("The server exited during startup")
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The server did not start within 60 seconds")
+
+
+def print_stage(stage):
+    print(f"\nconcurrency {stage['concurrency']}: {stage['throughput_rps']} req/s, "
+          f"p99 {stage['latency_ms']['p99']} ms, database locked {stage['database_locked']}")
+    for route, result in stage["routes"].items():
+        latency = result["latency_ms"]
+        print(f"  {route:<20} {result['requests']:>7} req  p50 {latency['p50']:>9} ms  "
+              f"p95 {latency['p95']:>9} ms  p99 {latency['p99']:>9} ms  errors {result['error_rate']:.2%}")
+    print("  req/interval: " + " ".join(str(bucket["requests"]) for bucket in stage["timeline"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive a mixed concurrent load against the backend.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--serve", action="store_true", help="start main.py on a synthetic dataset")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--stages", default="1,8,32", help="comma-separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per stage")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause between actions (s)")
+    parser.add_argument("--interval", type=float, default=1, help="timeline bucket size (s)")
+    parser.add_argument("--output", help="JSON report path")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    url = urlsplit(args.url)
+    dataset = {"users": SCALES[args.scale]["users"]}
+    process = None
+    if args.serve:
+        workdir = os.path.join(BACKEND_DIR, "bench", args.scale)
+        os.makedirs(workdir, exist_ok=True)
+        dataset = ensure_dataset(os.path.join(workdir, "database.db"), args.scale, args.seed)
+        process = serve(workdir, url.port or 5000)
+
+    context = {"host": url.hostname, "port": url.port or 80, "seed": args.seed, "users": dataset["users"]}
+    stages = []
+    try:
+        asyncio.run(prepare(context))
+        for concurrency in (int(value) for value in args.stages.split(",")):
+            stage = asyncio.run(run_stage(context, concurrency, args.duration, mix,
+                                          args.think_time, args.interval))
+            stages.append(stage)
+            print_stage(stage)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        write_results(args.output, dataset, stages, {"options": {
+            "url": args.url, "mix": mix, "duration": args.duration, "think_time": args.think_time,
+        }})
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
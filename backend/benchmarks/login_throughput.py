@@ -0,0 +1,84 @@
+"""
+Module: benchmarks.login_throughput
+This module measures /login throughput against the size of the password hashing pool.
+
+Each run registers one user in a throwaway database, then fires concurrent logins
+through the Flask test client from a fixed number of request threads while the
+`passwords` pool is sized 0 (inline), 1, 2, 4, ... workers.
+
+Usage:
+    python -m benchmarks.login_throughput [--threads 16] [--logins 200] [--workers 0,1,2,4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(threads, logins, worker_counts):
+    """
+    Runs the benchmark.
+
+    :return: A list of {"workers", "logins", "seconds", "logins_per_second"} dicts.
+    """
+    # The app opens database.db relative to the working directory
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(tempfile.mkdtemp(prefix="login-bench-"))
+    import user
+    from main import app
+    from passwords import PasswordHasher
+
+    credentials = {"username": "bench", "password": "bench-password"}
+    client = app.test_client()
+    client.post('/register', json={**credentials, "email": "bench@example.com"})
+
+    def login(_):
+        response = app.test_client().post('/login', json=credentials)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    results = []
+    for workers in worker_counts:
+        hasher = PasswordHasher(workers=workers, max_pending=logins)
+        user.hasher = hasher
+        try:
+            login(None)  # Start the worker processes outside the timed section
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                start = time.perf_counter()
+                list(executor.map(login, range(logins)))
+                elapsed = time.perf_counter() - start
+        finally:
+            hasher.shutdown()
+        results.append({
+            "workers": workers,
+            "logins": logins,
+            "seconds": round(elapsed, 3),
+            "logins_per_second": round(logins / elapsed, 1),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--logins", type=int, default=200, help="logins per pool size")
+    parser.add_argument("--workers", default="0,1,2,4", help="comma-separated pool sizes")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.threads, args.logins, [int(w) for w in args.workers.split(",")])
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'workers':>8} {'logins/s':>10} {'seconds':>9}")
+    for result in results:
+        print(f"{result['workers']:>8} {result['logins_per_second']:>10} {result['seconds']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Module: benchmarks.results
+This module summarizes latency samples and reads and writes benchmark result files.
+
+Result files are JSON objects with an `environment` block (commit, Python and SQLite
+versions, CPU count), the `dataset` used, and a list of `results`, one per scenario
+and transport, each carrying request and error counts, throughput and latency
+percentiles in milliseconds. `python -m benchmarks.results old.json new.json`
+prints how each scenario moved between two runs.
+"""
+
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+
+
+def percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(seconds):
+    """Turns latency samples in seconds into rounded millisecond statistics."""
+    values = sorted(seconds)
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    to_ms = lambda value: round(value * 1000, 3)  # noqa: E731
+    return {
+        "p50": to_ms(percentile(values, 0.50)),
+        "p95": to_ms(percentile(values, 0.95)),
+        "p99": to_ms(percentile(values, 0.99)),
+        "mean": to_ms(sum(values) / len(values)),
+        "max": to_ms(values[-1]),
+    }
+
+
+def environment():
+    """Describes where the benchmark ran, so results can be matched to commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path, dataset, results, extra=None):
+    """Writes a result file and returns the document."""
+    document = {"environment": environment(), "dataset": dataset, "results": results, **(extra or {})}
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2)
+    return document
+
+
+def compare(old, new):
+    """
+    Pairs up scenarios of two result documents.
+
+    :return: A list of (key, old result, new result) for keys present in both.
+    """
+    key = lambda result: (result["scenario"], result["transport"])  # noqa: E731
+    before = {key(result): result for result in old["results"]}
+    return [(key(result), before[key(result)], result) for result in new["results"] if key(result) in before]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        sys.exit("Usage: python -m benchmarks.results OLD.json NEW.json")
+    with open(argv[0], encoding="utf-8") as old, open(argv[1], encoding="utf-8") as new:
+        pairs = compare(json.load(old), json.load(new))
+    print(f"{'scenario':<28} {'transport':<10} {'p50 ms':>17} {'req/s':>19}")
+    for (scenario, transport), before, after in pairs:
+        p50 = f"{before['latency_ms']['p50']} -> {after['latency_ms']['p50']}"
+        rps = f"{before['throughput_rps']} -> {after['throughput_rps']}"
+        print(f"{scenario:<28} {transport:<10} {p50:>17} {rps:>19}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Module: benchmarks.run
+This module runs per-endpoint latency and throughput scenarios against a synthetic dataset.
+
+Each scenario issues one kind of request with randomized but seeded parameters
+(filters, users, places, search terms). It runs through two transports: the Flask
+test client, which measures the application alone, and a real threaded WSGI server
+on localhost, reached over keep-alive HTTP connections, which adds parsing and
+socket costs. Scenarios marked uncached clear the catalogue cache before every
+request, to measure the queries rather than the cache.
+
+Results are written as JSON (see results.py), by default to
+`bench/results-<commit>.json`, for comparison between commits.
+
+Usage:
+    python -m benchmarks.run --scale small --requests 200 --concurrency 4
+    python -m benchmarks.run --scale large --scenarios catalogue_page,favorites --transport wsgi
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks.datagen import BENCH_PASSWORD, DEFAULT_SEED, SCALES, ensure_dataset, load_places, PET_TYPES
+from benchmarks.results import summarize_latencies, write_results, environment
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Scenario:
+    """One kind of request. `build(rng, dataset)` returns (method, path, json body or None)."""
+
+    def __init__(self, name, build, uncached=False, weight=1.0):
+        self.name = name
+        self.build = build
+        self.uncached = uncached
+        self.weight = weight  # Fraction of --requests to issue, for very slow scenarios
+
+
+def _user(rng, dataset):
+    return rng.randint(1, dataset["users"])
+
+
+PLACES = load_places()
+BREEDS = sorted({breed for breeds in PET_TYPES.values() for breed in breeds})
+
+SCENARIOS = [
+    Scenario("catalogue_page", lambda rng, d: ("GET", "/pets?limit=20", None)),
+    Scenario("catalogue_filtered", lambda rng, d: (
+        "GET", f"/pets?type={rng.choice(list(PET_TYPES))}&min_age={rng.randint(0, 10)}&sort=-age&limit=20", None
+    ), uncached=True),
+    Scenario("catalogue_by_location", lambda rng, d: (
+        "GET", "/pets?" + urlencode({"location": rng.choice(PLACES), "sort": "name", "limit": 50}), None
+    ), uncached=True),
+    Scenario("catalogue_full", lambda rng, d: ("GET", "/pets", None), uncached=True, weight=0.05),
+    Scenario("search", lambda rng, d: (
+        "GET", "/pets/search?" + urlencode({"q": rng.choice(BREEDS).split()[0].lower(), "limit": 20}), None
+    )),
+    Scenario("nearby", lambda rng, d: (
+        "GET", "/pets/nearby?" + urlencode({"city": rng.choice(PLACES), "radius": 25, "limit": 20}), None
+    )),
+    Scenario("favorites", lambda rng, d: (
+        "GET", f"/favorites?email=user{_user(rng, d)}%40example.com&limit=50", None
+    )),
+    Scenario("login", lambda rng, d: (
+        "POST", "/login", {"username": f"user{_user(rng, d)}", "password": BENCH_PASSWORD}
+    ), weight=0.25),
+    Scenario("status", lambda rng, d: (
+        "GET", "/status?user_id=" + ",".join(str(_user(rng, d)) for _ in range(10)), None
+    )),
+    Scenario("status_batch", lambda rng, d: (
+        "POST", "/status/batch", {"user_ids": [_user(rng, d) for _ in range(1000)], "limit": 100}
+    )),
+    Scenario("facets", lambda rng, d: ("GET", "/pets/facets", None)),
+    Scenario("facets_filtered", lambda rng, d: (
+        "GET", f"/pets/facets?type={rng.choice(list(PET_TYPES))}&status=available", None
+    )),
+    Scenario("dashboard", lambda rng, d: (
+        "GET", f"/dashboard?email=user{_user(rng, d)}%40example.com&type={rng.choice(list(PET_TYPES))}", None
+    ), uncached=True),
+]
+
+
+class TestClientTransport:
+    """Calls the app in-process through Flask's test client, one client per thread."""
+
+    name = "test_client"
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class WSGIServerTransport:
+    """Serves the app with a threaded WSGI server and calls it over keep-alive HTTP."""
+
+    name = "wsgi"
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server, WSGIRequestHandler  # pylint: disable=import-outside-toplevel
+
+        class KeepAliveHandler(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+        self.port = self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection("127.0.0.1", self.port)
+            try:
+                payload = None if body is None else json.dumps(body)
+                headers = {} if body is None else {"Content-Type": "application/json"}
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        return None
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_scenario(transport, scenario, dataset, requests, concurrency, seed):
+    """
+    Issues `requests` requests (after a short warm-up) from `concurrency` threads.
+
+    :return: A result dict for the results file.
+    """
+    from catalogue_cache import catalogue_cache  # pylint: disable=import-outside-toplevel
+
+    count = max(1, int(requests * scenario.weight))
+    warmup_rng = random.Random(seed)
+    for _ in range(min(5, count)):
+        transport.request(*scenario.build(warmup_rng, dataset))
+
+    latencies = []
+    errors = []
+    remaining = [count]
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(f"{seed}-{scenario.name}-{index}")
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            request = scenario.build(rng, dataset)
+            if scenario.uncached:
+                catalogue_cache.clear()
+            start = time.perf_counter()
+            try:
+                status = transport.request(*request)
+            except Exception as exc:  # pylint: disable=broad-except
+                status = repr(exc)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status != 200:
+                    errors.append(status)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    return {
+        "scenario": scenario.name,
+        "transport": transport.name,
+        "requests": count,
+        "errors": len(errors),
+        "error_samples": sorted({str(error) for error in errors})[:5],
+        "concurrency": concurrency,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(count / seconds, 1),
+        "latency_ms": summarize_latencies(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run per-endpoint benchmarks on a synthetic dataset.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workdir", help="folder for the dataset (default: bench/<scale>)")
+    parser.add_argument("--transport", default="test_client,wsgi",
+                        help="comma-separated: test_client, wsgi")
+    parser.add_argument("--scenarios", help="comma-separated subset of: "
+                        + ", ".join(scenario.name for scenario in SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads")
+    parser.add_argument("--output", help="result file (default: bench/results-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    bench_dir = os.path.join(BACKEND_DIR, "bench")
+    workdir = os.path.abspath(args.workdir or os.path.join(bench_dir, args.scale))
+    output = os.path.abspath(
+        args.output or os.path.join(bench_dir, f"results-{environment()['commit'] or 'local'}.json")
+    )
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    scenarios = [scenario for scenario in SCENARIOS if selected is None or scenario.name in selected]
+
+    os.makedirs(workdir, exist_ok=True)
+    print(f"Preparing the {args.scale} dataset in {workdir}...")
+    dataset = ensure_dataset(os.path.join(workdir, "database.db"), args.scale, args.seed)
+
+    # The app opens database.db relative to the working directory
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    from main import app  # pylint: disable=import-outside-toplevel
+
+    transports = {"test_client": TestClientTransport, "wsgi": WSGIServerTransport}
+    results = []
+    for transport_name in args.transport.split(","):
+        transport = transports[transport_name](app)
+        try:
+            for scenario in scenarios:
+                result = run_scenario(transport, scenario, dataset, args.requests,
+                                      args.concurrency, args.seed)
+                results.append(result)
+                latency = result["latency_ms"]
+                print(f"{transport.name:<12} {scenario.name:<24} {result['throughput_rps']:>9} req/s  "
+                      f"p50 {latency['p50']:>9} ms  p99 {latency['p99']:>9} ms  errors {result['errors']}")
+        finally:
+            transport.close()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    write_results(output, dataset, results, {"options": {
+        "requests": args.requests, "concurrency": args.concurrency, "scale": args.scale,
+    }})
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Module: benchmarks.scaling
+This module measures how throughput scales with the number of gunicorn worker processes.
+
+For each worker count it starts `gunicorn -c gunicorn.conf.py wsgi:app` on a
+synthetic dataset, drives it with the load driver (benchmarks.load) at a fixed
+concurrency and traffic mix, and stops it gracefully. Throughput can only grow with
+workers while there are idle CPUs; the CPU count is recorded with the results.
+
+Usage:
+    python -m benchmarks.scaling --scale small --workers 1,2,4,8 --concurrency 64 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+
+from benchmarks import load
+from benchmarks.datagen import DEFAULT_SEED, SCALES, ensure_dataset
+from benchmarks.results import environment, write_results
+
+BACKEND_DIR = load.BACKEND_DIR
+READ_MIX = "browse=70,search=20,favorite=10"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def gunicorn_command(port, workers, threads):
+    return [
+        sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+        "--pythonpath", BACKEND_DIR, "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers), "--threads", str(threads), "wsgi:app",
+    ]
+
+
+def measure(workdir, dataset, workers, threads, concurrency, duration, mix, seed):
+    """Serves the dataset with `workers` processes and returns the load stage summary."""
+    port = free_port()
+    process = load.serve(workdir, port, gunicorn_command(port, workers, threads),
+                         env={"RUN_JOBS": "0", "PORT": str(port)})
+    try:
+        context = {"host": "127.0.0.1", "port": port, "seed": seed, "users": dataset["users"]}
+        asyncio.run(load.prepare(context))
+        asyncio.run(load.run_stage(context, concurrency, min(2.0, duration), mix, 0, 1))  # Warm-up
+        stage = asyncio.run(load.run_stage(context, concurrency, duration, mix, 0, 1))
+    finally:
+        process.terminate()  # SIGTERM: a graceful gunicorn shutdown
+        process.wait()
+    stage.pop("timeline")
+    return {"workers": workers, "threads": threads, **stage}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure throughput against gunicorn worker count.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per worker count")
+    parser.add_argument("--mix", default=READ_MIX)
+    parser.add_argument("--output", help="result file (default: bench/scaling-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    workdir = os.path.join(BACKEND_DIR, "bench", args.scale)
+    os.makedirs(workdir, exist_ok=True)
+    dataset = ensure_dataset(os.path.join(workdir, "database.db"), args.scale, args.seed)
+    mix = load.parse_mix(args.mix)
+
+    results = []
+    for workers in (int(value) for value in args.workers.split(",")):
+        result = measure(workdir, dataset, workers, args.threads, args.concurrency,
+                         args.duration, mix, args.seed)
+        results.append(result)
+        baseline = results[0]["throughput_rps"] / results[0]["workers"]
+        print(f"{workers:>3} workers x {args.threads} threads: {result['throughput_rps']:>9} req/s "
+              f"({result['throughput_rps'] / baseline / workers:.0%} of linear)  "
+              f"p50 {result['latency_ms']['p50']} ms  p99 {result['latency_ms']['p99']} ms  "
+              f"errors {sum(route['errors'] for route in result['routes'].values())}")
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, "bench", f"scaling-{environment()['commit'] or 'local'}.json"
+    )
+    write_results(output, dataset, results, {"options": {
+        "threads": args.threads, "concurrency": args.concurrency, "duration": args.duration, "mix": mix,
+    }})
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
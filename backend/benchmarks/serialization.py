@@ -0,0 +1,152 @@
+"""
+Module: benchmarks.serialization
+This module compares the CPU time and memory of building catalogue response bodies.
+
+For a full catalogue and for one page, each strategy builds the GET /pets body
+from the same query on a synthetic dataset:
+
+- `jsonify`: pet dicts with attached variants, serialized by Flask's `jsonify`;
+- `rows`: rows encoded directly by `serialization.RowEncoder` (what GET /pets does);
+- `orjson`: the same pet dicts serialized by orjson, when it is installed.
+
+The query alone is measured too (`query`), so the cost of each serializer is
+its time minus the query's. CPU time is the best of `--repeat` runs; memory is
+the peak traced by `tracemalloc` during one more run, which is not timed.
+
+Usage:
+    python -m benchmarks.serialization --scale small --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.datagen import DEFAULT_SEED, SCALES, ensure_dataset
+from benchmarks.results import environment, write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES = {"catalogue_all": {}, "catalogue_page": {"limit": "20"}}
+
+
+def strategies(app):
+    """Returns {name: build(cursor, params) -> body bytes}."""
+    # pylint: disable=import-outside-toplevel
+    from catalogue import fetch_catalogue_page, fetch_catalogue_rows, build_catalogue_query
+    from images import attach_variants, encode_pets
+    import serialization
+
+    def query(cursor, params):
+        sql, binds = build_catalogue_query(params)
+        cursor.execute(sql, binds)
+        cursor.fetchall()
+        return b""
+
+    def dicts(cursor, params):
+        pets, next_cursor = fetch_catalogue_page(cursor, params)
+        attach_variants(cursor, pets)
+        return {"pets": pets, "next_cursor": next_cursor}
+
+    def with_jsonify(cursor, params):
+        with app.app_context():
+            return app.json.response(dicts(cursor, params)).get_data()
+
+    def with_rows(cursor, params):
+        rows, next_cursor = fetch_catalogue_rows(cursor, params)
+        members = {"pets": encode_pets(cursor, rows), "next_cursor": serialization.encode_value(next_cursor)}
+        return (serialization.json_object(members) + "\n").encode()
+
+    builds = {"query": query, "jsonify": with_jsonify, "rows": with_rows}
+    if "orjson" in serialization.ENCODERS:
+        orjson_dumps = serialization.get_encoder("orjson")
+        builds["orjson"] = lambda cursor, params: orjson_dumps(dicts(cursor, params)) + b"\n"
+    return builds
+
+
+def measure(build, cursor, params, repeat):
+    """Returns (best CPU seconds, best wall seconds, peak traced bytes, body)."""
+    cpu = wall = float("inf")
+    for _ in range(repeat):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        body = build(cursor, params)
+        cpu = min(cpu, time.process_time() - cpu_start)
+        wall = min(wall, time.perf_counter() - wall_start)
+    tracemalloc.start()
+    build(cursor, params)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu, wall, peak, body
+
+
+def run(repeat):
+    """
+    Runs every strategy on every case in the current working directory's database.
+
+    :return: A list of result dicts.
+    """
+    sys.path.insert(0, BACKEND_DIR)
+    # pylint: disable=import-outside-toplevel
+    from main import app
+    from catalogue import parse_catalogue_args
+    from connection_pool import create_connection, DATABASE
+
+    conn = create_connection(DATABASE)
+    cursor = conn.cursor()
+    builds = strategies(app)
+    results = []
+    try:
+        for case, args in CASES.items():
+            params = parse_catalogue_args(args)
+            reference = None
+            for name, build in builds.items():
+                cpu, wall, peak, body = measure(build, cursor, params, repeat)
+                if name == "jsonify":
+                    reference = body
+                results.append({
+                    "case": case,
+                    "strategy": name,
+                    "cpu_ms": round(cpu * 1000, 3),
+                    "wall_ms": round(wall * 1000, 3),
+                    "peak_kb": round(peak / 1024, 1),
+                    "body_bytes": len(body),
+                    "same_as_jsonify": None if name == "query" else body == reference,
+                })
+    finally:
+        conn.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON serialization strategies for GET /pets.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workdir", help="folder for the dataset (default: bench/<scale>)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per strategy")
+    parser.add_argument("--output", help="result file (default: bench/serialization-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    bench_dir = os.path.join(BACKEND_DIR, "bench")
+    workdir = os.path.abspath(args.workdir or os.path.join(bench_dir, args.scale))
+    output = os.path.abspath(
+        args.output or os.path.join(bench_dir, f"serialization-{environment()['commit'] or 'local'}.json")
+    )
+    os.makedirs(workdir, exist_ok=True)
+    print(f"Preparing the {args.scale} dataset in {workdir}...")
+    dataset = ensure_dataset(os.path.join(workdir, "database.db"), args.scale, args.seed)
+
+    # The app opens database.db relative to the working directory
+    os.chdir(workdir)
+    results = run(args.repeat)
+    for result in results:
+        same = "" if result["same_as_jsonify"] is None else f"  same bytes: {result['same_as_jsonify']}"
+        print(f"{result['case']:<16} {result['strategy']:<8} cpu {result['cpu_ms']:>9} ms  "
+              f"peak {result['peak_kb']:>10} KiB  {result['body_bytes']:>9} bytes{same}")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    write_results(output, dataset, results, {"options": {"repeat": args.repeat, "scale": args.scale}})
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Module: catalogue
+This module builds the filtered, sorted and keyset-paginated pet catalogue query.
+
+Filters map to equality predicates (type, breed, location, status) and an age range.
+Every sort order ends with the (name, location) primary key, so the last row of a
+page identifies a unique position and the next page starts with a row-value
+comparison against it instead of an OFFSET.
+"""
+
+import base64
+import binascii
+import json
+
+MAX_PAGE_SIZE = 100
+
+# Age is stored as TEXT; this expression matches the index created in `database.py`.
+AGE_KEY = 'CAST(age AS INTEGER)'
+
+FILTER_FIELDS = ("type", "breed", "location", "status")
+
+SORT_KEYS = {
+    "name": ("name", "location"),
+    "age": (AGE_KEY, "name", "location"),
+    "location": ("location", "name"),
+}
+
+PET_COLUMNS = ("name", "age", "breed", "status", "type", "picture_url", "location")
+
+
+def parse_catalogue_args(args):
+    """
+    Validates the query string of a catalogue request.
+
+    :param args: The request's query arguments (`request.args`).
+    :return: A dict of normalized parameters.
+    :raises ValueError: If a parameter is malformed.
+    """
+    params = {"filters": {}, "sort": args.get("sort", "name")}
+    for field in FILTER_FIELDS:
+        value = args.get(field)
+        if value:
+            params["filters"][field] = value
+
+    params.update(parse_age_bounds(args))
+
+    if params["sort"].lstrip("-") not in SORT_KEYS:
+        raise ValueError(f"sort must be one of: {', '.join(sorted(SORT_KEYS))}")
+
+    params["limit"] = parse_limit(args.get("limit"))
+
+    cursor = args.get("cursor")
+    width = len(SORT_KEYS[params["sort"].lstrip("-")])
+    params["after"] = decode_cursor(cursor, params["sort"], width) if cursor else None
+    return params
+
+
+def parse_age_bounds(args):
+    """
+    Reads the optional `min_age` and `max_age` bounds (inclusive) from the query string.
+
+    :return: A dict with both bounds, each an integer or None.
+    :raises ValueError: If a bound is not an integer.
+    """
+    bounds = {}
+    for bound in ("min_age", "max_age"):
+        value = args.get(bound)
+        if value is None or value == "":
+            bounds[bound] = None
+            continue
+        try:
+            bounds[bound] = int(value)
+        except ValueError as exc:
+            raise ValueError(f"{bound} must be an integer") from exc
+    return bounds
+
+
+def parse_limit(value):
+    """
+    Parses an optional page size.
+
+    :return: The page size, or None when no limit was given.
+    :raises ValueError: If the value is not an integer between 1 and MAX_PAGE_SIZE.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("limit must be an integer") from exc
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def encode_cursor(sort, values):
+    """Encodes the sort key of the last row on a page as an opaque token."""
+    raw = json.dumps([sort, list(values)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, sort, width):
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    :param width: The number of sort key values the cursor must carry.
+    :raises ValueError: If the token is malformed, holds values other than numbers and
+                        strings, or was issued for another sort order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_sort, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if cursor_sort != sort or not isinstance(values, list) or len(values) != width:
+        raise ValueError("Cursor does not match the requested sort order")
+    # The values are bound as SQL parameters, which must be scalars
+    if not all(isinstance(value, (int, float, str)) and not isinstance(value, bool) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def build_catalogue_query(params, columns=PET_COLUMNS):
+    """
+    Builds the SQL for one catalogue page.
+
+    The sort key expressions are appended to the selected columns so the cursor
+    for the next page can be read from the last row.
+
+    :return: A tuple of (sql, bind_parameters).
+    """
+    sort = params["sort"]
+    descending = sort.startswith("-")
+    keys = SORT_KEYS[sort.lstrip("-")]
+
+    clauses, binds = [], []
+    for field, value in params["filters"].items():
+        clauses.append(f"{field} = ?")
+        binds.append(value)
+    if params["min_age"] is not None:
+        clauses.append(f"{AGE_KEY} >= ?")
+        binds.append(params["min_age"])
+    if params["max_age"] is not None:
+        clauses.append(f"{AGE_KEY} <= ?")
+        binds.append(params["max_age"])
+    if params["after"] is not None:
+        operator = "<" if descending else ">"
+        clauses.append(f"({', '.join(keys)}) {operator} ({', '.join('?' * len(keys))})")
+        binds.extend(params["after"])
+
+    direction = " DESC" if descending else ""
+    sql = f"SELECT {', '.join(columns + keys)} FROM pets"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY " + ", ".join(key + direction for key in keys)
+    if params["limit"] is not None:
+        # Fetch one extra row to learn whether another page exists
+        sql += " LIMIT ?"
+        binds.append(params["limit"] + 1)
+    return sql, binds
+
+
+def fetch_catalogue_rows(cursor, params, columns=PET_COLUMNS):
+    """
+    Runs the catalogue query for one page.
+
+    :param cursor: An open database cursor.
+    :param params: Parameters returned by `parse_catalogue_args`.
+    :return: A tuple of (rows starting with `columns`, next cursor or None).
+    """
+    sql, binds = build_catalogue_query(params, columns)
+    cursor.execute(sql, binds)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    limit = params["limit"]
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(params["sort"], tuple(rows[-1])[len(columns):])
+    return rows, next_cursor
+
+
+def fetch_catalogue_page(cursor, params, columns=PET_COLUMNS):
+    """
+    Runs the catalogue query and shapes one page of results.
+
+    :param cursor: An open database cursor.
+    :param params: Parameters returned by `parse_catalogue_args`.
+    :return: A tuple of (list of pet dicts, next cursor or None).
+    """
+    rows, next_cursor = fetch_catalogue_rows(cursor, params, columns)
+    pets = [dict(zip(columns, tuple(row)[:len(columns)])) for row in rows]
+    return pets, next_cursor
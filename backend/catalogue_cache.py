@@ -0,0 +1,250 @@
+"""
+Module: catalogue_cache
+This module provides an in-process, read-through cache for serialized GET /pets responses.
+
+Entries are keyed by the normalized catalogue parameters, bounded by count (least
+recently used entries are evicted first) and by age. Writes to `pets` invalidate
+only the entries whose filters match the old or new version of the changed row.
+
+Each process keeps its own cache. So that writes made by other workers are seen
+too, triggers (migration 10) log the filter values of every changed pet row in
+`catalogue_changes`, and readers call `sync` before using the cache whenever
+`sync_due` says so: it applies the changes logged since its last call, usually
+none, which costs one primary key range read. Syncs are at most SYNC_INTERVAL
+seconds apart, so a hit (and a 304) runs no SQL at all, at the price of serving
+another worker's write up to SYNC_INTERVAL late. The log keeps the last CHANGE_LOG_SIZE changes; a cache that
+fell further behind, or a change to picture variants, drops every entry.
+`PRAGMA data_version` is not used because it moves with writes to any table and
+is only comparable on a single connection.
+
+Every invalidation also advances a generation counter. A reader that misses
+notes the `generation` before querying and hands it to `put`, which does not
+store the body if an invalidation happened in between, since the body may
+predate the write that caused it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from catalogue import FILTER_FIELDS
+
+CACHE_SIZE = int(os.environ.get("CATALOGUE_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.environ.get("CATALOGUE_CACHE_TTL", "60"))
+SYNC_INTERVAL = float(os.environ.get("CATALOGUE_SYNC_INTERVAL", "0.1"))
+CHANGE_LOG_SIZE = 1000  # Changes kept in `catalogue_changes`; must match migration 10
+CHANGE_FIELDS = FILTER_FIELDS + ("age",)
+
+
+class CacheEntry:
+    """A serialized response body with its strong ETag, and compressed copies of it."""
+
+    __slots__ = ("params", "body", "etag", "expires_at", "encoded")
+
+    def __init__(self, params, body, expires_at):
+        self.params = params
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.expires_at = expires_at
+        self.encoded = {}  # encoding -> compressed body, filled on first request for it
+
+    def encoded_body(self, encoding, compress):
+        """
+        Returns the body compressed with `encoding`, compressing it only the first time.
+
+        :param compress: Called as `compress(body, encoding)` on a miss.
+        :return: A tuple of (compressed body, whether it was already stored).
+        """
+        body = self.encoded.get(encoding)
+        if body is not None:
+            return body, True
+        body = self.encoded[encoding] = compress(self.body, encoding)
+        return body, False
+
+
+def cache_key(params):
+    """Returns a stable key for a dict of parsed catalogue parameters."""
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def _age_value(age):
+    """Mirrors SQLite's CAST(age AS INTEGER); returns None when it cannot be predicted."""
+    try:
+        return int(str(age).strip())
+    except ValueError:
+        return None
+
+
+def params_match_pet(params, pet):
+    """
+    Checks whether a pet row could appear in the result for the given parameters.
+
+    :param params: Parameters returned by `catalogue.parse_catalogue_args`.
+    :param pet: A mapping with the pet's column values.
+    """
+    for field, value in params["filters"].items():
+        if pet.get(field) != value:
+            return False
+    if params["min_age"] is None and params["max_age"] is None:
+        return True
+    age = _age_value(pet.get("age"))
+    if age is None:
+        return True  # Be conservative with ages SQLite would coerce
+    if params["min_age"] is not None and age < params["min_age"]:
+        return False
+    if params["max_age"] is not None and age > params["max_age"]:
+        return False
+    return True
+
+
+class CatalogueCache:
+    """A size- and TTL-bounded LRU cache of catalogue responses."""
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, sync_interval=SYNC_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "expired": 0,
+                       "stale_fills": 0}
+        self._generation = 0
+        self._seq = None  # Last change applied from `catalogue_changes`; None before the first sync
+        self._synced_at = 0.0
+
+    @property
+    def generation(self):
+        """A counter advanced by every invalidation; read it before querying and pass it to `put`."""
+        return self._generation
+
+    def sync_due(self):
+        """
+        Tells whether the caller should `sync` now; claims the sync if so.
+
+        :return: True at most once per `sync_interval`, and always before the first sync.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._seq is not None and now - self._synced_at < self.sync_interval:
+                return False
+            self._synced_at = now
+            return True
+
+    def sync(self, cursor):
+        """
+        Applies the catalogue changes logged by any process since the last call.
+
+        :param cursor: A cursor on the catalogue database.
+        """
+        seq = self._seq
+        if seq is None:
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM catalogue_changes')
+            latest = cursor.fetchone()[0]
+            with self._lock:
+                self._clear_locked()
+                self._seq = latest
+            return
+        cursor.execute(
+            f'SELECT seq, all_pets, {", ".join(CHANGE_FIELDS)} FROM catalogue_changes WHERE seq > ? ORDER BY seq',
+            (seq,)
+        )
+        changes = cursor.fetchall()
+        if not changes:
+            return
+        with self._lock:
+            # Changes dropped from the log, or to variants of any pet, leave no way to be selective
+            if changes[0][0] != seq + 1 or any(change[1] for change in changes):
+                self._clear_locked()
+            else:
+                self._invalidate_locked([dict(zip(CHANGE_FIELDS, change[2:])) for change in changes])
+            self._seq = max(self._seq or 0, changes[-1][0])
+
+    def get(self, key):
+        """Returns the live entry for `key`, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key, params, body, generation=None):
+        """
+        Stores a serialized response body and returns its entry.
+
+        :param generation: The `generation` read before the body was queried; if the
+                           cache was invalidated since, the entry is returned unstored.
+        """
+        entry = CacheEntry(params, body, time.monotonic() + self.ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self._stats["stale_fills"] += 1
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return entry
+
+    def invalidate_pets(self, *pets):
+        """
+        Drops every entry whose filters match any of the given pet rows.
+
+        Pass both the old and the new version of an edited pet.
+        """
+        pets = [pet for pet in pets if pet is not None]
+        with self._lock:
+            self._invalidate_locked(pets)
+
+    def clear(self):
+        """Drops every entry, and starts over from the latest change at the next `sync`."""
+        with self._lock:
+            self._clear_locked()
+            self._seq = None
+
+    def _invalidate_locked(self, pets):
+        self._generation += 1
+        stale = [
+            key for key, entry in self._entries.items()
+            if any(params_match_pet(entry.params, pet) for pet in pets)
+        ]
+        for key in stale:
+            del self._entries[key]
+        self._stats["invalidations"] += len(stale)
+
+    def _clear_locked(self):
+        self._generation += 1
+        self._stats["invalidations"] += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["ttl"] = self.ttl
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+catalogue_cache = CatalogueCache()
+
+
+def pet_from_row(row):
+    """Builds the mapping `invalidate_pets` needs from a `pets` row or request body."""
+    if row is None:
+        return None
+    return {field: row[field] for field in CHANGE_FIELDS}
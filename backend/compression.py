@@ -0,0 +1,171 @@
+"""
+Module: compression
+This module compresses responses with brotli or gzip, negotiated through Accept-Encoding.
+
+`init_app` registers an `after_request` hook that compresses JSON, NDJSON, CSV and
+text responses for clients that accept it, preferring brotli when the client
+weighs both equally. Bodies smaller than COMPRESSION_MIN_SIZE bytes are sent as
+they are, since compressing them saves less than it costs. Streamed responses
+(such as table exports) are compressed chunk by chunk as they are sent, whatever
+their size. Compressed responses get `Content-Encoding`, an ETag suffixed with the
+encoding, and `Vary: Accept-Encoding`.
+
+Levels default to GZIP_LEVEL and BROTLI_QUALITY and can be set per route with
+`configure_route`. Views that cache their bodies, such as GET /pets, compress
+them once with `compress` and send the stored bytes; the hook leaves responses
+that already carry a `Content-Encoding` alone.
+
+Every compression is recorded in metrics.py: the size ratio and the time spent,
+by route and encoding. Brotli is optional: without the `brotli` package only gzip
+is offered. Set COMPRESSION_ENABLED=0 to turn compression off.
+"""
+
+import gzip
+import os
+import time
+import zlib
+from flask import request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only where brotli is missing
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Offered encodings, most preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html")
+
+# route rule -> {encoding: level}; overrides the defaults for that route
+ROUTE_LEVELS = {}
+
+
+def configure_route(rule, gzip_level=None, brotli_quality=None):
+    """Sets the compression levels of one route, e.g. higher ones for bodies compressed once and cached."""
+    levels = ROUTE_LEVELS.setdefault(rule, {})
+    if gzip_level is not None:
+        levels["gzip"] = gzip_level
+    if brotli_quality is not None:
+        levels["br"] = brotli_quality
+
+
+def route_rule():
+    """Returns the route template of the current request, as used for metric labels."""
+    return request.url_rule.rule if request.url_rule else metrics.UNMATCHED_ROUTE
+
+
+def level_for(encoding, rule=None):
+    """Returns the level to compress with for `encoding` on `rule` (default: the current route)."""
+    rule = route_rule() if rule is None else rule
+    default = BROTLI_QUALITY if encoding == "br" else GZIP_LEVEL
+    return ROUTE_LEVELS.get(rule, {}).get(encoding, default)
+
+
+def negotiate(size=None):
+    """
+    Picks the encoding for the current request's response.
+
+    :param size: The body size, or None for a streamed body of unknown size.
+    :return: "br", "gzip", or None to send the body uncompressed.
+    """
+    if not COMPRESSION_ENABLED or (size is not None and size < MIN_SIZE):
+        return None
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accepted.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding, level=None, rule=None):
+    """
+    Compresses `body` and records the ratio and time in the metrics.
+
+    :param level: The compression level; by default the one set for `rule`.
+    :param rule: The route the body is for (default: the current route).
+    """
+    rule = route_rule() if rule is None else rule
+    level = level_for(encoding, rule) if level is None else level
+    start = time.perf_counter()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=level)
+    else:
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)  # Same bytes in every worker
+    metrics.record_compression(rule, encoding, len(body), len(compressed), time.perf_counter() - start)
+    return compressed
+
+
+def compress_stream(chunks, encoding, level, rule):
+    """Compresses an iterable of byte chunks, yielding compressed data as it becomes available."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip framing
+        process, finish = compressor.compress, compressor.flush
+    size = compressed_size = 0
+    seconds = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        data = process(chunk)
+        seconds += time.perf_counter() - start
+        size += len(chunk)
+        compressed_size += len(data)
+        if data:
+            yield data
+    start = time.perf_counter()
+    data = finish()
+    seconds += time.perf_counter() - start
+    compressed_size += len(data)
+    metrics.record_compression(rule, encoding, size, compressed_size, seconds)
+    yield data
+
+
+def mark_encoded(response, encoding):
+    """Sets the headers of a response whose body is compressed with `encoding`."""
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+
+
+def compress_response(response):
+    """Compresses an eligible response for the encoding the client prefers."""
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or request.method == "HEAD" or response.direct_passthrough
+            or "Content-Encoding" in response.headers):
+        return response
+
+    rule = route_rule()
+    if response.is_streamed:
+        encoding = negotiate()
+        if encoding is None:
+            return response
+        response.response = compress_stream(response.iter_encoded(), encoding, level_for(encoding, rule), rule)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        encoding = negotiate(len(body))
+        if encoding is None:
+            return response
+        response.set_data(compress(body, encoding, rule=rule))
+    mark_encoded(response, encoding)
+    metrics.record_encoding(rule, encoding)
+    return response
+
+
+def init_app(app):
+    """Registers the compression hook on the Flask app."""
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
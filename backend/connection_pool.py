@@ -0,0 +1,355 @@
+"""
+Module: connection_pool
+This module provides a bounded, thread-safe pool of SQLite connections.
+
+Opening a connection and warming its page cache is the most expensive part of a
+short request, so connections are created once, configured once (WAL journaling,
+busy timeout, cache size, foreign keys) and then reused for the life of a Flask
+app context. A new pooled connection is warmed by running the hot statements
+registered with `warm_statement`, which loads the schema, prepares those
+statements in the connection's statement cache and reads the index pages they
+use. Idle connections go back preferably to the thread that last used them.
+
+It defines:
+- `create_connection`, whose connections time every statement and report it to the
+  callbacks registered with `observe_statements` (used by metrics.py and query_trace.py).
+- `warm_statement`, which registers a statement to run on every new pooled connection.
+- `ConnectionPool`, the pool itself, with hit/miss statistics.
+- `get_db` / `close_db`, which bind one pooled connection to the current app context.
+- `init_app`, which registers the teardown handler on a Flask app.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from flask import g
+
+DATABASE = 'database.db'
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "8192"))
+
+
+# Callables taking (cursor, sql, parameters, seconds), called after every statement run
+# on our connections; parameters is None for scripts and MANY for executemany
+STATEMENT_OBSERVERS = []
+MANY = object()
+
+# (sql, parameters) run on every new pooled connection, in order
+WARM_STATEMENTS = []
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+def observe_statements(callback):
+    """Registers `callback(cursor, sql, parameters, seconds)` to be called after every statement."""
+    STATEMENT_OBSERVERS.append(callback)
+    return callback
+
+
+def warm_statement(sql, parameters=()):
+    """
+    Registers a hot statement to run, and read to the end, on every new pooled connection.
+
+    Use the exact SQL text the request path runs, so the prepared statement is reused.
+    """
+    WARM_STATEMENTS.append((sql, tuple(parameters)))
+
+
+def warm_connection(conn):
+    """Runs the registered hot statements on `conn`; those the schema cannot run yet are skipped."""
+    conn.execute("SELECT COUNT(*) FROM sqlite_schema").fetchone()  # Loads the schema
+    for sql, parameters in WARM_STATEMENTS:
+        try:
+            conn.execute(sql, parameters).fetchall()
+        except sqlite3.Error:
+            pass  # E.g. a table the migrations have not created yet
+    if conn.in_transaction:
+        conn.rollback()
+
+
+def _notify(cursor, sql, parameters, start):
+    elapsed = time.perf_counter() - start
+    for callback in STATEMENT_OBSERVERS:
+        callback(cursor, sql, parameters, elapsed)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    A cursor that times its statements for `STATEMENT_OBSERVERS`.
+
+    A query's time covers running it and reading its rows: fetch calls and iteration
+    add to it, and the observers are called once the statement is over, when its rows
+    run out or when the cursor runs another statement, is closed or is dropped.
+    Statements that return no rows are reported as soon as they have run.
+    """
+
+    _pending = None  # [sql, parameters, seconds] of a query whose rows are still being read
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            for callback in STATEMENT_OBSERVERS:
+                callback(self, *pending)
+
+    def _read(self, start, exhausted):
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - start
+            if exhausted:
+                self._finish()
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            _notify(self, sql, parameters, start)
+            raise
+        self._pending = [sql, parameters, time.perf_counter() - start]
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _notify(self, sql, MANY, start)
+
+    def executescript(self, sql_script):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _notify(self, sql_script, None, start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = None
+        try:
+            row = super().fetchone()
+        finally:
+            self._read(start, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = []
+        try:
+            rows = super().fetchmany(size)
+        finally:
+            self._read(start, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._read(start, True)
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except BaseException:  # StopIteration included
+            self._read(start, True)
+            raise
+        self._read(start, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose cursors, including those of its shortcut methods, are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def create_connection(database=DATABASE):
+    """
+    Opens a new SQLite connection configured for pooled use.
+
+    :param database: Path of the SQLite database file.
+    :return: A configured `InstrumentedConnection`.
+    """
+    conn = sqlite3.connect(database, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           factory=InstrumentedConnection)
+    conn.row_factory = sqlite3.Row  # Supports both index and column-name access
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA foreign_keys = ON")  # Enforces the schema's ON DELETE CASCADE clauses
+    return conn
+
+
+class ConnectionPool:
+    """
+    A bounded pool of SQLite connections shared between request threads.
+
+    A thread is handed the idle connection it released last, if there is one, and
+    otherwise the most recently used one, so the warmest page cache is reused. At
+    most `max_size` connections exist at once; callers wait up to `timeout` seconds
+    for one to be released before `PoolTimeout` is raised.
+    """
+
+    def __init__(self, database=DATABASE, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []  # (connection, ident of the thread that last had it)
+        self._in_use = {}  # id(connection) -> (ident of the owning thread, generation)
+        self._generation = 0
+        self._condition = threading.Condition(threading.Lock())
+        self._stats = {"hits": 0, "misses": 0, "same_thread": 0, "waits": 0, "timeouts": 0, "discarded": 0}
+
+    def acquire(self):
+        """
+        Checks a connection out of the pool, opening a new one if the pool has room.
+
+        :return: A configured `sqlite3.Connection` owned by the calling thread.
+        """
+        deadline = time.monotonic() + self.timeout
+        ident = threading.get_ident()
+        with self._condition:
+            while True:
+                if self._idle:
+                    conn = self._take_idle(ident)
+                    self._stats["hits"] += 1
+                    break
+                if len(self._in_use) < self.max_size:
+                    conn = None
+                    self._stats["misses"] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout("Timed out waiting for a database connection")
+                self._stats["waits"] += 1
+                self._condition.wait(remaining)
+
+            # Reserve the slot before connecting so concurrent misses stay bounded
+            token = object() if conn is None else conn
+            self._in_use[id(token)] = (ident, self._generation)
+
+        if conn is None:
+            try:
+                conn = create_connection(self.database)
+                warm_connection(conn)
+            except sqlite3.Error:
+                with self._condition:
+                    del self._in_use[id(token)]
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._in_use[id(conn)] = self._in_use.pop(id(token))
+        return conn
+
+    def _take_idle(self, ident):
+        """Removes and returns the idle connection `ident` used last, else the newest one."""
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index][1] == ident:
+                self._stats["same_thread"] += 1
+                return self._idle.pop(index)[0]
+        return self._idle.pop()[0]
+
+    def release(self, conn):
+        """
+        Returns a connection to the pool, rolling back any unfinished transaction.
+
+        Connections opened before the last `close_all` are closed instead of reused.
+        Releasing a connection that is not checked out does nothing.
+        """
+        with self._condition:
+            if id(conn) not in self._in_use:
+                return
+        if conn.in_transaction:
+            conn.rollback()
+        with self._condition:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                return  # Released concurrently by another caller
+            keep = entry[1] == self._generation
+            if keep:
+                self._idle.append((conn, entry[0]))
+            else:
+                self._stats["discarded"] += 1
+            self._condition.notify()
+        if not keep:
+            conn.close()
+
+    def close_all(self):
+        """
+        Closes every idle connection and retires those currently checked out.
+
+        Used when the database file is recreated, so no connection keeps pointing
+        at the old file.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._generation += 1
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self):
+        """Returns a snapshot of the pool counters."""
+        with self._condition:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+            stats["max_size"] = self.max_size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+pool = ConnectionPool()
+
+
+def get_db():
+    """
+    Returns the pooled connection bound to the current app context,
+    checking one out on first use.
+    """
+    if "db" not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db(exception=None):  # pylint: disable=unused-argument
+    """Returns the app context's connection to the pool on teardown."""
+    conn = g.pop("db", None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    """Registers the pool teardown handler on the Flask app."""
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,174 @@
+"""
+Module: dashboard
+This module serves everything the app's first page needs in one response.
+
+GET /dashboard returns a catalogue page together with the caller's favorite pets
+and adoption applications. The three sections are read concurrently, each on its
+own pooled connection in a shared thread pool, so the response takes about as
+long as the slowest section rather than the sum of three requests.
+
+Each section has a time limit (DASHBOARD_SECTION_TIMEOUT seconds). A section that
+fails or runs out of time is left out and reported under `errors`, with `partial`
+set, instead of failing the whole response; a timed-out query is interrupted so
+it does not keep its connection busy.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import request, jsonify
+
+from auth import require_identity
+from catalogue import parse_catalogue_args, parse_limit, fetch_catalogue_page
+from catalogue_cache import catalogue_cache, cache_key
+from connection_pool import pool
+from favorites import fetch_favorites, lookup_user_id
+from application_status import fetch_applications, DEFAULT_PAGE_SIZE
+from identity_cache import identity_cache, MISSING
+from images import attach_variants
+
+SECTION_TIMEOUT = float(os.environ.get("DASHBOARD_SECTION_TIMEOUT", "2"))
+DASHBOARD_THREADS = int(os.environ.get("DASHBOARD_THREADS", "8"))
+DEFAULT_CATALOGUE_LIMIT = 20
+DEFAULT_FAVORITES_LIMIT = 50
+
+executor = ThreadPoolExecutor(max_workers=DASHBOARD_THREADS, thread_name_prefix="dashboard")
+
+
+class SectionTimeout(Exception):
+    """Raised when a section does not finish within its time limit."""
+
+
+async def run_section(func, timeout=None):
+    """
+    Runs `func(cursor)` on a pooled connection in the dashboard thread pool.
+
+    :raises SectionTimeout: If it takes longer than `timeout` seconds; the query is
+                            then interrupted and its connection returned to the pool.
+    """
+    state = {"conn": None, "done": False}
+    lock = threading.Lock()
+
+    def work():
+        conn = pool.acquire()
+        with lock:
+            state["conn"] = conn
+        try:
+            return func(conn.cursor())
+        finally:
+            with lock:
+                state["done"] = True
+            pool.release(conn)
+
+    loop = asyncio.get_running_loop()
+    # In a copy of the request's context, so metrics.py counts the section's SQL toward the request
+    future = loop.run_in_executor(executor, contextvars.copy_context().run, work)
+    try:
+        return await asyncio.wait_for(future, timeout or SECTION_TIMEOUT)
+    except asyncio.TimeoutError as exc:
+        with lock:
+            if state["conn"] is not None and not state["done"]:
+                state["conn"].interrupt()  # Never interrupts a connection already handed back
+        raise SectionTimeout("Timed out") from exc
+
+
+def catalogue_section(params):
+    """
+    Returns the catalogue page for `params` as a dict, with the cache generation
+    it was queried at, or None if it came from the cache.
+    """
+    def query(cursor):
+        if catalogue_cache.sync_due():
+            catalogue_cache.sync(cursor)
+        entry = catalogue_cache.get(cache_key(params))
+        if entry is not None:
+            return json.loads(entry.body), None
+        generation = catalogue_cache.generation
+        pets, next_cursor = fetch_catalogue_page(cursor, params)
+        attach_variants(cursor, pets)
+        return {"pets": pets, "next_cursor": next_cursor}, generation
+    return query
+
+
+async def get_dashboard():
+    """
+    Returns a catalogue page with the caller's favorites and applications in one response.
+
+    The user comes from the bearer token or the `email` parameter; without either,
+    only the catalogue is returned. Catalogue query parameters are those of
+    GET /pets (the page size defaults to 20); `favorites_limit` (default 50) and
+    `applications_limit` (default 100) size the other sections. Each section
+    carries its own `next_cursor` for the regular endpoints.
+
+    ---
+    tags:
+      - Dashboard
+    responses:
+      200:
+        description: >
+          `catalogue`, `favorites` and `applications` sections; sections that failed
+          or timed out are listed in `errors` and `partial` is true.
+      400:
+        description: A query parameter is malformed.
+      404:
+        description: No user has the given email.
+    """
+    try:
+        params = parse_catalogue_args(request.args)
+        if params["limit"] is None:
+            params["limit"] = DEFAULT_CATALOGUE_LIMIT
+        favorites_limit = parse_limit(request.args.get("favorites_limit")) or DEFAULT_FAVORITES_LIMIT
+        applications_limit = parse_limit(request.args.get("applications_limit")) or DEFAULT_PAGE_SIZE
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    identity = require_identity()
+    email = request.args.get("email")
+    user_id = identity["uid"] if identity else identity_cache.get(email) if email else None
+    if email and not identity:
+        if user_id is MISSING:
+            try:
+                user_id = await run_section(lambda cursor: lookup_user_id(cursor, email))
+            except (sqlite3.Error, SectionTimeout) as e:
+                return jsonify({"message": f"Database error: {str(e)}"}), 500
+        if user_id is None:
+            return jsonify({"message": "User not found"}), 404
+
+    sections = {"catalogue": catalogue_section(params)}
+    if user_id is not None:
+        sections["favorites"] = lambda cursor: fetch_favorites(cursor, user_id, limit=favorites_limit)
+        sections["applications"] = lambda cursor: fetch_applications(
+            cursor, [], [user_id], [], applications_limit
+        )
+
+    outcomes = await asyncio.gather(
+        *(run_section(func) for func in sections.values()), return_exceptions=True
+    )
+
+    response = {}
+    errors = {}
+    for name, outcome in zip(sections, outcomes):
+        if isinstance(outcome, SectionTimeout):
+            errors[name] = "Timed out"
+        elif isinstance(outcome, sqlite3.Error):
+            errors[name] = f"Database error: {str(outcome)}"
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        elif name == "catalogue":
+            response[name], generation = outcome
+            if generation is not None:
+                catalogue_cache.put(cache_key(params), params, jsonify(response[name]).get_data(), generation)
+        elif name == "favorites":
+            _, favorite_pets, next_cursor = outcome
+            response[name] = {"favorites": favorite_pets, "next_cursor": next_cursor}
+        else:
+            applications, next_cursor = outcome
+            response[name] = {"applications": applications, "next_cursor": next_cursor}
+
+    response["errors"] = errors
+    response["partial"] = bool(errors)
+    return jsonify(response), 200
@@ -1,127 +1,136 @@
 """
-This module handles database initialization and connection setup for the application.
+This module handles database setup for the application.
 
 It defines:
-- A function to get a database connection (`get_db_connection`).
-- A function to initialize the database (`initialize_database`), which sets up the schema
-  for users, pets, favorites, questionnaires, and adoption applications.
-
-Default data for pets is also inserted during initialization.
+- A function to bring the schema up to date (`migrate_database`), which is safe to call
+  on every start and does nothing when the schema is current.
+- A function to insert the default pets (`seed_default_pets`), which only runs on request.
+- A function to make a registered user an admin (`grant_admin`).
+- A function to rebuild the database from scratch (`initialize_database`), which drops
+  every table, re-applies all migrations and seeds the default pets. It is meant for
+  development and tests and must never run against production data.
+
+The schema itself lives in `migrations.py`; request-time connections come from
+`connection_pool`.
+
+Usage:
+    python database.py migrate   # Apply pending migrations (default)
+    python database.py seed      # Migrate, then insert the default pets
+    python database.py reset     # Drop everything and start over with the default pets
+    python database.py grant-admin <username>  # Give a registered user the admin role
 """
 
-import sqlite3
-
-DATABASE = 'database.db'
-
+import sys
+
+from connection_pool import DATABASE, create_connection, pool
+from catalogue_cache import catalogue_cache
+from identity_cache import identity_cache
+from migrations import migrate
+
+
+def migrate_database(database=DATABASE):
+    """
+    Applies pending schema migrations.
+
+    :return: The list of migration versions applied.
+    """
+    conn = create_connection(database)
+    try:
+        applied = migrate(conn)
+    finally:
+        conn.close()
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
+    return applied
+
+
+def seed_default_pets(database=DATABASE):
+    """Inserts the default pets, leaving any existing pet with the same key untouched."""
+    conn = create_connection(database)
+    try:
+        print("Inserting default pets...")
+        conn.execute('''
+            INSERT OR IGNORE INTO pets (name, age, description, breed, status, type, picture_url, location)
+            VALUES
+            ('Jay', '1', 'Golden Lab', 'Lab', 'available', 'dog', '/jay.jpg', 'Hartford, CT'),
+            ('Bella', '3', 'Playful and energetic', 'Golden Retriever', 'available', 'dog', '/bella.jpg', 'New Haven, CT'),
+            ('Max', '2', 'Loves cuddles and naps', 'Beagle', 'available', 'dog', '/max.jpg', 'Stamford, CT'),
+            ('Luna', '4', 'Quiet and friendly', 'Persian', 'available', 'cat', '/luna.jpg', 'Norwich, CT'),
+            ('Rocky', '5', 'Very protective', 'German Shepherd', 'available', 'dog', '/rocky.jpg', 'Danbury, CT'),
+            ('Mittens', '1', 'Loves climbing and exploring', 'Tabby', 'available', 'cat', '/mittens.jpg', 'Waterbury, CT')
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    catalogue_cache.clear()
+
+
+def grant_admin(username, database=DATABASE):
+    """
+    Gives a registered user the admin role, from their next login on.
+
+    The user is listed in `admins` under their username, with their password hash.
+
+    :return: True if the user is now an admin, False if no user has that name.
+    """
+    conn = create_connection(database)
+    try:
+        conn.execute(
+            '''
+            INSERT INTO admins (username, password)
+            SELECT username, password FROM users WHERE username = ?
+            ON CONFLICT (username) DO NOTHING
+            ''',
+            (username,)
+        )
+        conn.commit()
+        return conn.execute('SELECT 1 FROM admins WHERE username = ?', (username,)).fetchone() is not None
+    finally:
+        conn.close()
 
-def get_db_connection():
-    """Initializes the database connection."""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def initialize_database():
-    """Initializes the database by creating required tables and inserting default data."""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+    """
+    Rebuilds the database from scratch: drops every table, applies all migrations
+    and inserts the default pets. Destroys all data.
+    """
+    # Pooled connections may still point at a previous database file
+    pool.close_all()
+    catalogue_cache.clear()
+    identity_cache.clear()
+
+    conn = create_connection(DATABASE)
+    try:
+        print("Dropping existing tables...")
+        conn.execute("PRAGMA foreign_keys = OFF")
+        tables = conn.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ORDER BY sql LIKE 'CREATE VIRTUAL TABLE%' DESC -- Drops their shadow tables too
+        ''').fetchall()
+        for (table,) in tables:
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        conn.commit()
+    finally:
+        conn.close()
 
-    cursor.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
-
-    # Drop existing tables for a clean slate
-    print("Dropping existing tables...")
-    cursor.execute('DROP TABLE IF EXISTS favorites')
-    cursor.execute('DROP TABLE IF EXISTS pets')
-    cursor.execute('DROP TABLE IF EXISTS users')
-
-      # Create tables
     print("Creating tables...")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admins (
-            admin_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
-    ''')
-
-    # Create tables
-    print("Creating tables...")
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            address TEXT,
-            background_check_status TEXT NOT NULL DEFAULT 'pending',
-            profile_status TEXT NOT NULL DEFAULT 'active'
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pets (
-            name TEXT NOT NULL,
-            age TEXT NOT NULL,
-            description TEXT NOT NULL,
-            breed TEXT NOT NULL,
-            picture_url TEXT,
-            status TEXT NOT NULL DEFAULT 'available',
-            type TEXT NOT NULL,
-            location TEXT NOT NULL,
-            PRIMARY KEY (name, location) -- Enforce unique name/location combinations
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS favorites (
-            favorite_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            pet_name TEXT NOT NULL,
-            pet_location TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-            FOREIGN KEY (pet_name, pet_location) REFERENCES pets(name, location) ON DELETE CASCADE,
-            UNIQUE(user_id, pet_name, pet_location) -- Prevent duplicate favorites for the same user and pet
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS questionnaires (
-            questionnaire_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            submission_date DATE,
-            status TEXT NOT NULL DEFAULT 'pending',
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS adoption_applications (
-            application_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            pet_name TEXT NOT NULL,
-            location TEXT NOT NULL,
-            submission_date DATE,
-            status TEXT NOT NULL DEFAULT 'pending',
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-    ''')
-
-    # Insert default pets into the pets table
-    print("Inserting default pets...")
-    cursor.execute('''
-        INSERT OR IGNORE INTO pets (name, age, description, breed, status, type, picture_url, location)
-        VALUES 
-        ('Jay', '1', 'Golden Lab', 'Lab', 'available', 'dog', '/jay.jpg', 'Hartford, CT'),
-        ('Bella', '3', 'Playful and energetic', 'Golden Retriever', 'available', 'dog', '/bella.jpg', 'New Haven, CT'),
-        ('Max', '2', 'Loves cuddles and naps', 'Beagle', 'available', 'dog', '/max.jpg', 'Stamford, CT'),
-        ('Luna', '4', 'Quiet and friendly', 'Persian', 'available', 'cat', '/luna.jpg', 'Norwich, CT'),
-        ('Rocky', '5', 'Very protective', 'German Shepherd', 'available', 'dog', '/rocky.jpg', 'Danbury, CT'),
-        ('Mittens', '1', 'Loves climbing and exploring', 'Tabby', 'available', 'cat', '/mittens.jpg', 'Waterbury, CT')
-    ''')
-
-    conn.commit()
-    conn.close()
+    migrate_database()
+    seed_default_pets()
     print("Database initialized successfully.")
 
+
 if __name__ == "__main__":
-    initialize_database()
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "migrate":
+        migrate_database()
+    elif command == "seed":
+        migrate_database()
+        seed_default_pets()
+    elif command == "reset":
+        initialize_database()
+    elif command == "grant-admin" and len(sys.argv) == 3:
+        if not grant_admin(sys.argv[2]):
+            sys.exit(f"No user named {sys.argv[2]!r}")
+    else:
+        sys.exit("Usage: python database.py [migrate|seed|reset|grant-admin <username>]")
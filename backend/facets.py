@@ -0,0 +1,282 @@
+"""
+Module: facets
+This module provides counts per value of the catalogue filters, for the filter dropdowns.
+
+Two tables (migration 8) are kept current by triggers on every insert, update
+and delete of `pets`:
+
+- `pet_facet_values` holds the number of pets per facet value, so the unfiltered
+  counts are read in O(number of facet values).
+- `pet_facet_counts` holds the number of pets per distinct combination of type,
+  breed, location, status and age bucket. Counts narrowed by selected filters are
+  sums over its matching rows, whose number depends on how many distinct
+  combinations exist, not on how many pets there are.
+
+Each facet is narrowed by every selected filter except its own, so a dropdown
+still offers the alternatives to its current selection.
+
+Ages can also be selected with `min_age` and `max_age`, as for GET /pets; they
+narrow every facet but the age buckets. A range made of whole buckets is
+answered from `pet_facet_counts`; any other range splits a bucket, so its counts
+are taken from `pets` itself.
+"""
+
+import sqlite3
+from flask import request, jsonify
+
+from catalogue import AGE_KEY, parse_age_bounds
+from utils import connect_to_database
+
+# Upper bounds (inclusive) of each age bucket, in order; the last bucket is open-ended
+AGE_BUCKETS = (("0-1", 1), ("2-3", 3), ("4-6", 6), ("7-9", 9), ("10+", None))
+FACET_FIELDS = ("type", "breed", "location", "status", "age_bucket")
+FACET_KEY = "type, breed, location, status, age_bucket"
+
+
+def age_bucket_sql(age):
+    """Returns an SQL expression computing the age bucket label of the `age` expression."""
+    cases = " ".join(
+        f"WHEN CAST({age} AS INTEGER) <= {bound} THEN '{label}'"
+        for label, bound in AGE_BUCKETS if bound is not None
+    )
+    return f"CASE {cases} ELSE '{AGE_BUCKETS[-1][0]}' END"
+
+
+def _key_values(row):
+    return f"{row}.type, {row}.breed, {row}.location, {row}.status, {age_bucket_sql(f'{row}.age')}"
+
+
+def _key_match(row):
+    return f"({FACET_KEY}) = ({_key_values(row)})"
+
+
+def _field_values(row):
+    return zip(FACET_FIELDS, [f"{row}.{field}" for field in FACET_FIELDS[:-1]] + [age_bucket_sql(f"{row}.age")])
+
+
+def _increment(row):
+    statements = [
+        f"INSERT INTO pet_facet_counts ({FACET_KEY}, count) VALUES ({_key_values(row)}, 1) "
+        "ON CONFLICT DO UPDATE SET count = count + 1;"
+    ]
+    for field, value in _field_values(row):
+        statements.append(
+            f"INSERT INTO pet_facet_values (facet, value, count) VALUES ('{field}', {value}, 1) "
+            "ON CONFLICT DO UPDATE SET count = count + 1;"
+        )
+    return "\n        ".join(statements)
+
+
+def _decrement(row):
+    statements = [
+        f"UPDATE pet_facet_counts SET count = count - 1 WHERE {_key_match(row)};",
+        f"DELETE FROM pet_facet_counts WHERE {_key_match(row)} AND count <= 0;",
+    ]
+    for field, value in _field_values(row):
+        match = f"facet = '{field}' AND value = {value}"
+        statements.append(f"UPDATE pet_facet_values SET count = count - 1 WHERE {match};")
+        statements.append(f"DELETE FROM pet_facet_values WHERE {match} AND count <= 0;")
+    return "\n        ".join(statements)
+
+
+# Schema for migration 8
+FACET_SCHEMA = [
+    f'''
+    CREATE TABLE IF NOT EXISTS pet_facet_counts (
+        type TEXT NOT NULL,
+        breed TEXT NOT NULL,
+        location TEXT NOT NULL,
+        status TEXT NOT NULL,
+        age_bucket TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY ({FACET_KEY})
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS pet_facet_values (
+        facet TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (facet, value)
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS pet_facets_insert AFTER INSERT ON pets BEGIN
+        {_increment("new")}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS pet_facets_delete AFTER DELETE ON pets BEGIN
+        {_decrement("old")}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS pet_facets_update AFTER UPDATE OF type, breed, location, status, age ON pets
+    WHEN ({_key_values("old")}) IS NOT ({_key_values("new")}) BEGIN
+        {_decrement("old")}
+        {_increment("new")}
+    END
+    ''',
+    f'''
+    INSERT INTO pet_facet_counts ({FACET_KEY}, count)
+    SELECT type, breed, location, status, {age_bucket_sql("age")}, COUNT(*)
+    FROM pets
+    GROUP BY 1, 2, 3, 4, 5
+    ''',
+    "INSERT INTO pet_facet_values (facet, value, count) " + " UNION ALL ".join(
+        f"SELECT '{field}', {field}, SUM(count) FROM pet_facet_counts GROUP BY {field}"
+        for field in FACET_FIELDS
+    ),
+]
+
+
+def parse_facet_filters(args):
+    """
+    Reads the selected filters from the query string.
+
+    :return: Selected values by facet field, plus `min_age` and `max_age` when given.
+    :raises ValueError: If the age bucket is unknown or an age bound is not an integer.
+    """
+    filters = {field: args.get(field) for field in FACET_FIELDS if args.get(field)}
+    buckets = [label for label, _ in AGE_BUCKETS]
+    if "age_bucket" in filters and filters["age_bucket"] not in buckets:
+        raise ValueError(f"age_bucket must be one of: {', '.join(buckets)}")
+    filters.update({bound: value for bound, value in parse_age_bounds(args).items() if value is not None})
+    return filters
+
+
+def buckets_for_ages(min_age, max_age):
+    """
+    Returns the labels of the age buckets that together hold exactly the ages
+    `min_age` to `max_age` (either may be None), or None if the range splits a bucket.
+    Ages are taken to start at 0.
+    """
+    labels = []
+    lower = 0
+    for label, upper in AGE_BUCKETS:
+        below = upper is not None and min_age is not None and upper < min_age
+        above = max_age is not None and lower > max_age
+        if not (below or above):
+            if (min_age is not None and min_age > lower) or \
+                    (max_age is not None and (upper is None or max_age < upper)):
+                return None
+            labels.append(label)
+        lower = (upper or 0) + 1
+    return labels
+
+
+def _facet_conditions(filters):
+    """
+    Turns the filters into SQL conditions.
+
+    :return: A tuple of (table to count from, [(facet, condition, binds), ...]); each
+             condition narrows every facet except its own.
+    """
+    source = "pet_facet_counts"
+    conditions = [
+        (field, f"{field} = ?", [value]) for field, value in filters.items() if field in FACET_FIELDS
+    ]
+    min_age, max_age = filters.get("min_age"), filters.get("max_age")
+    if min_age is None and max_age is None:
+        return source, conditions
+
+    labels = buckets_for_ages(min_age, max_age)
+    if labels is not None:
+        placeholders = ", ".join("?" * len(labels)) or "NULL"
+        conditions.append(("age_bucket", f"age_bucket IN ({placeholders})", labels))
+        return source, conditions
+
+    # The range splits a bucket: count the pets one by one
+    source = f"""(
+        SELECT type, breed, location, status, {age_bucket_sql("age")} AS age_bucket,
+               {AGE_KEY} AS age, 1 AS count
+        FROM pets
+    )"""
+    if min_age is not None:
+        conditions.append(("age_bucket", "age >= ?", [min_age]))
+    if max_age is not None:
+        conditions.append(("age_bucket", "age <= ?", [max_age]))
+    return source, conditions
+
+
+def fetch_facets(cursor, filters):
+    """
+    Counts pets per value of every facet in one statement.
+
+    :param filters: Selected values by facet field, each narrowing the other facets,
+                    and optional `min_age` and `max_age`, which narrow all but the
+                    age buckets.
+    :return: A tuple of ({facet: [{"value", "count"}, ...]}, total matching all filters).
+    """
+    if not filters:
+        cursor.execute("SELECT facet, value, count FROM pet_facet_values")
+        return _shape(cursor.fetchall())
+
+    source, conditions = _facet_conditions(filters)
+
+    def where(exclude=None):
+        selected = [(condition, values) for field, condition, values in conditions if field != exclude]
+        clause = " AND ".join(condition for condition, _ in selected)
+        return (f" WHERE {clause}" if clause else ""), [value for _, values in selected for value in values]
+
+    parts = []
+    binds = []
+    for field in FACET_FIELDS:
+        clause, values = where(field)
+        parts.append(f"SELECT '{field}', {field}, SUM(count) FROM {source}{clause} GROUP BY {field}")
+        binds.extend(values)
+    clause, values = where()
+    parts.append(f"SELECT 'total', NULL, SUM(count) FROM {source}{clause}")
+    binds.extend(values)
+    cursor.execute(" UNION ALL ".join(parts), binds)
+    return _shape(cursor.fetchall())
+
+
+def _shape(rows):
+    """Groups (facet, value, count) rows by facet; a 'total' row, if any, gives the total."""
+    facets = {field: [] for field in FACET_FIELDS}
+    total = None
+    for field, value, count in rows:
+        if field == "total":
+            total = count or 0
+        else:
+            facets[field].append({"value": value, "count": count})
+    if total is None:  # Unfiltered: every pet has exactly one type
+        total = sum(item["count"] for item in facets["type"])
+
+    bucket_order = {label: index for index, (label, _) in enumerate(AGE_BUCKETS)}
+    for field, values in facets.items():
+        values.sort(key=lambda item: bucket_order[item["value"]] if field == "age_bucket" else item["value"])
+    return facets, total
+
+
+def get_facets():
+    """
+    Returns pet counts per type, breed, location, status and age bucket.
+
+    Optional query parameters `type`, `breed`, `location`, `status` and
+    `age_bucket` (0-1, 2-3, 4-6, 7-9 or 10+) select filter values; every facet is
+    counted over the pets matching the other selections, and `total` over pets
+    matching all of them. `min_age` and `max_age` bound the age as in GET /pets.
+
+    ---
+    tags:
+      - Pets
+    responses:
+      200:
+        description: Counts per facet value and the total matching the selection.
+      400:
+        description: Unknown age bucket or a non-integer age bound.
+    """
+    try:
+        filters = parse_facet_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        _, cursor = connect_to_database()
+        facets, total = fetch_facets(cursor, filters)
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+
+    return jsonify({"facets": facets, "total": total}), 200
@@ -1,98 +1,142 @@
 """
 Module: favorites
 This module provides functions to add, retrieve, and remove a user's favorite pets.
+
+The user comes from the request's bearer token when one is sent (see auth.py);
+otherwise from the legacy `email` parameter.
 """
 
 import sqlite3
 from flask import request, jsonify
+from utils import connect_to_database
+from auth import require_identity
+from identity_cache import identity_cache, MISSING
+from images import attach_variants, encode_pets
+from serialization import json_object, json_response, encode_value
+from catalogue import PET_COLUMNS, parse_limit, encode_cursor, decode_cursor
+
+MAX_BULK_FAVORITES = 500
+
+
+def lookup_user_id(cursor, email):
+    """Returns the user_id registered with `email`, or None, reading through `identity_cache`."""
+    user_id = identity_cache.get(email)
+    if user_id is MISSING:
+        cursor.execute('SELECT user_id FROM users WHERE email = ?', (email,))
+        user = cursor.fetchone()
+        user_id = user[0] if user else None
+        identity_cache.put(email, user_id)
+    return user_id
+
+
+def resolve_location(cursor, sql, binds, pet_name):
+    """
+    Finds the location that completes a pet key from its name alone.
 
-DATABASE = 'database.db'
+    :param sql: A query selecting the candidate locations, given `binds`.
+    :return: A tuple of (location or None, error message or None); the location is
+             None without an error when nothing matches.
+    """
+    cursor.execute(sql + ' LIMIT 2', binds)
+    locations = [row[0] for row in cursor.fetchall()]
+    if len(locations) > 1:
+        return None, f"Several pets are named '{pet_name}'; pet_location is required"
+    return (locations[0] if locations else None), None
 
 
 def add_favorite():
     """
-    Adds a new pet to a user's favorite pets using their email and the pet's name.
+    Adds a new pet to a user's favorite pets using their email and the pet's key.
+
+    Pets are keyed by `pet_name` and `pet_location`, as in the favorites list. The
+    location may be left out while only one pet has that name.
     """
     data = request.get_json()
+    identity = require_identity()
     email = data.get("email")
     pet_name = data.get("pet_name")
+    pet_location = data.get("pet_location")
 
-    if not email or not pet_name:
+    if not (identity or email) or not pet_name:
         return jsonify({"message": "Email and Pet Name are required"}), 400
 
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
+        conn, cursor = connect_to_database()
 
-        # Get user ID by email
-        cursor.execute('SELECT user_id FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        if not user:
+        # Get user ID from the token, or by email
+        user_id = identity["uid"] if identity else lookup_user_id(cursor, email)
+        if user_id is None:
             return jsonify({"message": "User not found"}), 404
-        user_id = user[0]
 
-        # Get pet location by name
-        cursor.execute('SELECT location FROM pets WHERE name = ?', (pet_name,))
-        pet = cursor.fetchone()
-        if not pet:
+        if pet_location is None:
+            pet_location, error = resolve_location(
+                cursor, 'SELECT location FROM pets WHERE name = ?', (pet_name,), pet_name
+            )
+            if error:
+                return jsonify({"message": error}), 400
+        else:
+            cursor.execute('SELECT 1 FROM pets WHERE name = ? AND location = ?', (pet_name, pet_location))
+            if cursor.fetchone() is None:
+                pet_location = None
+        if pet_location is None:
             return jsonify({"message": "Pet not found"}), 404
-        pet_location = pet[0]
-
-        # Check if the pet is already in favorites
-        cursor.execute(
-            'SELECT * FROM favorites WHERE user_id = ? AND pet_name = ? AND pet_location = ?',
-            (user_id, pet_name, pet_location)
-        )
-        if cursor.fetchone():
-            return jsonify({"message": "This pet is already in your favorites"}), 409
 
-        # Add to favorites
+        # Add to favorites; the unique key rejects duplicates, even from concurrent requests
         cursor.execute(
-            'INSERT INTO favorites (user_id, pet_name, pet_location) VALUES (?, ?, ?)',
+            'INSERT INTO favorites (user_id, pet_name, pet_location) VALUES (?, ?, ?) '
+            'ON CONFLICT DO NOTHING',
             (user_id, pet_name, pet_location)
         )
         conn.commit()
+        if cursor.rowcount == 0:
+            return jsonify({"message": "This pet is already in your favorites"}), 409
     except sqlite3.Error as e:
         return jsonify({"message": f"Database error: {str(e)}"}), 500
-    finally:
-        conn.close()
 
     return jsonify({"message": "Pet added to favorites"}), 200
 
 
 def remove_favorite():
     """
-    Removes a pet from a user's favorite pets using their email and the pet's name.
+    Removes a pet from a user's favorite pets using their email and the pet's key.
+
+    As when adding, `pet_location` may be left out while only one of the user's
+    favorites has that name.
     """
     data = request.get_json()
+    identity = require_identity()
     email = data.get("email")
     pet_name = data.get("pet_name")
+    pet_location = data.get("pet_location")
 
-    if not email or not pet_name:
+    if not (identity or email) or not pet_name:
         return jsonify({"message": "Email and Pet Name are required"}), 400
 
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
+        conn, cursor = connect_to_database()
 
-        # Get user ID by email
-        cursor.execute('SELECT user_id FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        if not user:
+        # Get user ID from the token, or by email
+        user_id = identity["uid"] if identity else lookup_user_id(cursor, email)
+        if user_id is None:
             return jsonify({"message": "User not found"}), 404
-        user_id = user[0]
+
+        if pet_location is None:
+            pet_location, error = resolve_location(
+                cursor, 'SELECT pet_location FROM favorites WHERE user_id = ? AND pet_name = ?',
+                (user_id, pet_name), pet_name
+            )
+            if error:
+                return jsonify({"message": error}), 400
 
         # Remove from favorites
         cursor.execute(
-            'DELETE FROM favorites WHERE user_id = ? AND pet_name = ?',
-            (user_id, pet_name)
+            'DELETE FROM favorites WHERE user_id = ? AND pet_name = ? AND pet_location = ?',
+            (user_id, pet_name, pet_location)
         )
         conn.commit()
         rows_deleted = cursor.rowcount
     except sqlite3.Error as e:
         return jsonify({"message": f"Database error: {str(e)}"}), 500
-    finally:
-        conn.close()
 
     if rows_deleted == 0:
         return jsonify({"message": "Pet not found in favorites"}), 404
@@ -103,49 +147,147 @@ def remove_favorite():
 def get_favorites():
     """
     Retrieves a list of a user's favorite pets using their email.
+
+    The user and their favorite pets are resolved in one query. Optional `limit`
+    and `cursor` query parameters page through long lists, in which case the
+    response also carries `next_cursor`.
     """
+    identity = require_identity()
     email = request.args.get("email")
 
-    if not email:
+    if not (identity or email):
         return jsonify({"message": "Email is required"}), 400
 
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
+        limit = parse_limit(request.args.get("limit"))
+        token = request.args.get("cursor")
+        after = decode_cursor(token, "favorites", 1)[0] if token else 0
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
-        # Get user ID by email
-        cursor.execute('SELECT user_id FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        if not user:
+    # Prefer a known user_id from the token or the identity cache over the email
+    user_id = identity["uid"] if identity else identity_cache.get(email)
+    if user_id is None:
+        return jsonify({"message": "User not found"}), 404  # Recently looked up and unknown
+
+    try:
+        _, cursor = connect_to_database()
+        found, rows, next_cursor = fetch_favorite_rows(
+            cursor, None if user_id is MISSING else user_id, email, after, limit
+        )
+        if not found:
             return jsonify({"message": "User not found"}), 404
-        user_id = user[0]
-
-        # Retrieve favorite pets with all fields, including description
-        cursor.execute('''
-        SELECT pets.name, pets.age, pets.description, pets.breed, 
-               pets.picture_url, pets.status, pets.type, pets.location
-        FROM favorites
-        JOIN pets ON favorites.pet_name = pets.name AND favorites.pet_location = pets.location
-        WHERE favorites.user_id = ?
-        ''', (user_id,))
-        favorites = cursor.fetchall()
-
-        favorite_pets = [
-            {
-                "name": pet[0],
-                "age": pet[1],
-                "description": pet[2],
-                "breed": pet[3],
-                "picture_url": pet[4],
-                "status": pet[5],
-                "type": pet[6],
-                "location": pet[7],
-            }
-            for pet in favorites
-        ]
+        members = {"favorites": encode_pets(cursor, rows)}
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+
+    if limit is not None:
+        members["next_cursor"] = encode_value(next_cursor)
+    return json_response(json_object(members))
+
+
+def fetch_favorites(cursor, user_id, email=None, after=0, limit=None):
+    """
+    Fetches a user's favorite pets, identified by user_id or else by email, in one query.
+
+    Looking up by email records the result in `identity_cache`.
+
+    :return: A tuple of (whether the user exists, favorite pets, next_cursor).
+    """
+    found, rows, next_cursor = fetch_favorite_rows(cursor, user_id, email, after, limit)
+    favorite_pets = [{column: row[column] for column in PET_COLUMNS} for row in rows]
+    attach_variants(cursor, favorite_pets)
+    return found, favorite_pets, next_cursor
+
+
+def fetch_favorite_rows(cursor, user_id, email=None, after=0, limit=None):
+    """
+    Like `fetch_favorites`, but returns the pets as rows starting with PET_COLUMNS.
+
+    :return: A tuple of (whether the user exists, pet rows, next_cursor).
+    """
+    columns = ", ".join(f"pets.{column}" for column in PET_COLUMNS)
+    sql = f'''
+        SELECT {columns}, users.user_id, favorites.favorite_id
+        FROM users
+        LEFT JOIN favorites
+               ON favorites.user_id = users.user_id AND favorites.favorite_id > ?
+        LEFT JOIN pets
+               ON pets.name = favorites.pet_name AND pets.location = favorites.pet_location
+        WHERE {"users.email" if user_id is None else "users.user_id"} = ?
+        ORDER BY favorites.favorite_id
+    '''
+    binds = [after, email if user_id is None else user_id]
+    if limit is not None:
+        # Fetch one extra row to learn whether another page exists
+        sql += " LIMIT ?"
+        binds.append(limit + 1)
+
+    cursor.execute(sql, binds)
+    rows = cursor.fetchall()
+    if user_id is None:
+        identity_cache.put(email, rows[0]["user_id"] if rows else None)
+    if not rows:
+        return False, [], None
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("favorites", [rows[-1]["favorite_id"]])
+
+    # A user without (further) favorites yields a single row of NULLs from the LEFT JOIN,
+    # and favorites of since-removed pets have no pet columns
+    return True, [row for row in rows if row["name"] is not None], next_cursor
+
+
+def bulk_update_favorites():
+    """
+    Adds and removes many favorite pets for a user in a single transaction.
+
+    The JSON body holds the user's `email` (unless a token is sent) and optional `add` and `remove` lists of
+    pet keys, each an object with `name` and `location`. Pets that do not exist or
+    are already favorites are skipped when adding.
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"message": "Request body must be a JSON object"}), 400
+    identity = require_identity()
+    email = data.get("email")
+    to_add = data.get("add") or []
+    to_remove = data.get("remove") or []
+
+    if not (isinstance(to_add, list) and isinstance(to_remove, list)):
+        return jsonify({"message": "add and remove must be lists of pets"}), 400
+    if not (identity or email) or not (to_add or to_remove):
+        return jsonify({"message": "Email and at least one pet to add or remove are required"}), 400
+
+    keys = to_add + to_remove
+    if len(keys) > MAX_BULK_FAVORITES:
+        return jsonify({"message": f"At most {MAX_BULK_FAVORITES} pets can be updated at once"}), 400
+    if not all(isinstance(key, dict) and key.get("name") and key.get("location") for key in keys):
+        return jsonify({"message": "Each pet requires a name and location"}), 400
+
+    try:
+        conn, cursor = connect_to_database()
+        user_id = identity["uid"] if identity else lookup_user_id(cursor, email)
+        if user_id is None:
+            return jsonify({"message": "User not found"}), 404
+
+        cursor.executemany(
+            '''
+            INSERT OR IGNORE INTO favorites (user_id, pet_name, pet_location)
+            SELECT ?, name, location FROM pets WHERE name = ? AND location = ?
+            ''',
+            [(user_id, key["name"], key["location"]) for key in to_add]
+        )
+        added = max(cursor.rowcount, 0)
+        cursor.executemany(
+            'DELETE FROM favorites WHERE user_id = ? AND pet_name = ? AND pet_location = ?',
+            [(user_id, key["name"], key["location"]) for key in to_remove]
+        )
+        removed = max(cursor.rowcount, 0)
+        conn.commit()
     except sqlite3.Error as e:
         return jsonify({"message": f"Database error: {str(e)}"}), 500
-    finally:
-        conn.close()
 
-    return jsonify({"favorites": favorite_pets}), 200
+    return jsonify({"message": "Favorites updated", "added": added, "removed": removed}), 200
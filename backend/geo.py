@@ -0,0 +1,238 @@
+"""
+Module: geo
+This module answers "pets near a place" queries.
+
+Pet locations are free-text "City, ST" strings. They are resolved to coordinates
+through the bundled `gazetteer.csv`, loaded into the `gazetteer` table by
+migration 4. Every place is indexed in the `places_geo` R*Tree (migration 9), and
+pets are indexed by location, with their rowids in order, by `idx_pets_location_rowid`.
+
+Since many pets share a handful of places, a search works per place rather than
+per pet: the R*Tree returns the places inside the bounding box of the radius (two
+boxes when it crosses the ±180° meridian), the exact great-circle distance is
+computed once for each of them, and pets are then read from the location index
+place by place, nearest first and by rowid within a place, until the page is
+full. The cost depends on the number of places in range and the page size, not
+on how many pets live there.
+
+To add or correct places, edit `gazetteer.csv` and run `python geo.py`.
+"""
+
+import csv
+import itertools
+import math
+import os
+import sqlite3
+import sys
+from flask import request, jsonify
+
+from catalogue import PET_COLUMNS, parse_limit, encode_cursor, decode_cursor
+from connection_pool import DATABASE, create_connection
+from utils import connect_to_database
+from images import attach_variants
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+DEFAULT_RADIUS_MILES = 25.0
+MAX_RADIUS_MILES = 500.0
+DEFAULT_PAGE_SIZE = 20
+
+
+def upsert_places(conn, path=GAZETTEER_PATH):
+    """
+    Upserts places from a CSV file with `place`, `latitude` and `longitude` columns.
+
+    Does not commit, so it can run inside a migration.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        conn.executemany(
+            '''
+            INSERT INTO gazetteer (place, latitude, longitude) VALUES (?, ?, ?)
+            ON CONFLICT (place) DO UPDATE SET
+                latitude = excluded.latitude, longitude = excluded.longitude
+            ''',
+            (
+                (row["place"].strip(), float(row["latitude"]), float(row["longitude"]))
+                for row in csv.DictReader(handle)
+            )
+        )
+
+
+def index_places(conn):
+    """Rebuilds `places_geo` from the gazetteer. Does not commit."""
+    conn.execute('DELETE FROM places_geo')
+    conn.execute('''
+        INSERT INTO places_geo (min_lat, max_lat, min_lon, max_lon, place)
+        SELECT latitude, latitude, longitude, longitude, place FROM gazetteer
+    ''')
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points in miles."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(min(1.0, a)))
+
+
+def bounding_boxes(latitude, longitude, radius):
+    """
+    Returns the (min_lat, max_lat, min_lon, max_lon) boxes enclosing a circle of `radius` miles.
+
+    A circle crossing the ±180° meridian gets one box on each side of it.
+    """
+    dlat = radius / MILES_PER_DEGREE_LATITUDE
+    min_lat, max_lat = latitude - dlat, latitude + dlat
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat < 1e-6 else dlat / cos_lat
+    if dlon >= 180.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    min_lon, max_lon = longitude - dlon, longitude + dlon
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, -180.0, max_lon), (min_lat, max_lat, min_lon + 360.0, 180.0)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def nearby_places(cursor, latitude, longitude, radius):
+    """Returns (distance_miles, place) pairs for the places within `radius` miles, nearest first."""
+    distances = {}
+    for box in bounding_boxes(latitude, longitude, radius):
+        cursor.execute(
+            '''
+            SELECT gazetteer.place, latitude, longitude
+            FROM places_geo JOIN gazetteer ON gazetteer.place = places_geo.place
+            WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?
+            ''',
+            box
+        )
+        for place, place_latitude, place_longitude in cursor.fetchall():
+            distance = haversine_miles(latitude, longitude, place_latitude, place_longitude)
+            if distance <= radius:
+                distances[place] = distance
+    return sorted((distance, place) for place, distance in distances.items())
+
+
+def nearest_pet_ids(cursor, latitude, longitude, radius, limit, after=None):
+    """
+    Finds the pets closest to a point.
+
+    :param after: Optional (distance, rowid) of the last result on the previous page.
+    :return: A list of (distance_miles, rowid) pairs, nearest first, at most `limit` long.
+    """
+    results = []
+    # Places at the same distance are read together, so their pets stay in rowid order
+    for distance, group in itertools.groupby(nearby_places(cursor, latitude, longitude, radius),
+                                             key=lambda pair: pair[0]):
+        if after is not None and distance < after[0]:
+            continue
+        places = [place for _, place in group]
+        cursor.execute(
+            f'''
+            SELECT rowid FROM pets INDEXED BY idx_pets_location_rowid
+            WHERE location COLLATE NOCASE IN ({", ".join("?" * len(places))}) AND rowid > ?
+            ORDER BY rowid LIMIT ?
+            ''',
+            (*places, after[1] if after is not None and distance == after[0] else 0, limit - len(results))
+        )
+        results.extend((distance, rowid) for (rowid,) in cursor.fetchall())
+        if len(results) >= limit:
+            break
+    return results
+
+
+def parse_origin(cursor, args):
+    """
+    Resolves the search origin from `lat`/`lon` or a `city` query parameter.
+
+    :return: A (latitude, longitude) tuple, or None if the city is unknown.
+    :raises ValueError: If neither is given or the coordinates are invalid.
+    """
+    city = args.get("city")
+    if city:
+        cursor.execute(
+            'SELECT latitude, longitude FROM gazetteer WHERE place = ?', (city.strip(),)
+        )
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+
+    try:
+        latitude, longitude = float(args["lat"]), float(args["lon"])
+    except (KeyError, ValueError) as exc:
+        raise ValueError("Either city or numeric lat and lon are required") from exc
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+    return latitude, longitude
+
+
+def find_nearby_pets():
+    """
+    Lists pets within a radius of a point, nearest first.
+
+    Query parameters: `lat` and `lon`, or `city` ("City, ST"); `radius` in miles
+    (default 25); `limit` (default 20) and the `cursor` returned as `next_cursor`
+    by the previous page. Each result carries its `distance_miles`.
+    """
+    _, cursor = connect_to_database()
+    try:
+        origin = parse_origin(cursor, request.args)
+        radius = float(request.args.get("radius", DEFAULT_RADIUS_MILES))
+        if not 0 < radius <= MAX_RADIUS_MILES:
+            raise ValueError(f"radius must be greater than 0 and at most {MAX_RADIUS_MILES:g}")
+        limit = parse_limit(request.args.get("limit")) or DEFAULT_PAGE_SIZE
+        token = request.args.get("cursor")
+        after = tuple(decode_cursor(token, "nearby", 2)) if token else None
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+    if origin is None:
+        return jsonify({"message": "Unknown city"}), 404
+
+    try:
+        # One extra result tells whether another page exists
+        nearest = nearest_pet_ids(cursor, *origin, radius, limit + 1, after)
+        page = nearest[:limit]
+        rows = {}
+        if page:
+            columns = ", ".join(PET_COLUMNS)
+            cursor.execute(
+                f'SELECT rowid, {columns} FROM pets WHERE rowid IN ({", ".join("?" * len(page))})',
+                [rowid for _, rowid in page]
+            )
+            rows = {row[0]: row for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+
+    pets = [
+        {
+            **{column: rows[rowid][column] for column in PET_COLUMNS},
+            "distance_miles": round(distance, 2),
+        }
+        for distance, rowid in page if rowid in rows
+    ]
+    try:
+        attach_variants(cursor, pets)
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+    next_cursor = encode_cursor("nearby", list(page[-1])) if len(nearest) > limit else None
+    return jsonify({
+        "origin": {"latitude": origin[0], "longitude": origin[1]},
+        "pets": pets,
+        "next_cursor": next_cursor,
+    }), 200
+
+
+if __name__ == "__main__":
+    # Reload the gazetteer (optionally from another CSV) and re-index places
+    connection = create_connection(DATABASE)
+    try:
+        upsert_places(connection, sys.argv[1] if len(sys.argv) > 1 else GAZETTEER_PATH)
+        index_places(connection)
+        connection.commit()
+    finally:
+        connection.close()
+    print("Gazetteer loaded.")
@@ -0,0 +1,72 @@
+"""
+gunicorn settings for serving the backend in production:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+- WEB_WORKERS prefork worker processes (default: one per CPU), each serving
+  WEB_THREADS requests at once (default 4).
+- The app is imported once in the master before forking (preload), so every worker
+  starts with the code loaded and the schema migrated. Each worker then opens its
+  own database connections and warms its caches (wsgi.warm_up) before it accepts
+  connections.
+- On SIGTERM, workers stop accepting, finish in-flight requests for up to
+  GRACEFUL_TIMEOUT seconds and release their resources (wsgi.shutdown).
+- Unless RUN_JOBS=0, the master also runs `jobs.py` as a child process for the
+  background jobs, and stops it on exit.
+- Worker metrics are merged through METRICS_DIR, which defaults to a temporary
+  folder that is emptied on startup.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = os.environ.get("PORT", "5000")
+
+# Must be set before the app (and so metrics.py) is imported
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"petadoption-metrics-{PORT}"))
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{PORT}"
+workers = int(os.environ.get("WEB_WORKERS", str(os.cpu_count() or 1)))
+threads = int(os.environ.get("WEB_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = 5
+accesslog = os.environ.get("ACCESS_LOG")  # e.g. "-" for stdout; off by default
+RUN_JOBS = os.environ.get("RUN_JOBS", "1") == "1"
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    import metrics  # pylint: disable=import-outside-toplevel
+    metrics.clear_directory()
+
+
+def when_ready(server):
+    if RUN_JOBS:
+        server.jobs_process = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, "jobs.py")])
+        server.log.info("Started the job worker (pid %s)", server.jobs_process.pid)
+
+
+def post_worker_init(worker):
+    from wsgi import warm_up  # pylint: disable=import-outside-toplevel
+    warm_up(threads)
+    worker.log.info("Worker %s warmed up", worker.pid)
+
+
+def worker_exit(server, worker):  # pylint: disable=unused-argument
+    from wsgi import shutdown  # pylint: disable=import-outside-toplevel
+    shutdown()
+
+
+def on_exit(server):
+    jobs_process = getattr(server, "jobs_process", None)
+    if jobs_process is not None:
+        jobs_process.terminate()  # jobs.py finishes its current jobs on SIGTERM
+        try:
+            jobs_process.wait(graceful_timeout)
+        except subprocess.TimeoutExpired:
+            jobs_process.kill()
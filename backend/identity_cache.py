@@ -0,0 +1,92 @@
+"""
+Module: identity_cache
+This module provides an in-process LRU cache of email -> user_id lookups.
+
+`favorites.lookup_user_id` reads through it, and register and login fill it with
+the ids they already know. Unknown emails are cached as misses too, but only for
+a few seconds, so probing many made-up addresses stays off the database while a
+user who has just registered is never locked out for long.
+
+Entries are bounded by count and age. No route deletes a user or changes an
+email, so the only way a mapping goes stale is a database reset, and
+`database.initialize_database` clears the cache. Code that starts deleting users
+or changing emails will have to forget their entries here as well; other worker
+processes would still keep a stale mapping for up to the TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.environ.get("IDENTITY_CACHE_TTL", "300"))
+NEGATIVE_TTL = float(os.environ.get("IDENTITY_CACHE_NEGATIVE_TTL", "5"))
+
+MISSING = object()  # Returned by `get` when the email is not cached at all
+
+
+class IdentityCache:
+    """A size- and TTL-bounded LRU cache mapping emails to user ids (or None)."""
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # email -> (user_id or None, expires_at)
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0, "negative_hits": 0, "misses": 0,
+            "invalidations": 0, "evictions": 0, "expired": 0,
+        }
+
+    def get(self, email):
+        """
+        Looks up an email.
+
+        :return: The cached user_id, None for a cached unknown email, or MISSING.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[1] <= now:
+                del self._entries[email]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(email)
+            self._stats["hits" if entry[0] is not None else "negative_hits"] += 1
+            return entry[0]
+
+    def put(self, email, user_id):
+        """Caches the user_id for `email`; None records that no such user exists."""
+        ttl = self.ttl if user_id is not None else self.negative_ttl
+        with self._lock:
+            self._entries[email] = (user_id, time.monotonic() + ttl)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["ttl"] = self.ttl
+            stats["negative_ttl"] = self.negative_ttl
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+identity_cache = IdentityCache()
@@ -0,0 +1,253 @@
+"""
+Module: images
+This module generates resized variants of pet pictures and attaches them to pet JSON.
+
+When `add_pet` or `edit_pet` sets a `picture_url`, an `image_variants` job is queued
+(see jobs.py). The job reads the original from IMAGE_SOURCE_DIR, renders it at each
+of VARIANT_WIDTHS narrower than the original in WebP and JPEG, and writes the files
+to IMAGE_VARIANT_DIR under names derived from the original's content hash, so a
+variant URL never changes meaning and can be cached forever. The generated URLs are
+recorded in the `image_variants` table (migration 7), and pet listings gain a
+`picture_variants` list of `{"url", "width", "format"}` once they exist.
+
+Variants are recorded with the modification time and size of the original they
+were made from (migration 11), so replacing the file behind a URL queues a new job
+at the next add or edit, while an unchanged picture, or one whose job is still
+queued or running, is not queued again. Cached listings pick up new variants
+through the catalogue change log (see catalogue_cache.py).
+
+Pillow is an optional dependency: without it no jobs are queued and pets are served
+with their original `picture_url` only.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from catalogue import PET_COLUMNS
+from serialization import RowEncoder
+from uploads import FILE_MODE, UPLOAD_DIR, UPLOAD_URL_PREFIX, send_immutable
+from jobs import register_handler, enqueue, PermanentJobError
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - exercised only where Pillow is missing
+    Image = None
+
+logger = logging.getLogger("images")
+
+JOB_KIND = "image_variants"
+PET_ENCODER = RowEncoder(PET_COLUMNS)
+PICTURE_INDEX = PET_COLUMNS.index("picture_url")
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_SOURCE_DIR = os.environ.get(
+    "IMAGE_SOURCE_DIR", os.path.join(BACKEND_DIR, "..", "frontend", "public")
+)
+IMAGE_VARIANT_DIR = os.environ.get("IMAGE_VARIANT_DIR", os.path.join(BACKEND_DIR, "media", "variants"))
+VARIANT_URL_PREFIX = "/images/variants/"
+VARIANT_WIDTHS = (320, 640, 1024)
+FORMATS = {
+    # format: (Pillow format name, file extension, save options)
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+CONCURRENCY = int(os.environ.get("IMAGE_VARIANT_CONCURRENCY", "2"))
+
+
+def pillow_available():
+    """Tells whether variants can be generated in this process."""
+    return Image is not None
+
+
+def resolve_source(picture_url, source_dir=None):
+    """
+    Maps a picture URL to a file: uploaded images ("/images/<hash>.jpg") live in
+    UPLOAD_DIR, other paths such as "/jay.jpg" inside IMAGE_SOURCE_DIR.
+
+    :return: The absolute path, or None for remote URLs and paths escaping the folder.
+    """
+    if not picture_url or "://" in picture_url or picture_url.startswith("//"):
+        return None
+    if picture_url.startswith(UPLOAD_URL_PREFIX) and source_dir is None:
+        source_dir = UPLOAD_DIR
+        picture_url = picture_url[len(UPLOAD_URL_PREFIX):]
+    root = os.path.realpath(source_dir or IMAGE_SOURCE_DIR)
+    path = os.path.realpath(os.path.join(root, picture_url.lstrip("/")))
+    return path if path.startswith(root + os.sep) else None
+
+
+def source_stamp(path):
+    """Identifies the current content of a file by its modification time and size."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def queue_variants(conn, picture_url):
+    """
+    Queues variant generation for a picture file whose variants are missing or
+    were made from an earlier version of it. Does not commit.
+
+    :return: The job_id, or None when nothing was queued.
+    """
+    if not pillow_available():
+        return None
+    source_path = resolve_source(picture_url)
+    if source_path is None or not os.path.isfile(source_path):
+        return None
+    if conn.execute(
+        'SELECT 1 FROM image_variants WHERE picture_url = ? AND source_stamp = ? LIMIT 1',
+        (picture_url, source_stamp(source_path))
+    ).fetchone():
+        return None
+    if conn.execute(
+        '''
+        SELECT 1 FROM jobs
+        WHERE kind = ? AND status IN ('queued', 'running') AND json_extract(payload, '$.picture_url') = ?
+        LIMIT 1
+        ''',
+        (JOB_KIND, picture_url)
+    ).fetchone():
+        return None  # The pending job reads the file as it is when it runs
+    return enqueue(conn, JOB_KIND, {"picture_url": picture_url})
+
+
+def target_widths(original_width):
+    """Returns the variant widths for an image, never upscaling."""
+    widths = [width for width in VARIANT_WIDTHS if width < original_width]
+    return widths or [original_width]
+
+
+def _save_atomically(image, path, pillow_format, options):
+    """Writes an image next to its final path and renames it into place."""
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as output:
+            image.save(output, pillow_format, **options)
+        os.chmod(temporary, FILE_MODE)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def render_variants(source_path, output_dir=None):
+    """
+    Renders every width and format of one image, skipping files that already exist.
+
+    :return: A list of (width, format, filename) tuples.
+    """
+    output_dir = output_dir or IMAGE_VARIANT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    with open(source_path, "rb") as handle:
+        digest = hashlib.sha256(handle.read()).hexdigest()[:16]
+
+    variants = []
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        for width in target_widths(image.width):
+            height = max(1, round(image.height * width / image.width))
+            resized = None
+            for variant_format, (pillow_format, extension, options) in FORMATS.items():
+                filename = f"{digest}-{width}w.{extension}"
+                path = os.path.join(output_dir, filename)
+                if not os.path.exists(path):
+                    if resized is None:
+                        resized = image.resize((width, height), Image.LANCZOS)
+                    output = resized
+                    if pillow_format == "JPEG" and output.mode not in ("RGB", "L"):
+                        output = output.convert("RGB")
+                    _save_atomically(output, path, pillow_format, options)
+                variants.append((width, variant_format, filename))
+    return variants
+
+
+def give_up(conn, payload, error):
+    logger.error("Could not generate variants of %s: %r", payload["picture_url"], error)
+
+
+@register_handler(JOB_KIND, concurrency=CONCURRENCY, on_give_up=give_up)
+def generate_variants(conn, payload):
+    """Job handler: renders a picture's variants and records their URLs."""
+    if not pillow_available():
+        raise PermanentJobError("Pillow is not installed")
+    picture_url = payload["picture_url"]
+    source_path = resolve_source(picture_url)
+    if source_path is None or not os.path.isfile(source_path):
+        raise PermanentJobError(f"No image file for {picture_url}")
+    try:
+        stamp = source_stamp(source_path)  # Before reading, so a file replaced meanwhile is redone
+        variants = render_variants(source_path)
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise PermanentJobError(f"Unreadable image {picture_url}: {exc}") from exc
+
+    # Triggers log the change, so every worker's catalogue cache drops listings without them
+    conn.execute('DELETE FROM image_variants WHERE picture_url = ?', (picture_url,))
+    conn.executemany(
+        'INSERT INTO image_variants (picture_url, width, format, url, source_stamp) VALUES (?, ?, ?, ?, ?)',
+        [
+            (picture_url, width, variant_format, VARIANT_URL_PREFIX + filename, stamp)
+            for width, variant_format, filename in variants
+        ]
+    )
+
+
+def variants_by_url(cursor, urls):
+    """
+    Looks up the generated variants of many pictures in one query.
+
+    :return: {picture_url: [{"url", "width", "format"}, ...]} for pictures that have variants.
+    """
+    urls = sorted(set(urls))
+    if not urls:
+        return {}
+    cursor.execute(
+        '''
+        SELECT picture_url, width, format, url FROM image_variants
+        WHERE picture_url IN (SELECT value FROM json_each(?))
+        ORDER BY picture_url, format, width
+        ''',
+        (json.dumps(urls),)
+    )
+    variants = {}
+    for row in cursor.fetchall():
+        variants.setdefault(row["picture_url"], []).append(
+            {"url": row["url"], "width": row["width"], "format": row["format"]}
+        )
+    return variants
+
+
+def attach_variants(cursor, pets):
+    """
+    Adds `picture_variants` to each pet dict whose picture has generated variants.
+
+    Runs one query for the whole list. Pets without variants are left unchanged.
+    """
+    variants = variants_by_url(cursor, [pet["picture_url"] for pet in pets if pet.get("picture_url")])
+    for pet in pets:
+        if pet.get("picture_url") in variants:
+            pet["picture_variants"] = variants[pet["picture_url"]]
+    return pets
+
+
+def encode_pets(cursor, rows):
+    """
+    Encodes pet rows as a JSON array, with `picture_variants` like `attach_variants`.
+
+    :param rows: Rows whose leading values are `catalogue.PET_COLUMNS`.
+    :return: The JSON text, identical to `jsonify` of the pet dicts.
+    """
+    variants = variants_by_url(cursor, [row[PICTURE_INDEX] for row in rows if row[PICTURE_INDEX]])
+    if not variants:
+        return PET_ENCODER.encode_rows(rows)
+    return PET_ENCODER.encode_rows(rows, lambda row: (
+        {"picture_variants": variants[row[PICTURE_INDEX]]} if row[PICTURE_INDEX] in variants else None
+    ))
+
+
+def serve_variant(filename):
+    """
+    Serves a generated variant. Names are content-hashed, so responses are immutable.
+    """
+    return send_immutable(IMAGE_VARIANT_DIR, filename)
@@ -0,0 +1,261 @@
+"""
+Module: jobs
+This module provides a durable job queue stored in SQLite and the worker that runs it.
+
+Jobs live in the `jobs` table (migration 6), so they survive restarts and can be
+enqueued in the same transaction as the row that needs them. A worker claims a
+job with a single UPDATE that also leases it: a job whose worker died becomes
+claimable again once the lease runs out. Failed attempts are retried with
+exponential backoff and jitter until `max_attempts`, after which the job is
+marked failed and the handler's `on_give_up` callback runs.
+
+Handlers are registered per job kind with a concurrency limit, which caps how
+many jobs of that kind one worker process runs at once (e.g. to respect a third
+party's rate limits). A worker thread claims the oldest due job among the kinds
+that have a free slot, so a backlog of one kind cannot starve the others.
+
+Usage:
+    python jobs.py    # Run a standalone worker for every registered job kind
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from connection_pool import DATABASE, create_connection
+
+WORKER_THREADS = int(os.environ.get("JOB_WORKER_THREADS", "4"))
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0  # Seconds before the first retry
+BACKOFF_MAX = 600.0
+
+HANDLERS = {}
+
+logger = logging.getLogger("jobs")
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job fails at once."""
+
+
+class JobHandler:
+    """A registered job kind: the function to run and its limits."""
+
+    def __init__(self, kind, func, concurrency, on_give_up):
+        self.kind = kind
+        self.func = func
+        self.on_give_up = on_give_up
+        self.slots = threading.BoundedSemaphore(concurrency)
+
+
+def register_handler(kind, concurrency=WORKER_THREADS, on_give_up=None):
+    """
+    Decorator registering `func(conn, payload)` as the handler for `kind` jobs.
+
+    The handler may write through `conn`; its writes commit together with the
+    job's completion. `on_give_up(conn, payload, error)` runs, in the same way,
+    when the job has failed for good.
+    """
+    def decorator(func):
+        HANDLERS[kind] = JobHandler(kind, func, concurrency, on_give_up)
+        return func
+    return decorator
+
+
+def enqueue(conn, kind, payload, max_attempts=MAX_ATTEMPTS, delay=0):
+    """
+    Adds a job. Does not commit, so the job is created atomically with the
+    caller's own changes.
+
+    :return: The new job_id.
+    """
+    cursor = conn.execute(
+        'INSERT INTO jobs (kind, payload, max_attempts, run_at) VALUES (?, ?, ?, ?)',
+        (kind, json.dumps(payload), max_attempts, time.time() + delay)
+    )
+    return cursor.lastrowid
+
+
+def backoff_delay(attempts):
+    """Returns a randomized delay before retrying after `attempts` failed attempts."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1)))
+
+
+def claim_job(conn, kinds, lease=LEASE_SECONDS):
+    """
+    Atomically claims the oldest runnable job of any of `kinds`, leasing it for `lease` seconds.
+
+    :param kinds: A job kind, or a list of them.
+    :return: The claimed job row, or None when there is nothing to do.
+    """
+    kinds = [kinds] if isinstance(kinds, str) else list(kinds)
+    now = time.time()
+    row = conn.execute(
+        f'''
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, run_at = ?, updated_at = ?
+        WHERE job_id = (
+            SELECT job_id FROM jobs
+            WHERE status IN ('queued', 'running') AND kind IN ({", ".join("?" * len(kinds))}) AND run_at <= ?
+            ORDER BY run_at, job_id
+            LIMIT 1
+        )
+        RETURNING job_id, kind, payload, attempts, max_attempts
+        ''',
+        (now + lease, now, *kinds, now)
+    ).fetchone()
+    conn.commit()
+    return row
+
+
+def run_job(conn, handler, job):
+    """Runs a claimed job and records its outcome."""
+    payload = json.loads(job["payload"])
+    try:
+        handler.func(conn, payload)
+        conn.execute(
+            "UPDATE jobs SET status = 'done', last_error = NULL, updated_at = ? WHERE job_id = ?",
+            (time.time(), job["job_id"])
+        )
+        conn.commit()
+        return
+    except Exception as exc:  # pylint: disable=broad-except
+        conn.rollback()
+        error = exc
+
+    now = time.time()
+    if isinstance(error, PermanentJobError) or job["attempts"] >= job["max_attempts"]:
+        if handler.on_give_up is not None:
+            handler.on_give_up(conn, payload, error)
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = ? WHERE job_id = ?",
+            (repr(error), now, job["job_id"])
+        )
+    else:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', last_error = ?, run_at = ?, updated_at = ? WHERE job_id = ?",
+            (repr(error), now + backoff_delay(job["attempts"]), now, job["job_id"])
+        )
+    conn.commit()
+
+
+def job_stats(conn):
+    """Returns the number of jobs per kind and status."""
+    stats = {}
+    for kind, status, count in conn.execute(
+        'SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status'
+    ):
+        stats.setdefault(kind, {})[status] = count
+    return stats
+
+
+class JobWorker:
+    """A pool of threads that claim and run jobs until stopped."""
+
+    def __init__(self, database=DATABASE, threads=WORKER_THREADS, poll_interval=POLL_INTERVAL,
+                 kinds=None):
+        self.database = database
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _handlers(self):
+        return [handler for kind, handler in HANDLERS.items() if self.kinds is None or kind in self.kinds]
+
+    def run_once(self, conn):
+        """
+        Claims and runs at most one job, respecting each kind's concurrency limit.
+
+        The job is the oldest due one among the kinds with a free slot, whatever its kind.
+
+        :return: True if a job was run.
+        """
+        # Hold a slot of every kind that has one free until the claim decides which is used
+        held = {handler.kind: handler for handler in self._handlers() if handler.slots.acquire(blocking=False)}
+        if not held:
+            return False
+        try:
+            job = claim_job(conn, list(held))
+        except BaseException:
+            for handler in held.values():
+                handler.slots.release()
+            raise
+        for kind, handler in held.items():
+            if job is None or kind != job["kind"]:
+                handler.slots.release()
+        if job is None:
+            return False
+        handler = held[job["kind"]]
+        try:
+            run_job(conn, handler, job)
+        finally:
+            handler.slots.release()
+        return True
+
+    def run_until_idle(self):
+        """Runs jobs on the calling thread until none is runnable; handy in tests and scripts."""
+        conn = create_connection(self.database)
+        try:
+            while self.run_once(conn):
+                pass
+        finally:
+            conn.close()
+
+    def _loop(self):
+        conn = create_connection(self.database)
+        try:
+            while not self._stop.is_set():
+                try:
+                    ran = self.run_once(conn)
+                except Exception:  # pylint: disable=broad-except
+                    # Keep the thread alive, e.g. through a failing on_give_up or a locked database
+                    logger.exception("Job worker error")
+                    conn.rollback()
+                    ran = False
+                if not ran:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            conn.close()
+
+    def start(self):
+        """Starts the worker threads in the background."""
+        self._stop.clear()
+        for number in range(self.threads):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Asks the threads to finish their current job and waits for them."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+if __name__ == "__main__":
+    import signal  # pylint: disable=import-outside-toplevel
+    # Importing the job modules registers their handlers on the importable `jobs`
+    # module rather than on this script's `__main__`, so the worker must come from there
+    import background_checks  # noqa: F401  pylint: disable=unused-import,import-outside-toplevel
+    import images  # noqa: F401  pylint: disable=unused-import,import-outside-toplevel
+    import jobs  # pylint: disable=import-self,import-outside-toplevel
+
+    worker = jobs.JobWorker()
+    worker.start()
+    print(f"Job worker running {', '.join(jobs.HANDLERS)} with {worker.threads} threads.")
+    # Stop on Ctrl+C or SIGTERM (e.g. from gunicorn.conf.py), letting running jobs finish
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    try:
+        while not stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    worker.stop()
@@ -3,6 +3,7 @@ This is the main application module that initializes the Flask app and defines r
 for user registration, login, pet management, application status, and user favorites.
 """
 
+import os
 import sqlite3
 from flask import Flask, jsonify, request
 from flasgger import Swagger
@@ -10,68 +11,120 @@ from flask_cors import CORS
 
 # Local imports
 from user import register_user, login_user
+from auth import AuthError, handle_auth_error, admin_required, logout_user
 from pets import add_pet, edit_pet
-from application_status import get_application_status
-from favorites import add_favorite, remove_favorite
-from database import initialize_database
-
-# Initialize database
-initialize_database()
+from pet_import import import_pets
+from table_export import export_table
+from search import search_pets
+from geo import find_nearby_pets
+from application_status import get_application_status, get_application_status_batch
+from favorites import add_favorite, remove_favorite, get_favorites, bulk_update_favorites
+from database import migrate_database
+from catalogue import parse_catalogue_args, parse_limit, fetch_catalogue_rows, build_catalogue_query
+from catalogue_cache import catalogue_cache, cache_key, pet_from_row
+from identity_cache import identity_cache
+from jobs import JobWorker, job_stats
+from images import encode_pets, serve_variant
+from uploads import upload_image, serve_image
+from dashboard import get_dashboard
+from facets import get_facets
+import connection_pool
+from connection_pool import get_db
+import metrics
+from metrics import metrics_view
+import compression
+from query_trace import tracer
+from serialization import json_object, encode_value
+
+# Bring the schema up to date; a no-op when it already is
+migrate_database()
 
 # Initialize Flask app
 app = Flask(__name__)
-
+# Let a fronting proxy send image files (X-Sendfile) instead of the WSGI server
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "0") == "1"
+
+metrics.init_app(app)  # Count and time requests and their SQL; first, so it sees every request
+connection_pool.init_app(app)  # Return pooled connections on teardown
+# Prepare the first catalogue page's query on every new pooled connection
+connection_pool.warm_statement(*build_catalogue_query(parse_catalogue_args({"limit": "20"})))
+compression.init_app(app)  # Compress JSON, NDJSON and CSV responses as negotiated with the client
+# Cached catalogue bodies are compressed once, so spend more on them; exports stream, so spend less
+compression.configure_route('/pets', gzip_level=9, brotli_quality=9)
+compression.configure_route('/export/<table>', gzip_level=1, brotli_quality=1)
 CORS(app)  # Enable CORS
 # Set up Swagger for API documentation
 swagger = Swagger(app)
+app.register_error_handler(AuthError, handle_auth_error)
 
 
 @app.route('/pets', methods=['GET'])
 def get_pets():
     """
-    Retrieves all pets from the database and returns them as JSON.
+    Retrieves pets from the database and returns them as JSON.
+
+    Optional query parameters narrow and order the catalogue:
+    `type`, `breed`, `location`, `status`, `min_age`, `max_age`,
+    `sort` (`name`, `age` or `location`, prefixed with `-` for descending),
+    and `limit` with the `cursor` returned as `next_cursor` by the previous page.
+    Without `limit` every matching pet is returned.
+
+    Responses are served from `catalogue_cache` when possible and carry a strong
+    ETag; a matching If-None-Match header yields 304 Not Modified.
     """
-    conn = sqlite3.connect('database.db')
-    cursor = conn.cursor()
+    try:
+        params = parse_catalogue_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    key = cache_key(params)
     try:
-        cursor.execute(
-            '''
-            SELECT name, age, breed, status, type, picture_url, location
-            FROM pets
-            '''
-        )
-        pets = cursor.fetchall()
-
-        pet_data = [
-            {
-                "name": pet[0],
-                "age": pet[1],
-                "breed": pet[2],
-                "status": pet[3],
-                "type": pet[4],
-                "picture_url": pet[5],
-                "location": pet[6],
-            }
-            for pet in pets
-        ]
-
-        return jsonify({"pets": pet_data}), 200
+        # A hit within the sync interval, and so a 304, never touches the database
+        if catalogue_cache.sync_due():
+            catalogue_cache.sync(get_db().cursor())  # Drops entries made stale by other workers' writes
+        entry = catalogue_cache.get(key)
+        if entry is None:
+            cursor = get_db().cursor()
+            generation = catalogue_cache.generation
+            rows, next_cursor = fetch_catalogue_rows(cursor, params)
+            pets = encode_pets(cursor, rows)
+            # Encoded straight from the rows; the same bytes jsonify would produce
+            body = (json_object({"pets": pets, "next_cursor": encode_value(next_cursor)}) + "\n").encode()
+            # Not stored if a write invalidated the cache while the body was being built
+            entry = catalogue_cache.put(key, params, body, generation)
     except sqlite3.Error as e:
         return jsonify({"error": "Database error", "details": str(e)}), 500
-    finally:
-        conn.close()
+
+    # The body is compressed once per cache entry and encoding, then served as stored
+    encoding = compression.negotiate(len(entry.body))
+    etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        body = entry.body
+        if encoding:
+            body, cached = entry.encoded_body(encoding, compression.compress)
+            metrics.record_encoding(request.url_rule.rule, encoding, cached)
+        response = app.response_class(body, status=200, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = "no-cache"  # Always revalidate with the ETag
+    return response
 
 
 # User routes
 app.route('/register', methods=['POST'])(register_user)
 app.route('/login', methods=['POST'])(login_user)
+app.route('/logout', methods=['POST'])(logout_user)
 
 # Pet routes
-app.route('/pets', methods=['POST'])(add_pet)  # Admin-only: Add a new pet
+app.route('/pets', methods=['POST'])(admin_required(add_pet))  # Admin-only: Add a new pet
 
 
 @app.route('/pets', methods=['DELETE'])
+@admin_required
 def remove_pet():
     """
     Removes a pet from the database based on its name and location.
@@ -83,93 +136,120 @@ def remove_pet():
     if not name or not location:
         return jsonify({"message": "Pet name and location are required"}), 400
 
-    conn = sqlite3.connect('database.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     try:
         cursor.execute(
-            'DELETE FROM pets WHERE name = ? AND location = ?',
+            'DELETE FROM pets WHERE name = ? AND location = ? RETURNING *',
             (name, location)
         )
+        removed = cursor.fetchall()  # Drain RETURNING before committing
         conn.commit()
 
-        if cursor.rowcount == 0:
+        if not removed:
             return jsonify({"message": "Pet not found"}), 404
 
+        catalogue_cache.invalidate_pets(pet_from_row(removed[0]))
         return jsonify({"message": "Pet removed successfully"}), 200
     except sqlite3.Error as e:
         return jsonify({"error": "Database error", "details": str(e)}), 500
-    finally:
-        conn.close()
 
 
-app.route('/pets', methods=['PUT'])(edit_pet)  # Admin-only: Edit a pet's details
+app.route('/pets', methods=['PUT'])(admin_required(edit_pet))  # Admin-only: Edit a pet's details
+app.route('/pets/import', methods=['POST'])(admin_required(import_pets))  # Admin-only: Bulk import pets
+app.route('/pets/search', methods=['GET'])(search_pets)
+app.route('/pets/nearby', methods=['GET'])(find_nearby_pets)
+app.route('/pets/facets', methods=['GET'])(get_facets)
+app.route('/images/variants/<path:filename>', methods=['GET'])(serve_variant)
+app.route('/images', methods=['POST'])(admin_required(upload_image))  # Admin-only: Upload a picture
+app.route('/images/<filename>', methods=['GET'])(serve_image)
 
 # Application status route
 app.route('/status', methods=['GET'])(get_application_status)
+app.route('/status/batch', methods=['POST'])(get_application_status_batch)
 
 # Favorites routes
 app.route('/favorites', methods=['DELETE'])(remove_favorite)
 app.route('/favorites', methods=['POST'])(add_favorite)
+app.route('/favorites', methods=['GET'])(get_favorites)
+app.route('/favorites/bulk', methods=['POST'])(bulk_update_favorites)
 
 
-@app.route('/favorites', methods=['GET'])
-def get_favorites():
+# Dashboard route: catalogue, favorites and applications in one response
+app.route('/dashboard', methods=['GET'])(get_dashboard)
+
+
+# Export route
+app.route('/export/<table>', methods=['GET'])(admin_required(export_table))  # Admin-only: Stream a table
+
+
+# Monitoring route
+app.route('/metrics', methods=['GET'])(metrics_view)
+
+
+@app.route('/stats/db', methods=['GET'])
+def get_db_stats():
     """
-    Retrieves a user's favorite pets based on their email.
+    Returns connection pool hit/miss statistics.
     """
-    email = request.args.get('email')  # Get email from query parameters
-    if not email:
-        return jsonify({"error": "Email is required"}), 400
+    return jsonify(connection_pool.pool.stats()), 200
 
-    conn = sqlite3.connect('database.db')
-    cursor = conn.cursor()
 
+@app.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Returns catalogue cache hit, miss and invalidation counters.
+    """
+    return jsonify(catalogue_cache.stats()), 200
+
+
+@app.route('/stats/identity', methods=['GET'])
+def get_identity_stats():
+    """
+    Returns email -> user_id cache hit, miss and invalidation counters.
+    """
+    return jsonify(identity_cache.stats()), 200
+
+
+@app.route('/stats/sql', methods=['GET'])
+def get_sql_stats():
+    """
+    Returns the most expensive SQL statements and the most recent slow ones.
+
+    Optional query parameters: `limit` (default 10, at most MAX_PAGE_SIZE) and
+    `order` (`total`, `max`, `calls` or `mean`; default `total`).
+    """
+    order = request.args.get("order", "total")
+    if order not in ("total", "max", "calls", "mean"):
+        return jsonify({"error": "order must be total, max, calls or mean"}), 400
     try:
-        # Fetch user ID
-        cursor.execute('SELECT user_id FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        user_id = user[0]
-
-        # Fetch user's favorite pet names
-        cursor.execute('SELECT pet_name FROM favorites WHERE user_id = ?', (user_id,))
-        favorite_pets = cursor.fetchall()
-
-        if not favorite_pets:
-            return jsonify({"favorites": []}), 200
-
-        # Collect detailed pet information
-        pets = []
-        for (pet_name,) in favorite_pets:
-            cursor.execute(
-                '''
-                SELECT name, age, breed, status, type, picture_url, location
-                FROM pets
-                WHERE name = ?
-                ''',
-                (pet_name,),
-            )
-            pet = cursor.fetchone()
-            if pet:
-                pets.append({
-                    "name": pet[0],
-                    "age": pet[1],
-                    "breed": pet[2],
-                    "status": pet[3],
-                    "type": pet[4],
-                    "picture_url": pet[5],
-                    "location": pet[6],
-                })
-
-        return jsonify({"favorites": pets}), 200
+        limit = parse_limit(request.args.get("limit")) or 10
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"top": tracer.top(limit, order), "slow": tracer.slow_queries()}), 200
+
 
+@app.route('/stats/jobs', methods=['GET'])
+def get_job_stats():
+    """
+    Returns the number of background jobs per kind and status.
+    """
+    try:
+        return jsonify(job_stats(get_db())), 200
     except sqlite3.Error as e:
         return jsonify({"error": "Database error", "details": str(e)}), 500
-    finally:
-        conn.close()
 
-# Run the app
+
+# Run the development server; use `gunicorn -c gunicorn.conf.py wsgi:app` in production
 if __name__ == '__main__':
-    app.run(debug=False)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the development server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    # The development server runs background jobs in-process; see jobs.py for a standalone worker
+    JobWorker().start()
+    app.run(host=args.host, port=args.port, debug=False)
@@ -0,0 +1,317 @@
+"""
+Module: metrics
+This module collects request and SQL metrics and renders them in the Prometheus text format.
+
+`init_app` instruments a Flask app. For every request it records, by route
+template, method and status code:
+
+- `http_requests_total`, a counter;
+- `http_requests_in_progress`, a gauge (by route and method);
+- `http_request_duration_seconds`, a latency histogram;
+- `http_request_sql_statements` and `http_request_sql_seconds`, histograms of how
+  many statements the request ran and how long they took, fed by
+  `connection_pool.observe_statements`. Statements count toward the request
+  whose context they run in, so work handed to other threads is included when
+  it runs in a copy of the request's context (as dashboard.py does).
+
+compression.py adds, by route and encoding, `http_response_compression_ratio` and
+`http_response_compression_seconds` for every body it compresses, and
+`http_responses_compressed_total` for every compressed response sent, including
+precompressed cached bodies (`cached="true"`).
+
+Recording a request costs a few dictionary updates under one lock, so the
+instrumentation can stay on in production. Set METRICS_ENABLED=0 to turn it off.
+
+With several worker processes, set METRICS_DIR to a folder shared by them. Each
+process then writes a snapshot of its metrics there at most every
+METRICS_FLUSH_INTERVAL seconds, and a scrape of `/metrics` merges all snapshots.
+Counters and histograms of exited processes are kept, so totals never go
+backwards when workers are replaced. Their in-progress gauges are dropped.
+"""
+
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from flask import g, request
+
+from connection_pool import observe_statements
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_DIR = os.environ.get("METRICS_DIR")
+FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+SQL_TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+COMPRESSION_RATIO_BUCKETS = (1, 1.5, 2, 3, 4, 6, 8, 12, 16, 24)
+
+# name -> (type, help text, histogram buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests handled, by route, method and status.", None),
+    "http_requests_in_progress": ("gauge", "Requests currently being handled.", None),
+    "http_request_duration_seconds": ("histogram", "Time to produce a response.", DURATION_BUCKETS),
+    "http_request_sql_statements": ("histogram", "SQL statements run per request.", SQL_COUNT_BUCKETS),
+    "http_request_sql_seconds": ("histogram", "Time spent running SQL per request.", SQL_TIME_BUCKETS),
+    "http_response_compression_ratio": (
+        "histogram", "Uncompressed over compressed size of each compressed body.", COMPRESSION_RATIO_BUCKETS
+    ),
+    "http_response_compression_seconds": ("histogram", "Time spent compressing a body.", SQL_TIME_BUCKETS),
+    "http_responses_compressed_total": ("counter", "Compressed responses sent, by route and encoding.", None),
+}
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Registry:
+    """
+    Thread-safe metric values of one process.
+
+    Series are keyed by (metric name, sorted label pairs). Counters and gauges hold
+    a number; histograms hold [per-bucket counts, sum, count], with the last bucket
+    counting values above every bound.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Returns the series as JSON-serializable [name, labels, value] entries."""
+        with self._lock:
+            return [
+                [name, [list(pair) for pair in labels],
+                 [list(value[0]), value[1], value[2]] if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+registry = Registry()
+# [statements, seconds] of the current request; shared with threads running in copies of its context
+_request_sql = contextvars.ContextVar("request_sql", default=None)
+_request_sql_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = [0.0]
+
+
+def _record_statement(cursor, sql, parameters, seconds):  # pylint: disable=unused-argument
+    totals = _request_sql.get()
+    if totals is not None:
+        with _request_sql_lock:
+            totals[0] += 1
+            totals[1] += seconds
+
+
+def before_request():
+    _request_sql.set([0, 0.0])
+    g.metrics_start = time.perf_counter()
+    g.metrics_route = request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE
+    registry.inc("http_requests_in_progress", (("method", request.method), ("route", g.metrics_route)))
+
+
+def after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def teardown_request(exception=None):
+    """Records the finished request; runs even when a view raised."""
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    statements, sql_seconds = _request_sql.get() or (0, 0.0)
+    _request_sql.set(None)
+
+    route = (("method", request.method), ("route", g.metrics_route))
+    status = g.pop("metrics_status", 500 if exception is not None else 200)
+    labels = route + (("status", str(status)),)
+    registry.inc("http_requests_in_progress", route, -1)
+    registry.inc("http_requests_total", labels)
+    registry.observe("http_request_duration_seconds", labels, elapsed)
+    registry.observe("http_request_sql_statements", route, statements)
+    registry.observe("http_request_sql_seconds", route, sql_seconds)
+    if METRICS_DIR:
+        flush()
+
+
+def record_compression(route, encoding, size, compressed_size, seconds):
+    """Records the compression of one body of `size` bytes into `compressed_size` bytes."""
+    if not METRICS_ENABLED:
+        return
+    labels = (("encoding", encoding), ("route", route))
+    registry.observe("http_response_compression_ratio", labels, size / max(compressed_size, 1))
+    registry.observe("http_response_compression_seconds", labels, seconds)
+
+
+def record_encoding(route, encoding, cached=False):
+    """Counts a response sent with `encoding`; `cached` when its body was compressed earlier."""
+    if METRICS_ENABLED:
+        registry.inc("http_responses_compressed_total",
+                     (("cached", "true" if cached else "false"), ("encoding", encoding), ("route", route)))
+
+
+def flush(force=False):
+    """Writes this process's snapshot to METRICS_DIR, at most every FLUSH_INTERVAL seconds."""
+    now = time.monotonic()
+    if not force and now - _last_flush[0] < FLUSH_INTERVAL:
+        return
+    if not _flush_lock.acquire(blocking=force):
+        return  # Another thread is already writing
+    try:
+        _last_flush[0] = now
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=METRICS_DIR, suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf-8") as output:
+            json.dump({"pid": os.getpid(), "series": registry.snapshot()}, output)
+        os.replace(temporary, os.path.join(METRICS_DIR, f"{os.getpid()}.json"))
+    finally:
+        _flush_lock.release()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """
+    Returns the merged series of every process as {(name, labels): value}.
+
+    Without METRICS_DIR that is just this process's registry.
+    """
+    if not METRICS_DIR:
+        snapshots = [(os.getpid(), registry.snapshot())]
+    else:
+        flush(force=True)
+        snapshots = []
+        for filename in os.listdir(METRICS_DIR):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, filename), encoding="utf-8") as handle:
+                    document = json.load(handle)
+            except (OSError, ValueError):
+                continue  # Removed or replaced while listing
+            snapshots.append((document["pid"], document["series"]))
+
+    merged = {}
+    for pid, series in snapshots:
+        alive = pid == os.getpid() or _process_alive(pid)
+        for name, labels, value in series:
+            if name not in METRICS or (METRICS[name][0] == "gauge" and not alive):
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                total = merged.setdefault(key, [[0] * len(value[0]), 0.0, 0])
+                total[0] = [a + b for a, b in zip(total[0], value[0])]
+                total[1] += value[1]
+                total[2] += value[2]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(series=None):
+    """Renders merged series in the Prometheus text exposition format."""
+    series = collect() if series is None else series
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        entries = sorted((labels, value) for (metric, labels), value in series.items() if metric == name)
+        if not entries:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in entries:
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), value[0]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value[1])}")
+            lines.append(f"{name}_count{_labels(labels)} {value[2]}")
+    return "\n".join(lines) + "\n"
+
+
+def clear_directory(directory=None):
+    """Removes old snapshots, e.g. when a server starts with a reused METRICS_DIR."""
+    directory = directory or METRICS_DIR
+    if directory and os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.endswith((".json", ".tmp")):
+                os.unlink(os.path.join(directory, filename))
+
+
+def metrics_view():
+    """
+    Exposes request and SQL metrics in the Prometheus text format.
+
+    With METRICS_DIR set, the metrics of every worker process are merged.
+
+    ---
+    tags:
+      - Monitoring
+    responses:
+      200:
+        description: Metrics in the Prometheus text exposition format.
+    """
+    return render(), 200, {"Content-Type": CONTENT_TYPE}
+
+
+def init_app(app):
+    """Registers the instrumentation hooks on the Flask app; call it before other hooks."""
+    if not METRICS_ENABLED:
+        return
+    observe_statements(_record_statement)
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    if METRICS_DIR:
+        atexit.register(flush, force=True)
@@ -0,0 +1,351 @@
+"""
+Module: migrations
+This module holds the versioned schema migrations and the runner that applies them.
+
+Migrations are numbered, forward-only and recorded in the `schema_migrations` table.
+Checking whether a database is current costs a single primary-key lookup, so it is
+safe to run on every process start. When migrations are pending, the runner takes
+SQLite's write lock with BEGIN IMMEDIATE, so of several workers starting together
+one applies them and the others wait, re-check and find nothing left to do.
+
+To change the schema, append a new `(version, name, steps)` entry to
+`MIGRATIONS`; never edit one that has already shipped. A step is either an SQL
+statement or a callable that receives the connection (for loading data); steps
+must not commit, since each migration runs inside the runner's transaction.
+"""
+
+import sqlite3
+
+from connection_pool import BUSY_TIMEOUT_MS
+from geo import upsert_places, index_places
+from facets import FACET_SCHEMA
+
+# Generous, because another worker may be building indexes on a large table
+MIGRATION_BUSY_TIMEOUT_MS = 120000
+
+
+def load_gazetteer(conn):
+    """
+    Migration 4's data step, kept as it shipped: upserts the bundled gazetteer and
+    indexes every pet with a known location in `pets_geo` (dropped by migration 9).
+    """
+    upsert_places(conn)
+    conn.execute('DELETE FROM pets_geo')
+    conn.execute('''
+        INSERT INTO pets_geo (id, min_lat, max_lat, min_lon, max_lon)
+        SELECT pets.rowid, latitude, latitude, longitude, longitude
+        FROM pets JOIN gazetteer ON gazetteer.place = pets.location
+    ''')
+
+
+MIGRATIONS = [
+    (1, "initial schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS admins (
+            admin_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            phone_number TEXT,
+            address TEXT,
+            background_check_status TEXT NOT NULL DEFAULT 'pending',
+            profile_status TEXT NOT NULL DEFAULT 'active'
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS pets (
+            name TEXT NOT NULL,
+            age TEXT NOT NULL,
+            description TEXT NOT NULL,
+            breed TEXT NOT NULL,
+            picture_url TEXT,
+            status TEXT NOT NULL DEFAULT 'available',
+            type TEXT NOT NULL,
+            location TEXT NOT NULL,
+            PRIMARY KEY (name, location) -- Enforce unique name/location combinations
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS favorites (
+            favorite_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            pet_name TEXT NOT NULL,
+            pet_location TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+            FOREIGN KEY (pet_name, pet_location) REFERENCES pets(name, location) ON DELETE CASCADE,
+            UNIQUE(user_id, pet_name, pet_location) -- Prevent duplicate favorites for the same user and pet
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS questionnaires (
+            questionnaire_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            submission_date DATE,
+            status TEXT NOT NULL DEFAULT 'pending',
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS adoption_applications (
+            application_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            pet_name TEXT NOT NULL,
+            location TEXT NOT NULL,
+            submission_date DATE,
+            status TEXT NOT NULL DEFAULT 'pending',
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''',
+    ]),
+    (2, "catalogue and favorites indexes", [
+        # Back the catalogue filters and sort orders (see catalogue.py)
+        'CREATE INDEX IF NOT EXISTS idx_pets_type ON pets (type, name, location)',
+        'CREATE INDEX IF NOT EXISTS idx_pets_breed ON pets (breed, name, location)',
+        'CREATE INDEX IF NOT EXISTS idx_pets_status ON pets (status, name, location)',
+        'CREATE INDEX IF NOT EXISTS idx_pets_location ON pets (location, name)',
+        'CREATE INDEX IF NOT EXISTS idx_pets_age ON pets (CAST(age AS INTEGER), name, location)',
+        'CREATE INDEX IF NOT EXISTS idx_favorites_user ON favorites (user_id, favorite_id)',
+    ]),
+    (3, "pet full-text search", [
+        # External-content FTS5 index over pets, keyed by the pets rowid (see search.py)
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS pets_fts USING fts5(
+            name, breed, description, location, type,
+            content='pets', content_rowid='rowid',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS pets_fts_insert AFTER INSERT ON pets BEGIN
+            INSERT INTO pets_fts (rowid, name, breed, description, location, type)
+            VALUES (new.rowid, new.name, new.breed, new.description, new.location, new.type);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS pets_fts_delete AFTER DELETE ON pets BEGIN
+            INSERT INTO pets_fts (pets_fts, rowid, name, breed, description, location, type)
+            VALUES ('delete', old.rowid, old.name, old.breed, old.description, old.location, old.type);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS pets_fts_update
+        AFTER UPDATE OF name, breed, description, location, type ON pets BEGIN
+            INSERT INTO pets_fts (pets_fts, rowid, name, breed, description, location, type)
+            VALUES ('delete', old.rowid, old.name, old.breed, old.description, old.location, old.type);
+            INSERT INTO pets_fts (rowid, name, breed, description, location, type)
+            VALUES (new.rowid, new.name, new.breed, new.description, new.location, new.type);
+        END
+        ''',
+        "INSERT INTO pets_fts (pets_fts) VALUES ('rebuild')",
+        # Matches in the name count most, then breed, location and type, then description
+        "INSERT INTO pets_fts (pets_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 2.0, 2.0)')",
+    ]),
+    (4, "pet location coordinates", [
+        # Offline "City, ST" -> coordinates lookup, loaded from gazetteer.csv (see geo.py)
+        '''
+        CREATE TABLE IF NOT EXISTS gazetteer (
+            place TEXT PRIMARY KEY COLLATE NOCASE,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        # Each pet is a degenerate box at its location's coordinates, keyed by pets rowid
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS pets_geo USING rtree(
+            id, min_lat, max_lat, min_lon, max_lon
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS pets_geo_insert AFTER INSERT ON pets BEGIN
+            INSERT INTO pets_geo (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT new.rowid, latitude, latitude, longitude, longitude
+            FROM gazetteer WHERE place = new.location;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS pets_geo_delete AFTER DELETE ON pets BEGIN
+            DELETE FROM pets_geo WHERE id = old.rowid;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS pets_geo_update AFTER UPDATE OF location ON pets BEGIN
+            DELETE FROM pets_geo WHERE id = old.rowid;
+            INSERT INTO pets_geo (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT new.rowid, latitude, latitude, longitude, longitude
+            FROM gazetteer WHERE place = new.location;
+        END
+        ''',
+        load_gazetteer,
+    ]),
+    (5, "application status indexes", [
+        # Batch status lookups by user, optionally narrowed by status (see application_status.py)
+        'CREATE INDEX IF NOT EXISTS idx_applications_user_status ON adoption_applications (user_id, status)',
+    ]),
+    (6, "job queue", [
+        # Durable background jobs (see jobs.py); run_at doubles as the lease expiry while running
+        '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at REAL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON jobs (kind, status, run_at)',
+    ]),
+    (7, "picture variants", [
+        # Resized copies of pet pictures, keyed by the pets' picture_url (see images.py)
+        '''
+        CREATE TABLE IF NOT EXISTS image_variants (
+            picture_url TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            format TEXT NOT NULL,
+            url TEXT NOT NULL,
+            PRIMARY KEY (picture_url, format, width)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    # Pet counts per filter value combination, kept current by triggers (see facets.py)
+    (8, "catalogue facet counts", FACET_SCHEMA),
+    (9, "nearby search by place", [
+        # Distances are computed per place, so places are indexed instead of every pet (see geo.py)
+        'DROP TRIGGER IF EXISTS pets_geo_insert',
+        'DROP TRIGGER IF EXISTS pets_geo_delete',
+        'DROP TRIGGER IF EXISTS pets_geo_update',
+        'DROP TABLE IF EXISTS pets_geo',
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS places_geo USING rtree(
+            id, min_lat, max_lat, min_lon, max_lon, +place
+        )
+        ''',
+        index_places,
+        # Pets of a place in rowid order; place names match case-insensitively, like the gazetteer
+        'CREATE INDEX IF NOT EXISTS idx_pets_location_rowid ON pets (location COLLATE NOCASE)',
+    ]),
+    (10, "catalogue change log", [
+        # Filter values of changed pets, so every worker's catalogue_cache can drop the
+        # entries a write by another worker made stale (see catalogue_cache.py)
+        '''
+        CREATE TABLE IF NOT EXISTS catalogue_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            all_pets INTEGER NOT NULL DEFAULT 0,
+            type TEXT, breed TEXT, location TEXT, status TEXT, age TEXT
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_trim AFTER INSERT ON catalogue_changes BEGIN
+            DELETE FROM catalogue_changes WHERE seq <= new.seq - 1000;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_pets_insert AFTER INSERT ON pets BEGIN
+            INSERT INTO catalogue_changes (type, breed, location, status, age)
+            VALUES (new.type, new.breed, new.location, new.status, new.age);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_pets_update AFTER UPDATE ON pets BEGIN
+            INSERT INTO catalogue_changes (type, breed, location, status, age)
+            VALUES (old.type, old.breed, old.location, old.status, old.age);
+            INSERT INTO catalogue_changes (type, breed, location, status, age)
+            VALUES (new.type, new.breed, new.location, new.status, new.age);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_pets_delete AFTER DELETE ON pets BEGIN
+            INSERT INTO catalogue_changes (type, breed, location, status, age)
+            VALUES (old.type, old.breed, old.location, old.status, old.age);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_variants_insert AFTER INSERT ON image_variants BEGIN
+            INSERT INTO catalogue_changes (all_pets) VALUES (1);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_variants_update AFTER UPDATE ON image_variants BEGIN
+            INSERT INTO catalogue_changes (all_pets) VALUES (1);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS catalogue_changes_variants_delete AFTER DELETE ON image_variants BEGIN
+            INSERT INTO catalogue_changes (all_pets) VALUES (1);
+        END
+        ''',
+    ]),
+    (11, "picture variant sources", [
+        # Modification time and size of the original the variants were made from (see images.py)
+        'ALTER TABLE image_variants ADD COLUMN source_stamp TEXT',
+    ]),
+    (12, "applications by user", [
+        # A user's applications in id order, for paged lookups by user (see application_status.py)
+        'CREATE INDEX IF NOT EXISTS idx_applications_user ON adoption_applications (user_id, application_id)',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Returns the highest applied migration version, or 0 for a new database."""
+    try:
+        row = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    except sqlite3.OperationalError:
+        return 0  # No schema_migrations table yet
+    return row[0] or 0
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """
+    Applies every pending migration up to `target`.
+
+    :param conn: An open database connection with no transaction in progress.
+    :return: The list of versions applied by this call (empty when already current).
+    """
+    if current_version(conn) >= target:
+        return []
+
+    conn.execute(f"PRAGMA busy_timeout = {MIGRATION_BUSY_TIMEOUT_MS}")
+    conn.execute('BEGIN IMMEDIATE')  # Single writer: other workers block here
+    applied = []
+    try:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        version = current_version(conn)  # Another worker may have migrated meanwhile
+        for number, name, steps in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                'INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (number, name)
+            )
+            applied.append(number)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return applied
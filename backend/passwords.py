@@ -0,0 +1,150 @@
+"""
+Module: passwords
+This module hashes and verifies user passwords off the request threads.
+
+Passwords are hashed with scrypt, a memory-hard KDF that costs tens of milliseconds
+of CPU per call. The work runs in a bounded process pool so a burst of logins
+cannot starve request threads or the GIL, and a queue-depth limit turns overload
+into a fast `HasherBusy` error instead of an ever-growing backlog; a job that
+does not finish within HASH_TIMEOUT seconds raises `HasherBusy` as well. Workers
+are spawned rather than forked, so they never inherit the server's threads, locks
+or open database connections.
+
+Stored hashes are self-describing:
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>    (salt and hash are unpadded base64)
+
+so the cost parameters can be raised later; `verify_password` reports when a hash
+was made with old parameters (or is a legacy plaintext value) and should be
+replaced on the next successful login.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import get_context
+
+SCHEME = "scrypt"
+SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.environ.get("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("PASSWORD_SCRYPT_P", "1"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# 0 workers hashes inline on the calling thread
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", str(max(1, HASH_WORKERS) * 8)))
+HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashing jobs are already queued, or one takes too long."""
+
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem must cover 128 * n * r bytes plus overhead
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES, maxmem=256 * n * r
+    )
+
+
+def compute_hash(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Hashes a password with a fresh salt and returns the encoded hash."""
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def check_hash(password, encoded):
+    """
+    Verifies a password against an encoded hash.
+
+    :return: A tuple of (matches, needs_rehash).
+    """
+    try:
+        scheme, n, r, p, salt, digest = encoded.split("$")
+        n, r, p = int(n), int(r), int(p)
+    except ValueError:
+        return False, False
+    if scheme != SCHEME:
+        return False, False
+    candidate = _scrypt(password, _b64decode(salt), n, r, p)
+    matches = hmac.compare_digest(candidate, _b64decode(digest))
+    return matches, matches and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def is_hashed(stored):
+    """Tells a self-describing hash apart from a legacy plaintext password."""
+    return stored.startswith(SCHEME + "$")
+
+
+class PasswordHasher:
+    """Runs hashing jobs in a lazily started, bounded process pool."""
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=MAX_PENDING, timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _run(self, func, *args):
+        if self.workers == 0:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Too many password hashing requests in progress")
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=get_context("spawn")
+                    )
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A job that timed out may still be running, so it keeps its slot until it finishes
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HasherBusy("Password hashing timed out") from None
+
+    def hash_password(self, password):
+        """Returns the encoded hash of `password`."""
+        return self._run(compute_hash, password)
+
+    def verify_password(self, password, stored):
+        """
+        Checks `password` against a stored value.
+
+        :return: A tuple of (matches, needs_rehash). Legacy plaintext values are
+                 compared directly and always need a rehash.
+        """
+        if not is_hashed(stored):
+            matches = hmac.compare_digest(password.encode(), stored.encode())
+            return matches, matches
+        return self._run(check_hash, password, stored)
+
+    def shutdown(self):
+        """Stops the worker processes, if any were started."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,286 @@
+"""
+Module: pet_import
+This module streams pets from CSV or NDJSON files into the database.
+
+Records are read one at a time, validated with the same required fields as
+`pets.add_pet`, and inserted with `executemany` in chunks, one transaction per
+chunk, holding the write lock from the conflict check to the commit. Conflicts
+(a pet with the same name and location already exists or appears earlier in
+the file) and invalid rows are reported by line number.
+
+It can be used through the `POST /pets/import` endpoint or from the command line:
+
+    python pet_import.py pets.csv --chunk-size 1000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+from flask import request, jsonify
+
+from connection_pool import DATABASE, create_connection
+from catalogue_cache import catalogue_cache
+from pets import PET_REQUIRED_FIELDS
+from utils import connect_to_database
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 10000
+MAX_REPORTED_ROWS = 1000  # Keeps the report bounded for very dirty files
+
+PET_FIELDS = PET_REQUIRED_FIELDS + ["status"]
+NAME, LOCATION = PET_FIELDS.index("name"), PET_FIELDS.index("location")
+
+
+def iter_records(stream, fmt):
+    """
+    Yields `(line_number, record, error)` for each record in a binary stream.
+
+    Exactly one of `record` and `error` is set. The stream is decoded incrementally,
+    so only the current line is held in memory.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, "Too many values"
+            else:
+                yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, "Expected a JSON object"
+
+
+def validate_record(record):
+    """
+    Checks a record against the fields `add_pet` requires.
+
+    :return: A tuple of (row values in PET_FIELDS order, error message or None).
+    """
+    missing_fields = [field for field in PET_REQUIRED_FIELDS if not record.get(field)]
+    if missing_fields:
+        return None, f"Missing fields: {', '.join(missing_fields)}"
+    invalid_fields = [
+        field for field in PET_FIELDS
+        if record.get(field) is not None and not isinstance(record[field], (str, int, float))
+    ]
+    if invalid_fields:
+        return None, f"Invalid fields: {', '.join(invalid_fields)}"
+    row = [record[field] for field in PET_REQUIRED_FIELDS]
+    row.append(record.get("status") or "available")
+    return row, None
+
+
+class ImportReport:
+    """Counts and a bounded list of per-row problems for one import."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.conflict_count = 0
+        self.error_count = 0
+        self.conflicts = []
+        self.errors = []
+
+    def conflict(self, line_number, name, location):
+        """Records a row that clashes with an existing pet."""
+        self.conflict_count += 1
+        if len(self.conflicts) < MAX_REPORTED_ROWS:
+            self.conflicts.append({"line": line_number, "name": name, "location": location})
+
+    def error(self, line_number, message):
+        """Records a row that could not be imported."""
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ROWS:
+            self.errors.append({"line": line_number, "message": message})
+
+    def to_dict(self):
+        """Returns the report as a JSON-serializable dict."""
+        return {
+            "inserted": self.inserted,
+            "conflict_count": self.conflict_count,
+            "error_count": self.error_count,
+            "conflicts": self.conflicts,
+            "errors": self.errors,
+        }
+
+
+def _flush(conn, chunk, report):
+    """
+    Inserts one chunk of `(line_number, row)` pairs in a single transaction.
+
+    The write lock is taken before the conflict check (BEGIN IMMEDIATE), so no
+    other writer can add a clashing pet between the check and the insert. The
+    insert still skips clashes with ON CONFLICT DO NOTHING rather than failing the
+    chunk, and the inserted count is the number of rows SQLite reports changed.
+    """
+    if not chunk:
+        return
+    cursor = conn.cursor()
+    placeholders = ", ".join(["(?, ?)"] * len(chunk))
+    keys = [value for _, row in chunk for value in (row[NAME], row[LOCATION])]
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(
+            f'SELECT name, location FROM pets WHERE (name, location) IN (VALUES {placeholders})',
+            keys
+        )
+        existing = {(name, location) for name, location in cursor.fetchall()}
+
+        rows = []
+        for line_number, row in chunk:
+            key = (row[NAME], row[LOCATION])
+            if key in existing:
+                report.conflict(line_number, *key)
+            else:
+                rows.append(row)
+
+        cursor.executemany(
+            f'''
+            INSERT INTO pets ({", ".join(PET_FIELDS)})
+            VALUES ({", ".join("?" * len(PET_FIELDS))})
+            ON CONFLICT (name, location) DO NOTHING
+            ''',
+            rows
+        )
+        inserted = cursor.rowcount if rows else 0  # Total changes(); skipped rows add none
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    report.inserted += inserted
+    report.conflict_count += len(rows) - inserted  # Clashes the check could not see, if any
+
+
+def import_pets_stream(conn, stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Imports pets from a binary stream.
+
+    :param conn: An open database connection.
+    :param stream: A binary file-like object.
+    :param fmt: Either "csv" or "ndjson".
+    :param chunk_size: Number of rows inserted per transaction.
+    :return: An `ImportReport`.
+    """
+    report = ImportReport()
+    chunk, chunk_keys = [], set()
+    try:
+        for line_number, record, error in iter_records(stream, fmt):
+            if error is None:
+                row, error = validate_record(record)
+            if error:
+                report.error(line_number, error)
+                continue
+
+            key = (row[NAME], row[LOCATION])
+            if key in chunk_keys:
+                report.conflict(line_number, *key)
+                continue
+            chunk.append((line_number, row))
+            chunk_keys.add(key)
+            if len(chunk) >= chunk_size:
+                _flush(conn, chunk, report)
+                chunk, chunk_keys = [], set()
+        _flush(conn, chunk, report)
+    finally:
+        # Chunks committed before a failure are visible too
+        if report.inserted:
+            catalogue_cache.clear()
+    return report
+
+
+def detect_format(fmt, filename=None, content_type=None):
+    """
+    Chooses the import format from an explicit value, a filename or a content type.
+
+    :raises ValueError: If no supported format can be determined.
+    """
+    if not fmt and filename:
+        fmt = os.path.splitext(filename)[1].lstrip(".").lower()
+    if not fmt and content_type:
+        fmt = "csv" if "csv" in content_type else "ndjson" if "ndjson" in content_type else None
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def import_pets():
+    """
+    Imports many pets from an uploaded CSV or NDJSON file.
+
+    The file is sent either as the raw request body or as a multipart `file` field.
+    Query parameters: `format` (`csv` or `ndjson`, otherwise inferred from the
+    filename or content type) and `chunk_size` (rows per transaction).
+    """
+    upload = request.files.get("file")
+    try:
+        fmt = detect_format(
+            request.args.get("format"),
+            upload.filename if upload else None,
+            upload.mimetype if upload else request.mimetype,
+        )
+        chunk_size = int(request.args.get("chunk_size", DEFAULT_CHUNK_SIZE))
+        if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}")
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    conn, _ = connect_to_database()
+    stream = upload.stream if upload else request.stream
+    try:
+        report = import_pets_stream(conn, stream, fmt, chunk_size)
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+    except UnicodeDecodeError:
+        return jsonify({"message": "File must be UTF-8 encoded"}), 400
+
+    return jsonify(report.to_dict()), 200
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Import pets from a CSV or NDJSON file.")
+    parser.add_argument("path", help="File to import, or - for standard input")
+    parser.add_argument("--format", choices=FORMATS + ("jsonl",), help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--database", default=DATABASE)
+    args = parser.parse_args(argv)
+
+    try:
+        fmt = detect_format(args.format, None if args.path == "-" else args.path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    conn = create_connection(args.database)
+    try:
+        if args.path == "-":
+            report = import_pets_stream(conn, sys.stdin.buffer, fmt, args.chunk_size)
+        else:
+            with open(args.path, "rb") as stream:
+                report = import_pets_stream(conn, stream, fmt, args.chunk_size)
+    finally:
+        conn.close()
+
+    print(json.dumps(report.to_dict(), indent=2))
+    return 0 if not report.error_count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
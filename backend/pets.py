@@ -4,17 +4,20 @@ This module provides pet-related functionalities using an SQLite database.
 import sqlite3
 from flask import jsonify
 from utils import get_json_data, connect_to_database
+from catalogue_cache import catalogue_cache, pet_from_row
+from images import queue_variants
+
+# Fields a new pet must provide, shared with the bulk importer
+PET_REQUIRED_FIELDS = [
+    "name", "age", "description", "breed", "picture_url", "type", "location"
+]
 
 
 def add_pet():
     """
     Adds a new pet to the system.
     """
-    data, error = get_json_data(
-        required_fields=[
-            "name", "age", "description", "breed", "picture_url", "type", "location"
-        ]
-    )
+    data, error = get_json_data(required_fields=PET_REQUIRED_FIELDS)
     if error:
         return jsonify({"message": error}), 400
 
@@ -24,7 +27,6 @@ def add_pet():
         (data["name"], data["location"])
     )
     if cursor.fetchone():
-        conn.close()
         return jsonify({"message": "Pet already exists"}), 409
 
     try:
@@ -40,12 +42,12 @@ def add_pet():
                 data["type"], data["location"]
             )
         )
+        queue_variants(conn, data["picture_url"])  # Resized copies are made in the background
         conn.commit()
     except sqlite3.Error as e:
         return jsonify({"message": f"Database error: {str(e)}"}), 500
-    finally:
-        conn.close()
 
+    catalogue_cache.invalidate_pets(pet_from_row({**data, "status": data.get("status", "available")}))
     return jsonify({"message": "Pet added successfully"}), 201
 
 
@@ -59,17 +61,16 @@ def remove_pet():
 
     conn, cursor = connect_to_database()
     cursor.execute(
-        'DELETE FROM pets WHERE name = ? AND location = ?',
+        'DELETE FROM pets WHERE name = ? AND location = ? RETURNING *',
         (data["name"], data["location"])
     )
 
-    rows_deleted = cursor.rowcount
-    if rows_deleted == 0:
-        conn.close()
+    removed = cursor.fetchall()  # Drain RETURNING before committing
+    if not removed:
         return jsonify({"message": "Pet not found"}), 404
 
     conn.commit()
-    conn.close()
+    catalogue_cache.invalidate_pets(pet_from_row(removed[0]))
     return jsonify({"message": "Pet removed successfully"}), 200
 
 
@@ -93,7 +94,8 @@ def edit_pet():
             'SELECT * FROM pets WHERE name = ? AND location = ?',
             (data["name"], data["location"])
         )
-        if not cursor.fetchone():
+        previous = cursor.fetchone()
+        if not previous:
             return jsonify({"message": "Pet not found"}), 404
 
         # Update pet details
@@ -110,10 +112,10 @@ def edit_pet():
                 data["name"], data["location"]
             )
         )
+        queue_variants(conn, data["picture_url"])
         conn.commit()
     except sqlite3.Error as e:
         return jsonify({"message": f"Database error: {str(e)}"}), 500
-    finally:
-        conn.close()
 
+    catalogue_cache.invalidate_pets(pet_from_row(previous), pet_from_row(data))
     return jsonify({"message": "Pet details updated successfully"}), 200
@@ -0,0 +1,193 @@
+"""
+Module: query_trace
+This module traces the SQL statements run on the app's connections.
+
+A `QueryTracer` is registered with `connection_pool.observe_statements`, so it sees
+every statement on every connection opened by `create_connection`, with its run
+time including the time spent reading its rows. For each distinct statement (whitespace-normalized) it aggregates the call
+count and total and maximum time; `top` returns the most expensive ones.
+
+Statements slower than SLOW_QUERY_MS are logged to the `query_trace` logger with
+the shape of their parameters (types only, never values). The first time a
+statement is slow, its EXPLAIN QUERY PLAN is captured on the same connection. A
+plan step that scans a whole table instead of searching an index is flagged as a
+full scan, which is how an unindexed lookup usually first shows up.
+
+Set SQL_TRACE=0 to turn tracing off. Each process traces its own connections.
+"""
+
+import collections
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from connection_pool import MANY, observe_statements
+
+SQL_TRACE = os.environ.get("SQL_TRACE", "1") == "1"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "50"))
+MAX_STATEMENTS = 1000  # Distinct statements tracked; later ones are counted under OTHER
+RECENT_SLOW = 100  # Slow statements kept for /stats/sql
+OTHER = "<other statements>"
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+logger = logging.getLogger("query_trace")
+
+
+def normalize(sql):
+    """Collapses whitespace so the same statement always aggregates under one key."""
+    return " ".join(sql.split())
+
+
+def parameter_shape(parameters):
+    """
+    Describes parameters by type without revealing their values.
+
+    :return: e.g. "(str, int)", "{email: str}", "many" or "none".
+    """
+    if parameters is None:
+        return "none"
+    if parameters is MANY:
+        return "many"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+
+def explain(conn, sql, parameters):
+    """
+    Returns the EXPLAIN QUERY PLAN details of a statement, or None if it cannot be explained.
+
+    Runs on a plain cursor, so explaining is not itself traced.
+    """
+    if parameters is None or parameters is MANY or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return None
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    """Returns the tables a query plan reads in full."""
+    return [match.group(1) for match in map(FULL_SCAN.match, plan or []) if match]
+
+
+class StatementStats:
+    """Aggregated timings of one distinct statement."""
+
+    __slots__ = ("calls", "total", "max", "slow", "shape", "plan", "full_scans")
+
+    def __init__(self, shape):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.shape = shape
+        self.plan = None
+        self.full_scans = []
+
+    def as_dict(self, sql):
+        return {
+            "sql": sql,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "slow_calls": self.slow,
+            "parameters": self.shape,
+            "plan": self.plan,
+            "full_scans": self.full_scans,
+        }
+
+
+class QueryTracer:
+    """
+    Aggregates statement timings and logs slow statements with their query plans.
+
+    Register `observe` with `connection_pool.observe_statements`, or call `install`.
+    """
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, max_statements=MAX_STATEMENTS):
+        self.slow_seconds = slow_ms / 1000
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._recent_slow = collections.deque(maxlen=RECENT_SLOW)
+
+    def install(self):
+        observe_statements(self.observe)
+        return self
+
+    def observe(self, cursor, sql, parameters, seconds):
+        key = normalize(sql)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER
+                    stats = self._statements.get(key)
+                if stats is None:
+                    stats = self._statements[key] = StatementStats(parameter_shape(parameters))
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            if seconds < self.slow_seconds:
+                return
+            stats.slow += 1
+            needs_plan = stats.plan is None and key != OTHER
+
+        plan = explain(cursor.connection, sql, parameters) if needs_plan else None
+        with self._lock:
+            if needs_plan:
+                stats.plan = plan or []  # Statements that cannot be explained are not retried
+                stats.full_scans = full_scans(plan)
+            entry = {
+                "sql": key,
+                "ms": round(seconds * 1000, 3),
+                "parameters": parameter_shape(parameters),
+                "plan": stats.plan,
+                "full_scans": stats.full_scans,
+                "at": time.time(),
+            }
+            self._recent_slow.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms, parameters %s%s): %s%s", entry["ms"], entry["parameters"],
+            f", full scan of {', '.join(entry['full_scans'])}" if entry["full_scans"] else "",
+            key[:500], f" | plan: {'; '.join(entry['plan'])}" if entry["plan"] else ""
+        )
+
+    def top(self, limit=10, order_by="total"):
+        """
+        Returns the `limit` most expensive statements.
+
+        :param order_by: "total", "max", "calls" or "mean".
+        """
+        sort_key = {
+            "total": lambda item: item[1].total,
+            "max": lambda item: item[1].max,
+            "calls": lambda item: item[1].calls,
+            "mean": lambda item: item[1].total / item[1].calls,
+        }[order_by]
+        with self._lock:
+            ranked = sorted(self._statements.items(), key=sort_key, reverse=True)[:limit]
+            return [stats.as_dict(sql) for sql, stats in ranked]
+
+    def slow_queries(self):
+        """Returns the most recent slow statements, newest last."""
+        with self._lock:
+            return list(self._recent_slow)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._recent_slow.clear()
+
+
+tracer = QueryTracer()
+if SQL_TRACE:
+    tracer.install()
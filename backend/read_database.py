@@ -1,11 +1,13 @@
 """
 Module: read_database.py
 Used for fetching all data in database.db
+(see table_export.py for NDJSON/CSV exports)
 """
 
 import sqlite3
 
 DATABASE = 'database.db'
+BATCH_SIZE = 1000
 
 def read_table_data(table_name):
     """Reade and prints data from database"""
@@ -15,11 +17,11 @@ def read_table_data(table_name):
 
     try:
         cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
 
         print(f"Data from {table_name}:")
-        for row in rows:
-            print(dict(row)) # Convert row to dictionary for easy reading
+        while rows := cursor.fetchmany(BATCH_SIZE): # Stream instead of loading the whole table
+            for row in rows:
+                print(dict(row)) # Convert row to dictionary for easy reading
         print("\n" + "-"*30 + "\n")
     except sqlite3.OperationalError as e:
         print(f"Error: {e}")
@@ -0,0 +1,133 @@
+"""
+Module: search
+This module provides ranked full-text search over pets.
+
+The `pets_fts` FTS5 table (migration 3) indexes each pet's name, breed, description,
+location and type, and triggers on `pets` keep it in sync. Results are ordered by
+the bm25 rank configured in the migration and paged with a (rank, rowid) cursor.
+
+Snippets are built with private-use marker characters around the matches; the
+text is HTML-escaped before the markers become <mark> tags, so pet data can never
+inject markup.
+
+The index is keyed by the pets rowid, which VACUUM may renumber; run
+`rebuild_search_index` after a VACUUM.
+"""
+
+import html
+import re
+import sqlite3
+from flask import request, jsonify
+
+from catalogue import PET_COLUMNS, parse_limit, encode_cursor, decode_cursor
+from utils import connect_to_database
+from images import attach_variants
+
+DEFAULT_PAGE_SIZE = 20
+MAX_QUERY_TERMS = 10
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+MATCH_START, MATCH_END = "\ue000", "\ue001"  # Placeholders for <mark> and </mark>
+
+
+def build_match_query(text):
+    """
+    Turns free text into an FTS5 query that matches every term.
+
+    Terms are quoted so user input can never use FTS5 operators, and the last term
+    matches as a prefix so partially typed words still find results.
+
+    :return: The MATCH expression, or None if the text holds no searchable terms.
+    """
+    terms = TOKEN_PATTERN.findall(text)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def render_snippet(text):
+    """HTML-escapes a snippet, then wraps its matches in <mark> tags."""
+    if text is None:
+        return None
+    return html.escape(text).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def search_pets():
+    """
+    Searches pets by free text.
+
+    Query parameters: `q` (the search text), `limit` (default 20) and the `cursor`
+    returned as `next_cursor` by the previous page. Each result carries the pet's
+    fields, an HTML `snippet` with matches wrapped in <mark> tags and its `score`
+    (lower is more relevant).
+    """
+    match = build_match_query(request.args.get("q", ""))
+    if match is None:
+        return jsonify({"message": "A search query is required"}), 400
+
+    try:
+        limit = parse_limit(request.args.get("limit")) or DEFAULT_PAGE_SIZE
+        token = request.args.get("cursor")
+        after = decode_cursor(token, "search", 2) if token else None
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # Rank and page on the FTS table alone, then join pets and build snippets
+    # for the page's rows only
+    page_filter = ""
+    binds = [match]
+    if after is not None:
+        page_filter = "AND (rank > ? OR (rank = ? AND rowid > ?))"
+        binds.extend([after[0], after[0], after[1]])
+    binds.extend([limit + 1, match])  # One extra row tells whether another page exists
+
+    columns = ", ".join(f"pets.{column}" for column in PET_COLUMNS)
+    sql = f'''
+        WITH page AS (
+            SELECT rowid, rank FROM pets_fts
+            WHERE pets_fts MATCH ? {page_filter}
+            ORDER BY rank, rowid
+            LIMIT ?
+        )
+        SELECT {columns}, page.rowid AS fts_rowid, page.rank AS score,
+               snippet(pets_fts, -1, '{MATCH_START}', '{MATCH_END}', '…', 12) AS snippet
+        FROM page
+        CROSS JOIN pets_fts  -- CROSS JOIN keeps the page as the outer loop
+        CROSS JOIN pets
+        WHERE pets_fts MATCH ? AND pets_fts.rowid = page.rowid AND pets.rowid = page.rowid
+        ORDER BY page.rank, page.rowid
+    '''
+
+    try:
+        _, cursor = connect_to_database()
+        cursor.execute(sql, binds)
+        rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("search", [rows[-1]["score"], rows[-1]["fts_rowid"]])
+
+    results = [
+        {
+            **{column: row[column] for column in PET_COLUMNS},
+            "snippet": render_snippet(row["snippet"]),
+            "score": row["score"],
+        }
+        for row in rows
+    ]
+    try:
+        attach_variants(cursor, results)
+    except sqlite3.Error as e:
+        return jsonify({"message": f"Database error: {str(e)}"}), 500
+    return jsonify({"pets": results, "next_cursor": next_cursor}), 200
+
+
+def rebuild_search_index(conn):
+    """Rebuilds `pets_fts` from the pets table, e.g. after a VACUUM."""
+    conn.execute("INSERT INTO pets_fts (pets_fts) VALUES ('rebuild')")
+    conn.commit()
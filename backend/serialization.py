@@ -0,0 +1,189 @@
+"""
+Module: serialization
+This module encodes query results as JSON without building a dict per row.
+
+A `RowEncoder` compiles the layout of an object with fixed keys once: the keys are
+sorted and escaped ahead of time into a %-format template, so encoding a row takes
+one escape per string value and one string format. Its output is byte for byte what
+`jsonify` produces for the equivalent dict (compact separators, sorted keys, ASCII
+escapes), so response bodies and their ETags do not depend on which path built them.
+
+Any other value (envelopes, nested lists) is encoded by `dumps`, which uses a
+pluggable encoder chosen with JSON_ENCODER:
+
+- `json` (default): the standard library, with the same output as `jsonify`;
+- `orjson`: faster, when the optional orjson package is installed; non-ASCII
+  characters are then written as UTF-8 instead of \\u escapes;
+- `auto`: orjson when it is installed, otherwise the standard library.
+
+Further encoders can be added with `register_encoder`.
+
+`stream_array` yields a JSON array one batch of rows at a time, for results too
+large to hold in memory as a single body.
+"""
+
+import json
+import os
+from json.encoder import encode_basestring_ascii
+from operator import itemgetter
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only where orjson is missing
+    orjson = None
+
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "json")
+MIMETYPE = "application/json"
+CHUNK_ROWS = 1000  # Rows encoded per string format by RowEncoder.encode_many
+
+_stdlib_encoder = json.JSONEncoder(separators=(",", ":"), sort_keys=True)
+
+
+def _stdlib_dumps(obj):
+    return _stdlib_encoder.encode(obj).encode("ascii")
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+
+# name -> function encoding a value to JSON bytes
+ENCODERS = {"json": _stdlib_dumps}
+if orjson is not None:
+    ENCODERS["orjson"] = _orjson_dumps
+
+
+def register_encoder(name, encode):
+    """Makes `encode(obj) -> bytes` selectable as the JSON encoder `name`."""
+    ENCODERS[name] = encode
+
+
+def get_encoder(name=None):
+    """
+    Returns the encoding function for `name` (default: JSON_ENCODER).
+
+    :raises ValueError: If no such encoder is available.
+    """
+    name = name or JSON_ENCODER
+    if name == "auto":
+        name = "orjson" if "orjson" in ENCODERS else "json"
+    if name not in ENCODERS:
+        raise ValueError(f"JSON encoder must be one of: auto, {', '.join(sorted(ENCODERS))}")
+    return ENCODERS[name]
+
+
+_dumps = [get_encoder()]
+
+
+def use_encoder(name):
+    """Switches the encoder used by `dumps`, e.g. for a benchmark."""
+    _dumps[0] = get_encoder(name)
+
+
+def dumps(obj):
+    """Encodes `obj` as JSON bytes with the configured encoder."""
+    return _dumps[0](obj)
+
+
+def encode_value(value):
+    """Encodes one column value as JSON text."""
+    if value.__class__ is str:
+        return encode_basestring_ascii(value)
+    if value is None:
+        return "null"
+    if value.__class__ is int:
+        return int.__repr__(value)
+    if value.__class__ is float:
+        return _stdlib_encoder.encode(value)  # Also spells NaN and Infinity like jsonify
+    return dumps(value).decode()
+
+
+def json_object(members):
+    """Joins already encoded member values into a JSON object, with keys sorted like `jsonify`."""
+    return "{" + ",".join(
+        encode_basestring_ascii(name) + ":" + members[name] for name in sorted(members)
+    ) + "}"
+
+
+def json_response(text, status=200):
+    """Wraps encoded JSON text in a response, ending with a newline like `jsonify`."""
+    return Response((text + "\n").encode(), status=status, mimetype=MIMETYPE)
+
+
+class RowEncoder:
+    """
+    Encodes rows whose leading values are `columns` as JSON objects.
+
+    Rows may be tuples or `sqlite3.Row`s and may carry more values than `columns`
+    (such as a sort key), which are ignored.
+    """
+
+    def __init__(self, columns, sort_keys=True):
+        self.columns = tuple(columns)
+        order = sorted(range(len(self.columns)), key=self.columns.__getitem__) if sort_keys \
+            else range(len(self.columns))
+        # Reads a row's values in key order; itemgetter returns a bare value for one index
+        self._values = itemgetter(*order) if len(order) > 1 else lambda row: (row[order[0]],)
+        self._keys = [encode_basestring_ascii(self.columns[index]) for index in order]
+        self._template = "{" + ",".join(
+            key.replace("%", "%%") + ":%s" for key in self._keys
+        ) + "}"
+
+    def encode(self, row, extra=None):
+        """
+        Returns the JSON text of one row.
+
+        :param extra: Optional {key: value} members to add, e.g. nested lists; they
+                      are encoded with `dumps` and placed in key order.
+        """
+        values = [
+            encode_basestring_ascii(value) if value.__class__ is str else encode_value(value)
+            for value in self._values(row)
+        ]
+        if not extra:
+            return self._template % tuple(values)
+        members = dict(zip(self._keys, values))
+        for name, value in extra.items():
+            members[encode_basestring_ascii(name)] = dumps(value).decode()
+        return "{" + ",".join(key + ":" + members[key] for key in sorted(members)) + "}"
+
+    def encode_many(self, rows, extra=None):
+        """
+        Returns the JSON texts of a list of rows joined by commas, without brackets.
+
+        :param extra: Optional function returning the extra members of a row, or None.
+        """
+        if extra is not None:
+            return ",".join([self.encode(row, extra(row)) for row in rows])
+        # One format of the template repeated per row, for CHUNK_ROWS rows at a time:
+        # far fewer calls than a format per row, and bounded intermediate lists
+        get_values = self._values
+        chunks = []
+        for start in range(0, len(rows), CHUNK_ROWS):
+            chunk = rows[start:start + CHUNK_ROWS]
+            values = [
+                encode_basestring_ascii(value) if value.__class__ is str else encode_value(value)
+                for row in chunk for value in get_values(row)
+            ]
+            chunks.append(",".join([self._template] * len(chunk)) % tuple(values))
+        return ",".join(chunks)
+
+    def encode_rows(self, rows, extra=None):
+        """Returns a list of rows as a JSON array; see `encode_many`."""
+        return "[" + self.encode_many(rows, extra) + "]"
+
+
+def stream_array(encoder, batches, extra=None):
+    """
+    Yields a JSON array of all rows in `batches`, one text chunk per batch.
+
+    :param encoder: A `RowEncoder`.
+    :param batches: An iterable of lists of rows, such as successive `fetchmany` results.
+    """
+    separator = "["
+    for rows in batches:
+        if rows:
+            yield separator + encoder.encode_many(rows, extra)
+            separator = ","
+    yield "[]" if separator == "[" else "]"
@@ -0,0 +1,183 @@
+"""
+Module: table_export
+This module streams whole tables out of the database as NDJSON, a JSON array or CSV.
+
+Rows are read with `fetchmany` and encoded one batch at a time, straight from the
+row tuples (see serialization.py), so memory use stays flat however large the
+table is. Exports can be projected to a subset of columns and narrowed with simple
+`column <op> value` filters, which are validated against the table's columns and
+bound as parameters.
+
+It can be used through the `GET /export/<table>` endpoint or from the command line:
+
+    python table_export.py pets --format csv --columns name,breed --where "status=available"
+"""
+
+import argparse
+import csv
+import io
+import re
+import sys
+from flask import Response, request, jsonify
+
+from connection_pool import DATABASE, create_connection, pool
+from serialization import RowEncoder, stream_array
+
+# Tables that may be exported; admins are never exported
+EXPORTABLE_TABLES = ("pets", "users", "favorites", "questionnaires", "adoption_applications")
+# Credentials never leave the database
+EXCLUDED_COLUMNS = {"password"}
+
+FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json", "csv": "text/csv"}
+BATCH_SIZE = 1000
+
+WHERE_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.*)$")
+
+
+def table_columns(conn, table):
+    """Returns the exportable column names of `table`, in schema order."""
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return [row[1] for row in rows if row[1] not in EXCLUDED_COLUMNS]
+
+
+def build_export_query(conn, table, columns=None, where=()):
+    """
+    Builds a validated SELECT for an export.
+
+    :param conn: An open database connection, used to read the table's columns.
+    :param table: One of EXPORTABLE_TABLES.
+    :param columns: Optional list of columns to project.
+    :param where: Iterable of filter strings such as "status=available".
+    :return: A tuple of (sql, bind_parameters, columns).
+    :raises ValueError: If the table, a column or a filter is not allowed.
+    """
+    if table not in EXPORTABLE_TABLES:
+        raise ValueError(f"table must be one of: {', '.join(EXPORTABLE_TABLES)}")
+    available = table_columns(conn, table)
+    columns = list(columns) if columns else available
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    clauses, binds = [], []
+    for condition in where:
+        match = WHERE_PATTERN.match(condition)
+        if not match or match.group(1) not in available:
+            raise ValueError(f"Invalid filter: {condition}")
+        column, operator, value = match.groups()
+        clauses.append(f"{column} {operator} ?")
+        binds.append(value)
+
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql, binds, columns
+
+
+def iter_batches(conn, sql, binds, batch_size=BATCH_SIZE):
+    """Yields lists of row tuples, `batch_size` rows at a time."""
+    cursor = conn.execute(sql, binds)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def encode_ndjson(columns, batches):
+    """Yields one NDJSON text chunk per batch of rows."""
+    encoder = RowEncoder(columns, sort_keys=False)
+    for rows in batches:
+        yield "".join([encoder.encode(row) + "\n" for row in rows])
+
+
+def encode_json(columns, batches):
+    """Yields a JSON array of row objects, one text chunk per batch of rows."""
+    yield from stream_array(RowEncoder(columns, sort_keys=False), batches)
+
+
+def encode_csv(columns, batches):
+    """Yields a CSV header and then one CSV text chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # Header only, for an empty export
+
+
+ENCODERS = {"ndjson": encode_ndjson, "json": encode_json, "csv": encode_csv}
+
+
+def export_table(table):
+    """
+    Streams a table as NDJSON (default), a JSON array or CSV.
+
+    Query parameters: `format` (`ndjson`, `json` or `csv`), `columns` (comma-separated
+    projection) and any number of `where` filters such as `status=available`.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(FORMATS)}"}), 400
+    columns = [c for c in request.args.get("columns", "").split(",") if c.strip()]
+
+    # The body outlives the app context, so the response owns its pooled connection
+    conn = pool.acquire()
+    try:
+        sql, binds, columns = build_export_query(
+            conn, table, [c.strip() for c in columns], request.args.getlist("where")
+        )
+    except ValueError as e:
+        pool.release(conn)
+        return jsonify({"message": str(e)}), 400
+
+    released = []
+
+    def release():
+        # Exactly once: a second release could hand back the connection after
+        # another request has checked it out
+        if not released:
+            released.append(True)
+            pool.release(conn)
+
+    def generate():
+        yield from ENCODERS[fmt](columns, iter_batches(conn, sql, binds))
+        release()
+
+    response = Response(generate(), mimetype=FORMATS[fmt])
+    # Also covers clients that disconnect before the body is fully sent
+    response.call_on_close(release)
+    response.headers["Content-Disposition"] = f'attachment; filename="{table}.{fmt}"'
+    return response
+
+
+def main(argv=None):
+    """Command-line entry point; writes the export to standard output."""
+    parser = argparse.ArgumentParser(description="Export a table as NDJSON, a JSON array or CSV.")
+    parser.add_argument("table", choices=EXPORTABLE_TABLES)
+    parser.add_argument("--format", choices=tuple(FORMATS), default="ndjson")
+    parser.add_argument("--columns", help="Comma-separated columns to export")
+    parser.add_argument("--where", action="append", default=[], help='Filter such as "status=available"')
+    parser.add_argument("--database", default=DATABASE)
+    args = parser.parse_args(argv)
+
+    conn = create_connection(args.database)
+    try:
+        columns = args.columns.split(",") if args.columns else None
+        try:
+            sql, binds, columns = build_export_query(conn, args.table, columns, args.where)
+        except ValueError as e:
+            parser.error(str(e))
+        for chunk in ENCODERS[args.format](columns, iter_batches(conn, sql, binds)):
+            sys.stdout.write(chunk)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
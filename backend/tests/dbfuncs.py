@@ -1,4 +1,22 @@
+import os
 import sqlite3
+import sys
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import grant_admin
+from identity_cache import identity_cache
+
+
+def admin_headers(client, username="testadmin"):
+    """Registers `username`, makes them an admin and returns headers carrying their token."""
+    credentials = {"username": username, "password": "admin-password"}
+    client.post('/register', json={**credentials, "email": f"{username}@example.com"})
+    grant_admin(username)
+    token = client.post('/login', json=credentials).get_json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
 
 def clear_and_reinitialize_database():
     """Clears all data by dropping tables and reinitializing the database."""
@@ -47,4 +65,5 @@ def clear_and_reinitialize_database():
     # Commit the changes and close the connection
     conn.commit()
     conn.close()
+    identity_cache.clear()  # The dropped users' emails must not map to their old ids
     print("Database cleared and reinitialized successfully.")
@@ -0,0 +1,109 @@
+"""
+This module contains tests for the batch application status endpoints.
+"""
+
+import json
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import create_connection, DATABASE
+from main import app
+from application_status import fetch_applications
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client with two users and their applications."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    conn = create_connection(DATABASE)
+    conn.executemany(
+        'INSERT INTO users (user_id, username, password, email) VALUES (?, ?, ?, ?)',
+        [(1, "ann", "x", "ann@example.com"), (2, "bob", "x", "bob@example.com")]
+    )
+    conn.executemany(
+        'INSERT INTO adoption_applications (user_id, pet_name, location, status) VALUES (?, ?, ?, ?)',
+        [
+            (1, "Jay", "Hartford, CT", "pending"),
+            (1, "Max", "Stamford, CT", "approved"),
+            (2, "Luna", "Norwich, CT", "pending"),
+            (1, "Rocky", "Danbury, CT", "pending"),
+        ]
+    )
+    conn.commit()
+    conn.close()
+    with app.test_client() as client:
+        yield client
+
+
+def pet_names(response):
+    return [application["pet_name"] for application in response.get_json()["applications"]]
+
+
+def test_status_returns_every_application_of_the_users(client):
+    response = client.get('/status', query_string={"user_id": "1,2"})
+    assert response.status_code == 200
+    assert pet_names(response) == ["Jay", "Max", "Luna", "Rocky"]
+    assert set(response.get_json()["applications"][0]) == {
+        "application_id", "user_id", "pet_name", "location", "submission_date", "status"
+    }
+
+    response = client.get('/status?application_id=2&user_id=2')
+    assert pet_names(response) == ["Max", "Luna"]
+
+
+def test_status_filters_and_pages(client):
+    response = client.get('/status?user_id=1&user_id=2&status=pending&limit=2')
+    body = response.get_json()
+    assert pet_names(response) == ["Jay", "Luna"]
+    response = client.get('/status', query_string={
+        "user_id": "1,2", "status": "pending", "limit": 2, "cursor": body["next_cursor"]
+    })
+    assert pet_names(response) == ["Rocky"]
+    assert response.get_json()["next_cursor"] is None
+
+
+def test_status_batch_body(client):
+    response = client.post('/status/batch', json={"user_ids": [2], "application_ids": [4], "status": ["pending"]})
+    assert pet_names(response) == ["Luna", "Rocky"]
+    response = client.post('/status/batch', json={"user_ids": ["two"]})
+    assert response.status_code == 400
+    response = client.post('/status/batch', json={})
+    assert response.get_json() == {"message": "Application ID or User ID is required"}
+
+
+def test_lookup_by_ids_and_users_uses_indexes(client):
+    conn = create_connection(DATABASE)
+    cursor = conn.cursor()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert [app["pet_name"] for app in fetch_applications(cursor, [3], [1], [], 10)[0]] == [
+        "Jay", "Max", "Luna", "Rocky"
+    ]
+    conn.set_trace_callback(None)
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statements[-1])]  # Values inlined
+    conn.close()
+    assert not any(step.startswith("SCAN adoption_applications") for step in plan), plan
+    assert any("idx_applications_user" in step for step in plan)
+
+
+def test_status_token_scopes_to_own_applications(client):
+    client.post('/register', data=json.dumps({
+        "username": "carl", "password": "password123", "email": "carl@example.com"
+    }), content_type='application/json')
+    conn = create_connection(DATABASE)
+    conn.execute("UPDATE adoption_applications SET user_id = 3 WHERE pet_name = 'Rocky'")
+    conn.commit()
+    conn.close()
+    token = client.post('/login', json={"username": "carl", "password": "password123"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert pet_names(client.get('/status', headers=headers)) == ["Rocky"]
+    assert pet_names(client.get('/status?application_id=1,4', headers=headers)) == ["Rocky"]
+    assert client.get('/status?user_id=1', headers=headers).status_code == 403
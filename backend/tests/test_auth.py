@@ -0,0 +1,95 @@
+"""
+This module contains tests for signed session tokens on favorites, status and admin routes.
+"""
+
+import json
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import grant_admin, initialize_database
+from main import app
+import auth
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        yield client
+
+
+def login(client, username, email):
+    client.post('/register', data=json.dumps({
+        "username": username, "password": "password123", "email": email
+    }), content_type='application/json')
+    response = client.post('/login', data=json.dumps({
+        "username": username, "password": "password123"
+    }), content_type='application/json')
+    return response.get_json()
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_token_identifies_user_for_favorites(client):
+    body = login(client, "tokenuser", "tokenuser@example.com")
+    assert body["role"] == "user" and body["expires_in"] == auth.TOKEN_MAX_AGE
+    headers = bearer(body["token"])
+
+    response = client.post('/favorites', json={"pet_name": "Max"}, headers=headers)
+    assert response.status_code == 200
+    response = client.get('/favorites', headers=headers)
+    assert [pet["name"] for pet in response.get_json()["favorites"]] == ["Max"]
+    response = client.delete('/favorites', json={"pet_name": "Max"}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_invalid_and_revoked_tokens_are_rejected(client):
+    token = login(client, "tokenuser", "tokenuser@example.com")["token"]
+
+    response = client.get('/favorites', headers=bearer(token[:-2] + "xx"))
+    assert response.status_code == 401
+    assert response.get_json() == {"message": "Invalid token"}
+
+    assert client.post('/logout', headers=bearer(token)).status_code == 200
+    response = client.get('/favorites', headers=bearer(token))
+    assert response.get_json() == {"message": "Token revoked"}
+    assert client.post('/logout').status_code == 401
+
+
+def test_expired_token_is_rejected(client, monkeypatch):
+    token = login(client, "tokenuser", "tokenuser@example.com")["token"]
+    monkeypatch.setattr(auth, "TOKEN_MAX_AGE", -1)
+    response = client.get('/favorites', headers=bearer(token))
+    assert response.get_json() == {"message": "Token expired"}
+
+
+def test_admin_routes_check_role(client):
+    user_token = login(client, "tokenuser", "tokenuser@example.com")["token"]
+    assert login(client, "boss", "boss@admin.com")["role"] == "user"  # Email domains grant nothing
+    assert grant_admin("boss")
+    admin = login(client, "boss", "boss@admin.com")
+    assert admin["role"] == "admin"
+
+    response = client.delete('/pets', json={"name": "Max", "location": "Stamford, CT"})
+    assert response.status_code == 401
+
+    response = client.delete('/pets', json={"name": "Max", "location": "Stamford, CT"}, headers=bearer(user_token))
+    assert response.status_code == 403
+    response = client.delete('/pets', json={"name": "Max", "location": "Stamford, CT"}, headers=bearer(admin["token"]))
+    assert response.status_code == 200
+
+
+def test_auth_required_rejects_email_only_requests(client, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_REQUIRED", True)
+    response = client.get('/favorites', query_string={"email": "tokenuser@example.com"})
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
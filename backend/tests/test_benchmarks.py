@@ -0,0 +1,99 @@
+"""
+This module contains tests for the benchmark dataset generator, result helpers and load driver.
+"""
+
+import asyncio
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from connection_pool import create_connection
+from benchmarks import datagen
+from benchmarks.results import summarize_latencies, compare
+from benchmarks import load
+from benchmarks.run import WSGIServerTransport
+from database import grant_admin, initialize_database
+from main import app
+
+
+@pytest.fixture
+def server():
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    transport = WSGIServerTransport(app)
+    yield transport
+    transport.close()
+
+
+def table_dump(path):
+    conn = create_connection(path)
+    try:
+        return {
+            table: [tuple(row) for row in conn.execute(f'SELECT * FROM {table} ORDER BY 1, 2')]
+            for table in ("users", "pets", "favorites", "adoption_applications", "questionnaires")
+        }
+    finally:
+        conn.close()
+
+
+def test_datagen_is_deterministic(tmp_path):
+    sizes = {"pets": 40, "users": 10, "favorites": 55, "applications": 20}
+    first, second = str(tmp_path / "a.db"), str(tmp_path / "b.db")
+    datagen.generate(first, **sizes)
+    datagen.generate(second, **sizes)
+
+    dump = table_dump(first)
+    assert {table: len(rows) for table, rows in dump.items()} == {
+        "users": 10 + datagen.ADMINS, "pets": 40, "favorites": 55, "adoption_applications": 20, "questionnaires": 5
+    }
+    # Password hashes are salted; everything else must match exactly
+    strip = lambda rows: [row[:2] + row[3:] for row in rows]  # noqa: E731
+    assert strip(dump.pop("users")) == strip(table_dump(second)["users"])
+    second_dump = table_dump(second)
+    second_dump.pop("users")
+    assert dump == second_dump
+    assert datagen.read_meta(first) == {"seed": datagen.DEFAULT_SEED, "admins": datagen.ADMINS, **sizes}
+
+
+def test_summaries_and_comparison():
+    stats = summarize_latencies([0.001 * n for n in range(1, 101)])
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50.0, 95.0, 99.0, 100.0)
+    old = {"results": [{"scenario": "login", "transport": "wsgi", "p": 1}]}
+    new = {"results": [{"scenario": "login", "transport": "wsgi", "p": 2},
+                       {"scenario": "search", "transport": "wsgi", "p": 3}]}
+    assert [key for key, _, _ in compare(old, new)] == [("login", "wsgi")]
+
+
+def test_load_mix_parsing_and_error_classes():
+    assert load.parse_mix("browse=3,edit") == {"browse": 3.0, "edit": 1.0}
+    with pytest.raises(ValueError):
+        load.parse_mix("dance=1")
+    assert load.classify(409, b"", (200, 409)) is None
+    assert load.classify(500, b'{"message": "Database error: database is locked"}', (200,)) == "database_locked"
+    assert load.classify(404, b"", (200,)) == "http_404"
+
+
+def test_load_stage_against_server(server):
+    client = app.test_client()
+    client.post("/register", json={
+        "username": "user1", "password": datagen.BENCH_PASSWORD, "email": "user1@example.com"
+    })
+    client.post("/register", json={
+        "username": "admin1", "password": datagen.BENCH_PASSWORD, "email": "admin1@example.com"
+    })
+    grant_admin("admin1")
+    context = {"host": "127.0.0.1", "port": server.port, "seed": 1, "users": 1}
+    asyncio.run(load.prepare(context))
+    assert context["pets"] and context["admin_token"]
+
+    mix = {"browse": 2, "search": 1, "favorite": 2, "edit": 1}
+    stage = asyncio.run(load.run_stage(context, 3, 0.5, mix, 0, 0.25))
+    assert stage["concurrency"] == 3 and stage["requests"] > 0
+    assert set(stage["routes"]) <= {"GET /pets", "GET /pets/search", "POST /favorites",
+                                    "DELETE /favorites", "POST /login", "PUT /pets"}
+    assert all(result["errors"] == 0 for result in stage["routes"].values()), stage["routes"]
+    assert sum(bucket["requests"] for bucket in stage["timeline"]) == stage["requests"]
@@ -0,0 +1,95 @@
+"""
+This module contains tests for negotiated response compression.
+"""
+
+import gzip
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from catalogue_cache import catalogue_cache
+from main import app
+from dbfuncs import admin_headers
+import compression
+import metrics
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Set up the Client with a fresh database, an empty cache and a low size threshold.
+    """
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    catalogue_cache.clear()
+    metrics.registry.clear()
+    monkeypatch.setattr(compression, "MIN_SIZE", 100)
+    yield app.test_client()
+
+
+def test_catalogue_is_compressed_once_and_revalidated(client):
+    plain = client.get('/pets')
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    first = client.get('/pets', headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(first.get_data()) == plain.get_data()
+    assert first.get_etag()[0] == plain.get_etag()[0] + "-gzip"
+
+    second = client.get('/pets', headers={"Accept-Encoding": "gzip"})
+    assert second.get_data() == first.get_data()
+    revalidated = client.get('/pets', headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    series = metrics.collect()
+    route = (("encoding", "gzip"), ("route", "/pets"))
+    assert series[("http_response_compression_ratio", route)][2] == 1  # Compressed only once
+    assert series[("http_responses_compressed_total", (("cached", "true"),) + route)] == 1
+
+
+def test_negotiation(client, monkeypatch):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip;q=0.5, br;q=0.4"}):
+        assert compression.negotiate(1000) == "gzip"
+        assert compression.negotiate(10) is None
+    with app.test_request_context(headers={"Accept-Encoding": "identity"}):
+        assert compression.negotiate(1000) is None
+    monkeypatch.setattr(compression, "ENCODINGS", ("br", "gzip"))
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        assert compression.negotiate(1000) == "br"
+
+
+def test_brotli(client):
+    brotli = pytest.importorskip("brotli")
+    response = client.get('/pets', headers={"Accept-Encoding": "br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()) == client.get('/pets').get_data()
+
+
+def test_small_responses_are_left_alone(client, monkeypatch):
+    monkeypatch.setattr(compression, "MIN_SIZE", 10 ** 6)
+    response = client.get('/pets/facets', headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Content-Encoding" not in client.get('/pets', headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_streamed_export_is_compressed(client):
+    response = client.get('/export/pets', query_string={"format": "csv"}, headers={"Accept-Encoding": "gzip", **admin_headers(client)})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert "name" in lines[0].split(",")
+    assert len(lines) == 7  # Header and the six default pets
+
+
+def test_route_levels(monkeypatch):
+    monkeypatch.setattr(compression, "ROUTE_LEVELS", {})
+    compression.configure_route('/example', gzip_level=2)
+    assert compression.level_for("gzip", '/example') == 2
+    assert compression.level_for("br", '/example') == compression.BROTLI_QUALITY
+    assert compression.level_for("gzip", '/other') == compression.GZIP_LEVEL
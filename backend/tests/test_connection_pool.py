@@ -0,0 +1,147 @@
+"""
+This module contains tests for the pooled SQLite connection manager.
+"""
+
+import sqlite3
+import threading
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import connection_pool
+from connection_pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Creates a small pool over a temporary database file."""
+    pool = ConnectionPool(database=str(tmp_path / "pool.db"), max_size=2, timeout=0.2)
+    yield pool
+    pool.close_all()
+
+
+def test_connection_is_reused(pool):
+    """A released connection is handed out again and counted as a hit."""
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_connection_is_configured(pool):
+    """Pooled connections use WAL journaling and a busy timeout."""
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    pool.release(conn)
+
+
+def test_pool_is_bounded(pool):
+    """Acquiring past max_size times out instead of opening more connections."""
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert isinstance(PoolTimeout(), sqlite3.OperationalError)
+    pool.release(first)
+    pool.release(second)
+
+
+def test_waiting_thread_gets_released_connection(pool):
+    """A thread blocked on a full pool receives the next released connection."""
+    held = [pool.acquire(), pool.acquire()]
+    received = []
+
+    worker = threading.Thread(target=lambda: received.append(pool.acquire()))
+    worker.start()
+    pool.release(held[0])
+    worker.join()
+
+    assert received == [held[0]]
+    assert pool.stats()["waits"] >= 1
+
+
+def test_release_rolls_back_open_transaction(pool):
+    """Uncommitted work is discarded when a connection returns to the pool."""
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(conn)
+
+
+def test_close_all_retires_checked_out_connections(pool):
+    """Connections checked out before close_all are closed on release."""
+    conn = pool.acquire()
+    pool.close_all()
+    pool.release(conn)
+
+    assert pool.stats()["discarded"] == 1
+    assert pool.acquire() is not conn
+
+
+def test_double_release_is_ignored(pool):
+    """Releasing the same connection twice does not duplicate it in the pool."""
+    conn = pool.acquire()
+    pool.release(conn)
+    pool.release(conn)
+    assert pool.stats()["idle"] == 1
+
+
+def test_thread_gets_back_its_own_connection(pool):
+    """An idle connection goes back to the thread that used it last, if it asks again."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def use():
+        conn = pool.acquire()
+        pool.release(conn)
+        return conn
+
+    with ThreadPoolExecutor(max_workers=1) as other_thread:
+        mine = pool.acquire()
+        theirs = other_thread.submit(use).result()
+        pool.release(mine)  # The most recently released connection is now this thread's
+        assert other_thread.submit(use).result() is theirs
+        assert pool.acquire() is mine
+    assert pool.stats()["same_thread"] == 2
+    pool.release(mine)
+
+
+def test_foreign_keys_are_enforced(pool):
+    """Pooled connections enforce foreign keys, so ON DELETE CASCADE takes effect."""
+    conn = pool.acquire()
+    conn.executescript('''
+        CREATE TABLE parent (id INTEGER PRIMARY KEY);
+        CREATE TABLE child (parent_id INTEGER REFERENCES parent (id) ON DELETE CASCADE);
+        INSERT INTO parent VALUES (1);
+        INSERT INTO child VALUES (1);
+        DELETE FROM parent;
+    ''')
+    assert conn.execute("SELECT COUNT(*) FROM child").fetchone()[0] == 0
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO child VALUES (2)")
+    pool.release(conn)
+
+
+def test_new_connections_run_the_warm_statements(pool, monkeypatch):
+    """New connections prepare the registered hot statements; ones the schema lacks are skipped."""
+    seen = []
+    monkeypatch.setattr(connection_pool, "WARM_STATEMENTS", [])
+    monkeypatch.setattr(connection_pool, "STATEMENT_OBSERVERS", [lambda cursor, sql, *_: seen.append(sql)])
+    connection_pool.warm_statement("SELECT * FROM missing_table")
+    connection_pool.warm_statement("SELECT ?", (1,))
+    conn = pool.acquire()
+    assert seen[-2:] == ["SELECT * FROM missing_table", "SELECT ?"]
+    pool.release(conn)
+    seen.clear()
+    pool.release(pool.acquire())  # Reused connections are not warmed again
+    assert seen == []
@@ -0,0 +1,75 @@
+"""
+This module contains tests for the combined dashboard endpoint.
+"""
+
+import pytest
+import asyncio
+import time
+import sys
+import os
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import pool
+from main import app
+import dashboard
+
+
+@pytest.fixture
+def client():
+    """
+    Set up the Client with a fresh database and one user with a favorite pet.
+    """
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    client = app.test_client()
+    client.post('/register', json={"username": "dash", "password": "password1", "email": "dash@example.com"})
+    client.post('/favorites', json={"email": "dash@example.com", "pet_name": "Jay"})
+    yield client
+
+
+def test_dashboard_combines_sections(client):
+    response = client.get('/dashboard?email=dash@example.com&limit=1')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["partial"] is False and data["errors"] == {}
+    assert len(data["catalogue"]["pets"]) == 1 and data["catalogue"]["next_cursor"]
+    assert [pet["name"] for pet in data["favorites"]["favorites"]] == ["Jay"]
+    assert data["applications"] == {"applications": [], "next_cursor": None}
+
+    # The catalogue page is shared with GET /pets through the cache
+    assert client.get('/pets?limit=1').get_json() == data["catalogue"]
+
+
+def test_dashboard_without_user_and_unknown_user(client):
+    data = client.get('/dashboard').get_json()
+    assert set(data) == {"catalogue", "errors", "partial"}
+    assert client.get('/dashboard?email=nobody@example.com').status_code == 404
+    assert client.get('/dashboard?favorites_limit=abc').status_code == 400
+
+
+def test_slow_section_gives_partial_result(client, monkeypatch):
+    def slow_applications(*args):
+        time.sleep(0.5)
+        return [], None
+    monkeypatch.setattr(dashboard, "fetch_applications", slow_applications)
+    monkeypatch.setattr(dashboard, "SECTION_TIMEOUT", 0.1)
+
+    data = client.get('/dashboard?email=dash@example.com').get_json()
+    assert data["partial"] is True
+    assert data["errors"] == {"applications": "Timed out"}
+    assert "applications" not in data and data["favorites"]["favorites"]
+
+
+def test_timed_out_query_is_interrupted(client):
+    endless = "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r) SELECT COUNT(*) FROM r"
+    with pytest.raises(dashboard.SectionTimeout):
+        asyncio.run(dashboard.run_section(lambda cursor: cursor.execute(endless).fetchone(), 0.1))
+
+    deadline = time.monotonic() + 2
+    while pool.stats()["in_use"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["in_use"] == 0
@@ -1,4 +1,5 @@
 import sqlite3
+import threading
 import pytest
 import sys
 import os
@@ -6,7 +7,8 @@ import os
 # Add the parent directory to sys.path so we can import from the /backend folder
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
-from database import initialize_database  # Import from /backend/database.py
+from database import initialize_database, migrate_database, seed_default_pets  # Import from /backend/database.py
+from migrations import MIGRATIONS
 
 BASE_URL = "http://127.0.0.1:5001"
 
@@ -81,3 +83,54 @@ def test_adoption_applications_table_exists(setup_database):
     conn.close()
     assert result is not None, "Adoption applications table should exist"
   
+
+def test_migrations_are_recorded(setup_database):
+    """Test that every migration is recorded in schema_migrations."""
+    conn = sqlite3.connect(DB_PATH)
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    conn.close()
+    assert versions == [number for number, _, _ in MIGRATIONS]
+
+def test_migrate_keeps_existing_data(tmp_path):
+    """Test that migrating an up-to-date database is a no-op and keeps its rows."""
+    path = str(tmp_path / "migrate.db")
+    assert migrate_database(path) == [number for number, _, _ in MIGRATIONS]
+    seed_default_pets(path)
+
+    assert migrate_database(path) == []
+    conn = sqlite3.connect(path)
+    count = conn.execute("SELECT COUNT(*) FROM pets").fetchone()[0]
+    conn.close()
+    assert count == 6
+
+def test_concurrent_migrations_apply_once(tmp_path):
+    """Test that workers starting together apply each migration exactly once."""
+    path = str(tmp_path / "concurrent.db")
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(migrate_database(path))) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    applied = sorted(version for result in results for version in result)
+    assert applied == [number for number, _, _ in MIGRATIONS]
+
+def test_nearby_index_migrations_upgrade_existing_pets(tmp_path):
+    """Test that migration 4 indexes existing pets and migration 9 moves the index to places."""
+    from migrations import migrate
+    conn = sqlite3.connect(str(tmp_path / "upgrade.db"))
+    migrate(conn, target=3)
+    conn.execute(
+        "INSERT INTO pets (name, age, description, breed, picture_url, status, type, location) "
+        "VALUES ('Jay', '1', 'Golden Lab', 'Lab', '/jay.jpg', 'available', 'dog', 'Hartford, CT')"
+    )
+    conn.commit()
+
+    assert migrate(conn, target=4) == [4]
+    assert conn.execute("SELECT COUNT(*) FROM pets_geo").fetchone()[0] == 1
+
+    migrate(conn)
+    assert conn.execute("SELECT name FROM sqlite_schema WHERE name = 'pets_geo'").fetchone() is None
+    assert conn.execute("SELECT COUNT(*) FROM places_geo WHERE place = 'Hartford, CT'").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,111 @@
+"""
+This module contains tests for the trigger-maintained facet counts behind /pets/facets.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from connection_pool import create_connection
+from database import initialize_database
+from facets import FACET_KEY, age_bucket_sql
+from main import app
+from dbfuncs import admin_headers
+
+
+@pytest.fixture
+def client():
+    """
+    Set up the Client with a fresh database holding the default pets.
+    """
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
+    yield client
+
+
+def assert_counts_match_pets():
+    """The maintained tables must equal GROUP BYs over pets."""
+    conn = create_connection("database.db")
+    try:
+        maintained = conn.execute(f"SELECT {FACET_KEY}, count FROM pet_facet_counts ORDER BY 1, 2, 3, 4, 5")
+        recomputed = conn.execute(f'''
+            SELECT type, breed, location, status, {age_bucket_sql("age")}, COUNT(*)
+            FROM pets GROUP BY 1, 2, 3, 4, 5 ORDER BY 1, 2, 3, 4, 5
+        ''')
+        assert [tuple(row) for row in maintained] == [tuple(row) for row in recomputed]
+        totals = conn.execute("SELECT facet, value, count FROM pet_facet_values ORDER BY 1, 2")
+        expected = conn.execute(" UNION ALL ".join(
+            f"SELECT '{facet}', {column}, COUNT(*) FROM pets GROUP BY 2" for facet, column in (
+                ("age_bucket", age_bucket_sql("age")), ("breed", "breed"), ("location", "location"),
+                ("status", "status"), ("type", "type"),
+            )
+        ))
+        assert [tuple(row) for row in totals] == sorted(tuple(row) for row in expected)
+    finally:
+        conn.close()
+
+
+def counts(data, facet):
+    return {item["value"]: item["count"] for item in data["facets"][facet]}
+
+
+def test_facets_of_default_pets(client):
+    response = client.get('/pets/facets')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 6
+    assert counts(data, "type") == {"cat": 2, "dog": 4}
+    assert [item["value"] for item in data["facets"]["age_bucket"]] == ["0-1", "2-3", "4-6"]
+    assert_counts_match_pets()
+
+
+def test_triggers_follow_writes(client):
+    pet = {"name": "Buddy", "age": "12", "description": "Calm", "breed": "Beagle",
+           "picture_url": "/buddy.jpg", "status": "available", "type": "dog", "location": "Hartford, CT"}
+    client.post('/pets', json=pet)
+    assert counts(client.get('/pets/facets').get_json(), "age_bucket")["10+"] == 1
+    assert_counts_match_pets()
+
+    client.put('/pets', json={**pet, "age": "2", "status": "pending", "description": "Edited"})
+    data = client.get('/pets/facets').get_json()
+    assert "10+" not in counts(data, "age_bucket")
+    assert counts(data, "status") == {"available": 6, "pending": 1}
+    assert_counts_match_pets()
+
+    client.delete('/pets', json={"name": "Buddy", "location": "Hartford, CT"})
+    assert client.get('/pets/facets').get_json()["total"] == 6
+    assert_counts_match_pets()
+
+
+def test_facets_are_narrowed_by_other_selections(client):
+    data = client.get('/pets/facets?type=cat').get_json()
+    assert data["total"] == 2
+    assert counts(data, "breed") == {"Persian": 1, "Tabby": 1}
+    # The selected facet itself still lists every alternative
+    assert counts(data, "type") == {"cat": 2, "dog": 4}
+
+    assert client.get('/pets/facets?type=cat&status=adopted').get_json()["total"] == 0
+    assert client.get('/pets/facets?age_bucket=old').status_code == 400
+
+
+def test_facets_accept_age_bounds_like_the_catalogue(client):
+    all_buckets = client.get('/pets/facets').get_json()["facets"]["age_bucket"]
+    # Whole buckets come from the counts table, split buckets from the pets themselves
+    for query in ("min_age=2&max_age=3", "min_age=2", "max_age=1", "min_age=3&max_age=4", "min_age=5&max_age=2"):
+        data = client.get(f'/pets/facets?{query}').get_json()
+        names = sorted(pet["name"] for pet in client.get(f'/pets?{query}').get_json()["pets"])
+        assert data["total"] == len(names) == sum(counts(data, "type").values()), query
+        # The age range does not narrow the age buckets themselves
+        assert data["facets"]["age_bucket"] == all_buckets, query
+
+    data = client.get('/pets/facets?min_age=3&max_age=4').get_json()
+    assert counts(data, "breed") == {"Golden Retriever": 1, "Persian": 1}
+    assert client.get('/pets/facets?type=cat&min_age=2').get_json()["total"] == 1
+    assert client.get('/pets/facets?min_age=2&max_age=3&age_bucket=0-1').get_json()["total"] == 0
+    assert client.get('/pets/facets?min_age=old').status_code == 400
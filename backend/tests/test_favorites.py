@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../'
 
 from database import initialize_database  # Import from /backend/database.py
 from main import app  # Import Flask app from /backend/main.py
+from dbfuncs import admin_headers
 
 @pytest.fixture
 def client():
@@ -48,7 +49,7 @@ def test_add_favorite(client):
         "name": "Buddy", "age": "2", "description": "Golden Retriever",
         "breed": "Golden Retriever", "picture_url": "/buddy.jpg",
         "status": "available", "type": "dog", "location": "Hartford, CT"
-    })
+    }, headers=admin_headers(client))
 
     # Add the pet to favorites
     response = client.post("/favorites", json={"email": "testuser@example.com", "pet_name": "Buddy"})
@@ -74,7 +75,7 @@ def test_get_favorites(client):
         "name": "Buddy", "age": "2", "description": "Golden Retriever",
         "breed": "Golden Retriever", "picture_url": "/buddy.jpg",
         "status": "available", "type": "dog", "location": "Hartford, CT"
-    })
+    }, headers=admin_headers(client))
 
     # Add the pet to favorites
     client.post("/favorites", json={"email": "testuser@example.com", "pet_name": "Buddy"})
@@ -96,3 +97,154 @@ def test_get_favorites(client):
     response = client.get("/favorites", query_string={"email": "testuser@example.com"})
     assert response.status_code == 200
     assert response.get_json() == {"favorites": expected_favorites}
+
+
+def test_favorites_of_pets_sharing_a_name(client):
+    """
+    Tests that pets with the same name in different locations are told apart by location.
+    """
+    client.post("/register", json={"username": "testuser", "password": "password", "email": "testuser@example.com"})
+    client.post("/pets", json={
+        "name": "Jay", "age": "4", "description": "Shy", "breed": "Beagle",
+        "picture_url": "/jay2.jpg", "status": "available", "type": "dog", "location": "Norwich, CT"
+    }, headers=admin_headers(client))
+    user = {"email": "testuser@example.com"}
+
+    response = client.post("/favorites", json={**user, "pet_name": "Jay"})
+    assert response.status_code == 400
+    assert "pet_location is required" in response.get_json()["message"]
+    response = client.post("/favorites", json={**user, "pet_name": "Jay", "pet_location": "Nowhere"})
+    assert response.status_code == 404
+    for location in ("Norwich, CT", "Hartford, CT"):
+        response = client.post("/favorites", json={**user, "pet_name": "Jay", "pet_location": location})
+        assert response.status_code == 200
+
+    response = client.delete("/favorites", json={**user, "pet_name": "Jay"})
+    assert response.status_code == 400
+    response = client.delete("/favorites", json={**user, "pet_name": "Jay", "pet_location": "Norwich, CT"})
+    assert response.status_code == 200
+    favorites = client.get("/favorites", query_string=user).get_json()["favorites"]
+    assert [(pet["name"], pet["location"]) for pet in favorites] == [("Jay", "Hartford, CT")]
+
+    # With one favorite left by that name, the name alone is enough again
+    response = client.delete("/favorites", json={**user, "pet_name": "Jay"})
+    assert response.status_code == 200
+    assert client.get("/favorites", query_string=user).get_json()["favorites"] == []
+
+
+def test_get_favorites_unknown_user(client):
+    """
+    Tests that the /favorites GET endpoint reports unknown users and empty lists distinctly.
+    """
+    response = client.get("/favorites", query_string={"email": "nobody@example.com"})
+    assert response.status_code == 404
+
+    client.post("/register", json={"username": "testuser", "password": "password", "email": "testuser@example.com"})
+    response = client.get("/favorites", query_string={"email": "testuser@example.com"})
+    assert response.status_code == 200
+    assert response.get_json() == {"favorites": []}
+
+
+def test_bulk_update_and_paginate_favorites(client):
+    """
+    Tests the /favorites/bulk POST endpoint and paging through the favorites list.
+    """
+    client.post("/register", json={"username": "testuser", "password": "password", "email": "testuser@example.com"})
+
+    response = client.post("/favorites/bulk", json={
+        "email": "testuser@example.com",
+        "add": [
+            {"name": "Jay", "location": "Hartford, CT"},
+            {"name": "Bella", "location": "New Haven, CT"},
+            {"name": "Luna", "location": "Norwich, CT"},
+            {"name": "Luna", "location": "Nowhere"},
+        ],
+    })
+    assert response.status_code == 200
+    assert response.get_json()["added"] == 3
+
+    response = client.post("/favorites/bulk", json={
+        "email": "testuser@example.com",
+        "remove": [{"name": "Bella", "location": "New Haven, CT"}],
+    })
+    assert response.get_json()["removed"] == 1
+
+    names = []
+    query = {"email": "testuser@example.com", "limit": 1}
+    while True:
+        body = client.get("/favorites", query_string=query).get_json()
+        names.extend(pet["name"] for pet in body["favorites"])
+        if not body["next_cursor"]:
+            break
+        query["cursor"] = body["next_cursor"]
+    assert names == ["Jay", "Luna"]
+
+    response = client.post("/favorites/bulk", json={"email": "testuser@example.com", "add": [{"name": "Jay"}]})
+    assert response.status_code == 400
+
+
+def test_bulk_update_favorites_rejects_malformed_bodies(client):
+    """
+    Tests that /favorites/bulk answers 400, not 500, for bodies of the wrong shape.
+    """
+    client.post("/register", json={"username": "testuser", "password": "password", "email": "testuser@example.com"})
+    pet = {"name": "Jay", "location": "Hartford, CT"}
+
+    for body in ([pet], "add", 3):
+        response = client.post("/favorites/bulk", json=body)
+        assert response.status_code == 400
+        assert response.get_json() == {"message": "Request body must be a JSON object"}
+
+    for field in ("add", "remove"):
+        for value in (pet, "Jay", 3):
+            response = client.post("/favorites/bulk", json={"email": "testuser@example.com", field: value})
+            assert response.status_code == 400
+            assert response.get_json() == {"message": "add and remove must be lists of pets"}
+
+
+def test_identity_cache_serves_repeated_lookups(client):
+    """
+    Tests that email lookups are cached, including short-lived misses for unknown emails.
+    """
+    from identity_cache import identity_cache
+
+    response = client.get("/favorites", query_string={"email": "later@example.com"})
+    assert response.status_code == 404
+    before = client.get("/stats/identity").get_json()
+    response = client.get("/favorites", query_string={"email": "later@example.com"})
+    assert response.status_code == 404
+    assert client.get("/stats/identity").get_json()["negative_hits"] == before["negative_hits"] + 1
+
+    # Registering replaces the cached miss with the new user's id
+    client.post("/register", json={"username": "later", "password": "password", "email": "later@example.com"})
+    before = client.get("/stats/identity").get_json()
+    response = client.post("/favorites", json={"email": "later@example.com", "pet_name": "Max"})
+    assert response.status_code == 200
+    response = client.get("/favorites", query_string={"email": "later@example.com"})
+    assert [pet["name"] for pet in response.get_json()["favorites"]] == ["Max"]
+    assert client.get("/stats/identity").get_json()["hits"] == before["hits"] + 2
+
+    # A reset forgets the user, so their cached id must not outlive it
+    initialize_database()
+    assert identity_cache.stats()["entries"] == 0
+    response = client.get("/favorites", query_string={"email": "later@example.com"})
+    assert response.status_code == 404
+
+
+def test_identity_cache_bounds_and_expiry():
+    """
+    Tests LRU eviction, clearing and the negative TTL.
+    """
+    from identity_cache import IdentityCache, MISSING
+
+    cache = IdentityCache(max_entries=2, ttl=60, negative_ttl=0)
+    cache.put("a@example.com", 1)
+    cache.put("b@example.com", 2)
+    cache.get("a@example.com")
+    cache.put("c@example.com", 3)
+    assert cache.get("b@example.com") is MISSING  # Least recently used
+    cache.clear()
+    assert cache.get("a@example.com") is MISSING
+    cache.put("nobody@example.com", None)
+    assert cache.get("nobody@example.com") is MISSING  # Negative entry already expired
+    assert cache.stats()["evictions"] == 1
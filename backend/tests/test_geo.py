@@ -0,0 +1,100 @@
+"""
+This module contains tests for the nearby pet search endpoint.
+"""
+
+import json
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import create_connection, DATABASE
+from geo import bounding_boxes, haversine_miles, index_places, nearby_places
+from main import app
+from dbfuncs import admin_headers
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
+        yield client
+
+
+def test_haversine_miles():
+    # Hartford to New Haven is roughly 34 miles
+    assert 32 < haversine_miles(41.7658, -72.6734, 41.3083, -72.9279) < 36
+
+
+def test_bounding_boxes_split_at_the_antimeridian():
+    assert len(bounding_boxes(41.0, -72.0, 30)) == 1
+    east, west = bounding_boxes(0.0, 179.9, 30)
+    assert east[2:] == (179.9 - 30 / 69.0, 180.0)
+    assert west[2] == -180.0 and -180.0 < west[3] < -179.0
+    assert bounding_boxes(89.99, 0.0, 30) == [(89.99 - 30 / 69.0, 89.99 + 30 / 69.0, -180.0, 180.0)]
+
+
+def test_nearby_places_across_the_antimeridian(client):
+    conn = create_connection(DATABASE)
+    conn.executemany('INSERT INTO gazetteer (place, latitude, longitude) VALUES (?, ?, ?)',
+                     [("East, XX", 0.0, 179.95), ("West, XX", 0.0, -179.95)])
+    index_places(conn)
+    conn.commit()
+    places = nearby_places(conn.cursor(), 0.0, 179.99, 20)
+    conn.close()
+    assert [place for _, place in places] == ["East, XX", "West, XX"]
+
+
+def test_nearby_by_city_sorted_by_distance(client):
+    response = client.get('/pets/nearby', query_string={"city": "Hartford, CT", "radius": 30})
+    assert response.status_code == 200
+    pets = response.get_json()["pets"]
+    assert [pet["name"] for pet in pets] == ["Jay", "Mittens"]
+    distances = [pet["distance_miles"] for pet in pets]
+    assert distances == sorted(distances)
+
+
+def test_nearby_by_coordinates_with_pagination(client):
+    seen = []
+    query = {"lat": 41.3083, "lon": -72.9279, "radius": 100, "limit": 4}
+    while True:
+        body = client.get('/pets/nearby', query_string=query).get_json()
+        seen.extend(pet["name"] for pet in body["pets"])
+        if not body["next_cursor"]:
+            break
+        query["cursor"] = body["next_cursor"]
+    assert seen[0] == "Bella"
+    assert sorted(seen) == ["Bella", "Jay", "Luna", "Max", "Mittens", "Rocky"]
+
+
+def test_nearby_follows_pet_changes(client):
+    client.post('/pets', data=json.dumps({
+        "name": "Buddy", "age": "3", "description": "Playful", "breed": "Lab",
+        "picture_url": "/buddy.jpg", "status": "available", "type": "dog", "location": "Boston, MA"
+    }), content_type='application/json')
+    pets = client.get('/pets/nearby', query_string={"city": "Boston, MA", "radius": 10}).get_json()["pets"]
+    assert [pet["name"] for pet in pets] == ["Buddy"]
+
+    # Pets of one place are paged in the order they were added
+    client.post('/pets', json={
+        "name": "Ace", "age": "2", "description": "Calm", "breed": "Pug",
+        "picture_url": "/ace.jpg", "status": "available", "type": "dog", "location": "boston, ma"
+    })
+    query = {"city": "Boston, MA", "radius": 10, "limit": 1}
+    first = client.get('/pets/nearby', query_string=query).get_json()
+    second = client.get('/pets/nearby', query_string={**query, "cursor": first["next_cursor"]}).get_json()
+    assert [pet["name"] for pet in first["pets"] + second["pets"]] == ["Buddy", "Ace"]
+    assert second["next_cursor"] is None
+
+
+def test_nearby_invalid_requests(client):
+    assert client.get('/pets/nearby').status_code == 400
+    assert client.get('/pets/nearby', query_string={"city": "Atlantis, XX"}).status_code == 404
+    assert client.get('/pets/nearby', query_string={"lat": 41, "lon": -72, "radius": 0}).status_code == 400
@@ -0,0 +1,134 @@
+"""
+This module contains tests for pet picture variants.
+"""
+
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import create_connection, DATABASE
+from main import app
+from catalogue_cache import catalogue_cache
+from dbfuncs import admin_headers
+import images
+from jobs import JobWorker
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
+        yield client
+
+
+def test_resolve_source_stays_inside_source_dir(tmp_path):
+    assert images.resolve_source("/jay.jpg", str(tmp_path)) == str(tmp_path / "jay.jpg")
+    assert images.resolve_source("/../secret.txt", str(tmp_path)) is None
+    assert images.resolve_source("https://example.com/a.jpg", str(tmp_path)) is None
+
+
+def test_target_widths_never_upscale():
+    assert images.target_widths(2000) == [320, 640, 1024]
+    assert images.target_widths(500) == [320]
+    assert images.target_widths(200) == [200]
+
+
+def test_listings_include_recorded_variants(client):
+    conn = create_connection(DATABASE)
+    conn.executemany(
+        'INSERT INTO image_variants (picture_url, width, format, url) VALUES (?, ?, ?, ?)',
+        [("/jay.jpg", 640, "webp", "/images/variants/abc-640w.webp"),
+         ("/jay.jpg", 320, "webp", "/images/variants/abc-320w.webp")]
+    )
+    conn.commit()
+    conn.close()
+
+    pets = {pet["name"]: pet for pet in client.get('/pets').get_json()["pets"]}
+    assert [variant["width"] for variant in pets["Jay"]["picture_variants"]] == [320, 640]
+    assert "picture_variants" not in pets["Max"]
+    response = client.get('/pets/search', query_string={"q": "Jay"})
+    assert response.get_json()["pets"][0]["picture_variants"][0]["format"] == "webp"
+
+
+def test_variants_are_served_immutable(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "IMAGE_VARIANT_DIR", str(tmp_path))
+    (tmp_path / "abc-320w.webp").write_bytes(b"RIFF....WEBP")
+    response = client.get('/images/variants/abc-320w.webp')
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    assert client.get('/images/variants/missing.webp').status_code == 404
+
+
+def test_no_jobs_without_pillow(client, monkeypatch):
+    monkeypatch.setattr(images, "Image", None)
+    client.post('/pets', json={
+        "name": "Buddy", "age": "2", "description": "Friendly", "breed": "Lab",
+        "picture_url": "/jay.jpg", "type": "dog", "location": "Hartford, CT"
+    })
+    assert "image_variants" not in client.get('/stats/jobs').get_json()
+
+
+def test_add_pet_generates_variants(client, tmp_path, monkeypatch):
+    pil = pytest.importorskip("PIL.Image")
+    source_dir = tmp_path / "public"
+    source_dir.mkdir()
+    pil.new("RGB", (800, 600), "orange").save(source_dir / "buddy.jpg")
+    monkeypatch.setattr(images, "IMAGE_SOURCE_DIR", str(source_dir))
+    monkeypatch.setattr(images, "IMAGE_VARIANT_DIR", str(tmp_path / "variants"))
+    monkeypatch.setattr(catalogue_cache, "sync_interval", 0)  # Sync on every request
+
+    client.post('/pets', json={
+        "name": "Buddy", "age": "2", "description": "Friendly", "breed": "Lab",
+        "picture_url": "/buddy.jpg", "type": "dog", "location": "Hartford, CT"
+    })
+    client.get('/pets')  # Cached without variants, then refreshed through the change log
+    JobWorker(kinds=[images.JOB_KIND]).run_until_idle()
+
+    pets = {pet["name"]: pet for pet in client.get('/pets').get_json()["pets"]}
+    variants = pets["Buddy"]["picture_variants"]
+    assert sorted((v["format"], v["width"]) for v in variants) == [
+        ("jpeg", 320), ("jpeg", 640), ("webp", 320), ("webp", 640)
+    ]
+    response = client.get(variants[0]["url"])
+    assert response.status_code == 200
+    variant_path = tmp_path / "variants" / variants[0]["url"].rsplit("/", 1)[1]
+    assert os.stat(variant_path).st_mode & 0o777 == 0o644
+    with pil.open(variant_path) as image:
+        assert image.width == variants[0]["width"]
+
+
+def test_variants_are_queued_once_per_version_of_a_file(client, tmp_path, monkeypatch):
+    pil = pytest.importorskip("PIL.Image")
+    source_dir = tmp_path / "public"
+    source_dir.mkdir()
+    source = source_dir / "buddy.jpg"
+    pil.new("RGB", (400, 300), "orange").save(source)
+    monkeypatch.setattr(images, "IMAGE_SOURCE_DIR", str(source_dir))
+    monkeypatch.setattr(images, "IMAGE_VARIANT_DIR", str(tmp_path / "variants"))
+    conn = create_connection(DATABASE)
+
+    assert images.queue_variants(conn, "/missing.jpg") is None
+    assert images.queue_variants(conn, "/buddy.jpg") is not None
+    assert images.queue_variants(conn, "/buddy.jpg") is None  # Already queued
+    conn.commit()
+    JobWorker(kinds=[images.JOB_KIND]).run_until_idle()
+    assert images.queue_variants(conn, "/buddy.jpg") is None  # Variants are current
+
+    pil.new("RGB", (400, 300), "blue").save(source)
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10 ** 9))
+    assert images.queue_variants(conn, "/buddy.jpg") is not None
+    conn.commit()
+    old_urls = {row[0] for row in conn.execute('SELECT url FROM image_variants')}
+    JobWorker(kinds=[images.JOB_KIND]).run_until_idle()
+    new_urls = {row[0] for row in conn.execute('SELECT url FROM image_variants')}
+    conn.close()
+    assert new_urls and new_urls.isdisjoint(old_urls)
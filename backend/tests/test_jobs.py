@@ -0,0 +1,161 @@
+"""
+This module contains tests for the job queue and the background check jobs.
+"""
+
+import sys
+import os
+import time
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import create_connection, DATABASE
+from main import app
+import jobs
+import background_checks
+from background_check_stub import StubProvider
+from jobs import JobWorker, claim_job
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Start the stub background check provider and point the jobs at it."""
+    stub = StubProvider().start()
+    monkeypatch.setattr(background_checks, "BACKGROUND_CHECK_URL", stub.url)
+    monkeypatch.setattr(jobs, "backoff_delay", lambda attempts: 0)
+    yield stub
+    stub.stop()
+
+
+def register(client, name):
+    return client.post('/register', json={
+        "username": name, "password": "password123", "email": f"{name}@example.com"
+    })
+
+
+def query(sql, params=()):
+    conn = create_connection(DATABASE)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def check_status(name):
+    return query('SELECT background_check_status FROM users WHERE username = ?', (name,))[0][0]
+
+
+def test_register_queues_check_and_worker_records_verdict(client, provider):
+    response = register(client, "ann")
+    assert response.get_json()["background_check_status"] == "pending"
+    register(client, "failing")
+    assert client.get('/stats/jobs').get_json() == {"background_check": {"queued": 2}}
+    assert check_status("ann") == "pending"
+
+    JobWorker().run_until_idle()
+    assert check_status("ann") == "passed"
+    assert check_status("failing") == "failed"
+    assert [request["username"] for request in provider.requests] == ["ann", "failing"]
+    assert client.get('/stats/jobs').get_json() == {"background_check": {"done": 2}}
+
+
+def test_failed_attempts_are_retried_then_given_up(client, provider):
+    provider.failures_before_success = 1
+    register(client, "ann")
+    JobWorker().run_until_idle()
+    assert check_status("ann") == "passed"
+    assert tuple(query("SELECT attempts, status FROM jobs")[0]) == (2, "done")
+
+    provider.failures_before_success = 10
+    register(client, "bob")
+    JobWorker().run_until_idle()
+    assert check_status("bob") == "error"
+    job = query("SELECT attempts, status, last_error FROM jobs ORDER BY job_id DESC LIMIT 1")[0]
+    assert tuple(job)[:2] == (jobs.MAX_ATTEMPTS, "failed")
+    assert "503" in job[2]
+
+
+def test_expired_lease_is_reclaimed(client):
+    register(client, "ann")
+    conn = create_connection(DATABASE)
+    try:
+        first = claim_job(conn, "background_check", lease=-1)  # Worker "dies" holding the job
+        second = claim_job(conn, "background_check")
+        assert second["job_id"] == first["job_id"] and second["attempts"] == 2
+        assert claim_job(conn, "background_check") is None  # Leased again
+    finally:
+        conn.close()
+
+
+def test_worker_threads_respect_concurrency_limit(client, provider):
+    provider.delay = 0.2
+    for number in range(4):
+        register(client, f"user{number}")
+    worker = JobWorker(threads=4, poll_interval=0.05)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while check_status("user3") == "pending" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+    assert {row[0] for row in query('SELECT background_check_status FROM users')} == {"passed"}
+    assert provider.max_in_flight == background_checks.CONCURRENCY
+
+
+def test_oldest_due_job_runs_first_whatever_its_kind(client, monkeypatch):
+    ran = []
+    monkeypatch.setattr(jobs, "HANDLERS", {})
+    for kind in ("a", "b"):
+        jobs.register_handler(kind)(lambda conn, payload: ran.append(payload["n"]))
+    conn = create_connection(DATABASE)
+    try:
+        for number, kind in enumerate(("b", "a", "a", "b")):
+            jobs.enqueue(conn, kind, {"n": number}, delay=number - 10)
+        conn.commit()
+    finally:
+        conn.close()
+    JobWorker().run_until_idle()
+    assert ran == [0, 1, 2, 3]
+
+
+def test_worker_thread_survives_handler_errors(client, monkeypatch):
+    ran = []
+
+    def fail(conn, payload):
+        raise jobs.PermanentJobError("bad payload")
+
+    def give_up(conn, payload, error):
+        raise RuntimeError("give-up hook failed")
+
+    monkeypatch.setattr(jobs, "HANDLERS", {})
+    jobs.register_handler("broken", on_give_up=give_up)(fail)
+    jobs.register_handler("fine")(lambda conn, payload: ran.append(payload))
+    conn = create_connection(DATABASE)
+    try:
+        jobs.enqueue(conn, "broken", {}, delay=-1)
+        jobs.enqueue(conn, "fine", {"n": 1})
+        conn.commit()
+    finally:
+        conn.close()
+    worker = JobWorker(threads=1, poll_interval=0.05)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not ran and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+    assert ran == [{"n": 1}]
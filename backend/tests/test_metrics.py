@@ -0,0 +1,89 @@
+"""
+This module contains tests for the /metrics endpoint and its multi-process merging.
+"""
+
+import pytest
+import json
+import subprocess
+import sys
+import os
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from main import app
+import metrics
+
+
+@pytest.fixture
+def client():
+    """
+    Set up the Client with a fresh database and empty metrics.
+    """
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    metrics.registry.clear()
+    yield app.test_client()
+
+
+def samples(text):
+    """Parses exposition text into {series: value}, skipping comments."""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def test_requests_and_sql_are_counted(client):
+    client.get("/pets")
+    client.get("/pets?limit=1")
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    values = samples(text)
+
+    assert values['http_requests_total{method="GET",route="/pets",status="200"}'] == 2
+    assert values['http_requests_total{method="GET",route="<unmatched>",status="404"}'] == 1
+    assert values['http_request_duration_seconds_count{method="GET",route="/pets",status="200"}'] == 2
+    assert values['http_request_duration_seconds_bucket{method="GET",route="/pets",status="200",le="+Inf"}'] == 2
+    # The scrape itself is the only request in progress
+    assert values['http_requests_in_progress{method="GET",route="/pets"}'] == 0
+    assert values['http_requests_in_progress{method="GET",route="/metrics"}'] == 1
+    # Both catalogue requests queried the database
+    assert values['http_request_sql_statements_sum{method="GET",route="/pets"}'] >= 2
+    assert values['http_request_sql_statements_bucket{method="GET",route="/pets",le="0"}'] == 0
+    assert values['http_request_sql_seconds_sum{method="GET",route="/pets"}'] > 0
+
+
+def test_sql_of_dashboard_sections_is_counted(client):
+    client.get("/dashboard")
+    values = samples(client.get("/metrics").get_data(as_text=True))
+    # The catalogue section runs on an executor thread
+    assert values['http_request_sql_statements_sum{method="GET",route="/dashboard"}'] >= 1
+
+
+def test_snapshots_of_other_processes_are_merged(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                            capture_output=True, text=True, check=True)
+    route = [["method", "GET"], ["route", "/pets"]]
+    (tmp_path / "other.json").write_text(json.dumps({"pid": int(exited.stdout), "series": [
+        ["http_requests_total", route + [["status", "200"]], 5],
+        ["http_requests_in_progress", route, 3],
+    ]}))
+
+    client.get("/pets")
+    values = samples(client.get("/metrics").get_data(as_text=True))
+    assert values['http_requests_total{method="GET",route="/pets",status="200"}'] == 6
+    # Gauges of exited processes are dropped
+    assert values['http_requests_in_progress{method="GET",route="/pets"}'] == 0
+    assert any(name.endswith(".json") and name != "other.json" for name in os.listdir(tmp_path))
+
+    metrics.clear_directory(str(tmp_path))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,153 @@
+"""
+This module contains tests for password hashing and the login rehash path.
+"""
+
+import json
+import sys
+import os
+import threading
+import time
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import create_connection, DATABASE
+from main import app
+import passwords
+from passwords import PasswordHasher, HasherBusy, compute_hash, check_hash
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        yield client
+
+
+def stored_password(username):
+    conn = create_connection(DATABASE)
+    try:
+        return conn.execute('SELECT password FROM users WHERE username = ?', (username,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def register_and_login(client, password="password123"):
+    client.post('/register', data=json.dumps({
+        "username": "hashuser", "password": password, "email": "hashuser@example.com"
+    }), content_type='application/json')
+    return client.post('/login', data=json.dumps({
+        "username": "hashuser", "password": password
+    }), content_type='application/json')
+
+
+def test_hash_is_self_describing():
+    encoded = compute_hash("secret", n=2 ** 10, r=8, p=1)
+    scheme, n, r, p, _, _ = encoded.split("$")
+    assert (scheme, n, r, p) == ("scrypt", "1024", "8", "1")
+    assert check_hash("secret", encoded) == (True, True)  # Cheaper than the current costs
+    assert check_hash("wrong", encoded) == (False, False)
+    assert check_hash("secret", "not-a-hash") == (False, False)
+
+
+def test_hasher_pool_round_trip():
+    pool_hasher = PasswordHasher(workers=1, max_pending=2)
+    try:
+        encoded = pool_hasher.hash_password("secret")
+        assert pool_hasher.verify_password("secret", encoded) == (True, False)
+        assert pool_hasher.verify_password("nope", encoded) == (False, False)
+    finally:
+        pool_hasher.shutdown()
+
+
+def test_hasher_rejects_when_queue_is_full():
+    pool_hasher = PasswordHasher(workers=1, max_pending=1)
+    worker = threading.Thread(target=pool_hasher._run, args=(time.sleep, 1))
+    try:
+        worker.start()
+        deadline = time.monotonic() + 5
+        while pool_hasher._slots._value and time.monotonic() < deadline:
+            time.sleep(0.01)  # Wait until the slow job holds the only slot
+        with pytest.raises(HasherBusy):
+            pool_hasher.hash_password("secret")
+    finally:
+        worker.join()
+        pool_hasher.shutdown()
+
+
+def test_register_stores_hash(client):
+    assert register_and_login(client).status_code == 200
+    stored = stored_password("hashuser")
+    assert stored.startswith("scrypt$") and "password123" not in stored
+
+
+def test_login_upgrades_plaintext_and_old_costs(client):
+    client.post('/register', data=json.dumps({
+        "username": "hashuser", "password": "password123", "email": "hashuser@example.com"
+    }), content_type='application/json')
+    for legacy in ("password123", compute_hash("password123", n=2 ** 10)):
+        conn = create_connection(DATABASE)
+        conn.execute('UPDATE users SET password = ? WHERE username = ?', (legacy, "hashuser"))
+        conn.commit()
+        conn.close()
+
+        response = client.post('/login', data=json.dumps({
+            "username": "hashuser", "password": "password123"
+        }), content_type='application/json')
+        assert response.status_code == 200
+        assert stored_password("hashuser").startswith(f"scrypt${passwords.SCRYPT_N}$")
+
+
+def test_login_busy_returns_503(client, monkeypatch):
+    register_and_login(client)
+
+    def busy(*_):
+        raise HasherBusy("full")
+
+    monkeypatch.setattr(passwords.hasher, "_run", busy)
+    response = client.post('/login', data=json.dumps({
+        "username": "hashuser", "password": "password123"
+    }), content_type='application/json')
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_hasher_timeout_raises_busy():
+    pool_hasher = PasswordHasher(workers=1, max_pending=2, timeout=0.1)
+    try:
+        with pytest.raises(HasherBusy):
+            pool_hasher._run(time.sleep, 1)
+    finally:
+        pool_hasher.shutdown()
+
+
+def test_hasher_keeps_slot_until_timed_out_job_finishes():
+    pool_hasher = PasswordHasher(workers=1, max_pending=1)
+    try:
+        pool_hasher.hash_password("secret")  # Start the worker process
+        pool_hasher.timeout = 0.2
+        with pytest.raises(HasherBusy, match="timed out"):
+            pool_hasher._run(time.sleep, 1)
+        # The worker is still sleeping, so its slot is not free yet
+        with pytest.raises(HasherBusy, match="Too many"):
+            pool_hasher._run(time.sleep, 0)
+
+        deadline = time.monotonic() + 5
+        while not pool_hasher._slots._value and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool_hasher._slots._value == 1
+    finally:
+        pool_hasher.shutdown()
+
+
+def test_non_string_password_is_rejected(client):
+    for route, body in (('/register', {"username": "hashuser", "password": 123, "email": "hashuser@example.com"}),
+                        ('/login', {"username": "hashuser", "password": ["password123"]})):
+        response = client.post(route, data=json.dumps(body), content_type='application/json')
+        assert response.status_code == 400
+        assert response.get_json()["message"] == "Password must be a string"
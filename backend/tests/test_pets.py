@@ -1,3 +1,4 @@
+import io
 import json
 import sys
 import os
@@ -7,7 +8,13 @@ import pytest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
 from database import initialize_database
+from catalogue import encode_cursor, parse_catalogue_args
+from catalogue_cache import CatalogueCache, cache_key, catalogue_cache
+import connection_pool
+from connection_pool import create_connection, DATABASE
 from main import app
+from pet_import import import_pets_stream
+from dbfuncs import admin_headers
 
 @pytest.fixture
 def client():
@@ -16,6 +23,7 @@ def client():
         os.remove("database.db")
     initialize_database()
     with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
         yield client
 
 def test_add_pet(client):
@@ -85,3 +93,154 @@ def test_edit_nonexistent_pet(client):
     }), content_type='application/json')
     assert response.status_code == 404
     assert response.get_json() == {"message": "Pet not found"}
+
+def test_get_pets_filters(client):
+    response = client.get('/pets', query_string={"type": "cat"})
+    assert response.status_code == 200
+    names = sorted(pet["name"] for pet in response.get_json()["pets"])
+    assert names == ["Luna", "Mittens"]
+
+    response = client.get('/pets', query_string={"type": "dog", "min_age": "2", "max_age": "3"})
+    names = sorted(pet["name"] for pet in response.get_json()["pets"])
+    assert names == ["Bella", "Max"]
+
+def test_get_pets_keyset_pagination(client):
+    seen = []
+    query = {"sort": "-age", "limit": "4"}
+    while True:
+        response = client.get('/pets', query_string=query)
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.extend(pet["name"] for pet in body["pets"])
+        if not body["next_cursor"]:
+            break
+        query["cursor"] = body["next_cursor"]
+    assert seen == ["Rocky", "Luna", "Bella", "Max", "Mittens", "Jay"]
+
+def test_get_pets_invalid_parameters(client):
+    assert client.get('/pets', query_string={"sort": "weight"}).status_code == 400
+    assert client.get('/pets', query_string={"limit": "0"}).status_code == 400
+    assert client.get('/pets', query_string={"cursor": "not-a-cursor"}).status_code == 400
+    # Well-formed cursors whose values cannot be bound as SQL parameters
+    for values in ([["Jay"], "Hartford, CT"], [{"name": "Jay"}, "Hartford, CT"], [True, "Hartford, CT"]):
+        cursor = encode_cursor("name", values)
+        assert client.get('/pets', query_string={"limit": 2, "cursor": cursor}).status_code == 400
+
+def test_get_pets_etag_not_modified(client):
+    first = client.get('/pets')
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    response = client.get('/pets', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+def test_get_pets_cache_invalidated_by_writes(client):
+    etag = client.get('/pets', query_string={"type": "dog"}).headers["ETag"]
+    client.get('/pets', query_string={"type": "cat"})
+
+    client.post('/pets', data=json.dumps({
+        "name": "Buddy", "age": "3", "description": "Playful and energetic",
+        "breed": "Golden Retriever", "picture_url": "/buddy.jpg",
+        "status": "available", "type": "dog", "location": "Hartford, CT"
+    }), content_type='application/json')
+
+    response = client.get('/pets', query_string={"type": "dog"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Buddy" in [pet["name"] for pet in response.get_json()["pets"]]
+
+    # Entries the new pet cannot appear in stay cached
+    stats = client.get('/stats/cache').get_json()
+    client.get('/pets', query_string={"type": "cat"})
+    assert client.get('/stats/cache').get_json()["hits"] == stats["hits"] + 1
+
+def test_get_pets_cache_sees_writes_of_other_processes(client, monkeypatch):
+    monkeypatch.setattr(catalogue_cache, "sync_interval", 0)  # Sync on every request
+    client.get('/pets', query_string={"type": "dog"})
+    cat_etag = client.get('/pets', query_string={"type": "cat"}).headers["ETag"]
+
+    # Another worker's write, which this process's cache is never told about
+    conn = create_connection(DATABASE)
+    conn.execute("UPDATE pets SET breed = 'Basset' WHERE name = 'Max'")
+    conn.commit()
+    conn.close()
+
+    pets = client.get('/pets', query_string={"type": "dog"}).get_json()["pets"]
+    assert [pet["breed"] for pet in pets if pet["name"] == "Max"] == ["Basset"]
+    assert client.get('/pets', query_string={"type": "cat"}, headers={"If-None-Match": cat_etag}).status_code == 304
+
+
+def test_get_pets_not_modified_runs_no_statements(client, monkeypatch):
+    monkeypatch.setattr(catalogue_cache, "sync_interval", 60)
+    etag = client.get('/pets', query_string={"type": "dog"}).headers["ETag"]
+
+    statements = []
+    monkeypatch.setattr(connection_pool, "STATEMENT_OBSERVERS", [lambda cursor, sql, *_: statements.append(sql)])
+    response = client.get('/pets', query_string={"type": "dog"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert statements == []
+
+    # Once the interval has passed, the next request syncs again
+    monkeypatch.setattr(catalogue_cache, "sync_interval", 0)
+    client.get('/pets', query_string={"type": "dog"}, headers={"If-None-Match": etag})
+    assert any("catalogue_changes" in sql for sql in statements)
+
+
+def test_cache_does_not_store_bodies_built_before_an_invalidation():
+    cache = CatalogueCache()
+    params = parse_catalogue_args({})
+    generation = cache.generation
+    cache.invalidate_pets({"type": "dog", "breed": "Lab", "location": "Hartford, CT", "status": "available", "age": "1"})
+    entry = cache.put(cache_key(params), params, b'{"pets":[]}', generation)
+    assert entry.body == b'{"pets":[]}' and cache.get(cache_key(params)) is None
+    assert cache.stats()["stale_fills"] == 1
+    cache.put(cache_key(params), params, b'{"pets":[]}', cache.generation)
+    assert cache.get(cache_key(params)) is not None
+
+
+def test_import_pets_csv(client):
+    body = (
+        "name,age,description,breed,picture_url,type,location\n"
+        "Buddy,3,Playful,Golden Retriever,/buddy.jpg,dog,Hartford CT\n"
+        "Jay,1,Golden Lab,Lab,/jay.jpg,dog,\"Hartford, CT\"\n"
+        "Milo,2,,Siamese,/milo.jpg,cat,Norwich CT\n"
+        "Buddy,4,Duplicate,Beagle,/buddy.jpg,dog,Hartford CT\n"
+        "Coco,2,Calm,Poodle,/coco.jpg,dog,Stamford CT\n"
+    )
+    response = client.post('/pets/import?format=csv&chunk_size=2', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["inserted"] == 2
+    assert [row["line"] for row in report["conflicts"]] == [3, 5]
+    assert report["errors"] == [{"line": 4, "message": "Missing fields: description"}]
+
+    names = {pet["name"] for pet in client.get('/pets', query_string={"type": "dog"}).get_json()["pets"]}
+    assert {"Buddy", "Coco"} <= names
+
+def test_import_pets_ndjson(client):
+    body = (
+        '{"name": "Buddy", "age": "3", "description": "Playful", "breed": "Lab",'
+        ' "picture_url": "/buddy.jpg", "type": "dog", "location": "Hartford, CT", "status": "adopted"}\n'
+        'not json\n'
+    )
+    response = client.post('/pets/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["inserted"] == 1
+    assert report["errors"] == [{"line": 2, "message": "Invalid JSON"}]
+
+    response = client.post('/pets/import?format=xml', data=body)
+    assert response.status_code == 400
+
+
+def test_import_failure_still_clears_cache(client):
+    params = parse_catalogue_args({})
+    catalogue_cache.put(cache_key(params), params, b'{"pets":[]}')
+    rows = b"".join(b"Coco%d,2,Calm,Poodle,/coco.jpg,dog,Stamford CT\n" % number for number in range(1000))
+    body = io.BytesIO(b"name,age,description,breed,picture_url,type,location\n" + rows + b"\xff")
+    conn = create_connection(DATABASE)
+    with pytest.raises(UnicodeDecodeError):
+        import_pets_stream(conn, body, "csv", chunk_size=1)
+    conn.close()
+    assert catalogue_cache.get(cache_key(params)) is None
+
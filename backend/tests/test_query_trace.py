@@ -0,0 +1,109 @@
+"""
+This module contains tests for the SQL query tracer and the /stats/sql endpoint.
+"""
+
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from connection_pool import MANY, create_connection
+from database import initialize_database
+from main import app
+from query_trace import QueryTracer, parameter_shape, tracer
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Set up the Client with a fresh database and a tracer treating every statement as slow.
+    """
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    tracer.reset()
+    monkeypatch.setattr(tracer, "slow_seconds", 0)
+    yield app.test_client()
+
+
+def test_parameter_shapes_hide_values():
+    assert parameter_shape(("a@b.com", 3)) == "(str, int)"
+    assert parameter_shape({"email": "a@b.com"}) == "{email: str}"
+    assert parameter_shape(MANY) == "many"
+    assert parameter_shape(None) == "none"
+
+
+def test_slow_statements_are_explained_and_full_scans_flagged(tmp_path):
+    conn = create_connection(str(tmp_path / "trace.db"))
+    conn.execute("CREATE TABLE pets (name TEXT PRIMARY KEY, breed TEXT)")
+    local = QueryTracer(slow_ms=1)
+
+    def run(sql, parameters, seconds):
+        cursor = conn.execute(sql, parameters)
+        local.observe(cursor, sql, parameters, seconds)
+
+    run("SELECT * FROM pets WHERE breed = ?", ("Lab",), 0.002)
+    run("SELECT *\n   FROM pets WHERE breed = ?", ("Beagle",), 0.0005)
+    run("SELECT * FROM pets WHERE name = ?", ("Jay",), 0.003)
+    conn.close()
+
+    top = local.top(order_by="total")
+    assert [entry["sql"] for entry in top] == [
+        "SELECT * FROM pets WHERE name = ?", "SELECT * FROM pets WHERE breed = ?"
+    ]
+    by_breed = top[1]
+    assert (by_breed["calls"], by_breed["slow_calls"], by_breed["parameters"]) == (2, 1, "(str)")
+    assert by_breed["full_scans"] == ["pets"]
+    assert top[0]["full_scans"] == [] and top[0]["plan"][0].startswith("SEARCH pets")
+    assert [entry["ms"] for entry in local.slow_queries()] == [2.0, 3.0]
+
+
+def test_reading_rows_counts_toward_the_statement(tmp_path):
+    conn = create_connection(str(tmp_path / "trace.db"))
+    conn.create_function("nap", 1, lambda value: time.sleep(0.01) or value)
+    local = QueryTracer(slow_ms=1000)
+    observers = [local.observe]
+    sql = "SELECT nap(value) FROM (SELECT 1 AS value UNION ALL SELECT 2 UNION ALL SELECT 3)"
+    with patch("connection_pool.STATEMENT_OBSERVERS", observers):
+        cursor = conn.execute(sql)
+        assert local.top() == []  # Reported once its rows are read
+        assert len(cursor.fetchmany(2)) == 2 and local.top() == []
+        cursor.fetchall()
+        for _ in conn.execute(sql):
+            pass
+        conn.execute("SELECT 1").fetchone()  # Left unfinished until the cursor is dropped
+    conn.close()
+
+    stats = {entry["sql"]: entry for entry in local.top()}
+    assert stats[sql]["calls"] == 2
+    assert stats[sql]["max_ms"] >= 30  # Every row's step, not just the first
+    assert stats["SELECT 1"]["calls"] == 1
+
+
+def test_statements_beyond_the_limit_are_grouped():
+    local = QueryTracer(slow_ms=1000, max_statements=2)
+    for number in range(4):
+        local.observe(None, f"SELECT {number}", (), 0.001)
+    assert sorted(entry["sql"] for entry in local.top()) == ["<other statements>", "SELECT 0", "SELECT 1"]
+    assert {entry["sql"]: entry["calls"] for entry in local.top()}["<other statements>"] == 2
+
+
+def test_sql_stats_endpoint(client):
+    client.post('/favorites', json={"email": "nobody@example.com", "pet_name": "Jay"})
+
+    response = client.get('/stats/sql?limit=50&order=calls')
+    assert response.status_code == 200
+    data = response.get_json()
+    lookups = [entry for entry in data["top"] if entry["sql"] == "SELECT user_id FROM users WHERE email = ?"]
+    assert lookups and lookups[0]["plan"] and lookups[0]["full_scans"] == []
+    assert any(entry["sql"] == lookups[0]["sql"] for entry in data["slow"])
+
+    assert client.get('/stats/sql?order=fastest').status_code == 400
+    for limit in ("many", "0", "-1", "101", "1e9"):
+        response = client.get('/stats/sql', query_string={"limit": limit})
+        assert response.status_code == 400 and "limit" in response.get_json()["error"]
+    assert len(client.get('/stats/sql?limit=1').get_json()["top"]) == 1
@@ -0,0 +1,82 @@
+"""
+This module contains tests for the full-text pet search endpoint.
+"""
+
+import json
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from main import app
+from dbfuncs import admin_headers
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
+        yield client
+
+
+def test_search_matches_all_terms(client):
+    response = client.get('/pets/search', query_string={"q": "quiet cat"})
+    assert response.status_code == 200
+    pets = response.get_json()["pets"]
+    assert [pet["name"] for pet in pets] == ["Luna"]
+    assert "<mark>Quiet</mark>" in pets[0]["snippet"]
+
+
+def test_snippet_escapes_pet_text(client):
+    client.post('/pets', json={
+        "name": "Buddy", "age": "3", "description": "Quiet <script>alert(1)</script> & gentle",
+        "breed": "Maine Coon", "picture_url": "/buddy.jpg",
+        "status": "available", "type": "cat", "location": "Hartford, CT"
+    })
+    snippet = client.get('/pets/search', query_string={"q": "alert"}).get_json()["pets"][0]["snippet"]
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;<mark>alert</mark>(1)&lt;/script&gt; &amp; gentle" in snippet
+
+
+def test_search_prefix_and_location(client):
+    response = client.get('/pets/search', query_string={"q": "golden lab Hartf"})
+    assert [pet["name"] for pet in response.get_json()["pets"]] == ["Jay"]
+
+
+def test_search_follows_pet_changes(client):
+    client.post('/pets', data=json.dumps({
+        "name": "Buddy", "age": "3", "description": "Quiet and gentle",
+        "breed": "Maine Coon", "picture_url": "/buddy.jpg",
+        "status": "available", "type": "cat", "location": "Hartford, CT"
+    }), content_type='application/json')
+    names = [pet["name"] for pet in client.get('/pets/search', query_string={"q": "quiet"}).get_json()["pets"]]
+    assert sorted(names) == ["Buddy", "Luna"]
+
+    client.delete('/pets', data=json.dumps({"name": "Luna", "location": "Norwich, CT"}),
+                  content_type='application/json')
+    names = [pet["name"] for pet in client.get('/pets/search', query_string={"q": "quiet"}).get_json()["pets"]]
+    assert names == ["Buddy"]
+
+
+def test_search_pagination(client):
+    seen = []
+    query = {"q": "ct", "limit": 4}
+    while True:
+        body = client.get('/pets/search', query_string=query).get_json()
+        seen.extend(pet["name"] for pet in body["pets"])
+        if not body["next_cursor"]:
+            break
+        query["cursor"] = body["next_cursor"]
+    assert sorted(seen) == ["Bella", "Jay", "Luna", "Max", "Mittens", "Rocky"]
+
+
+def test_search_ignores_fts_syntax(client):
+    assert client.get('/pets/search', query_string={"q": "\"*"}).status_code == 400
+    assert client.get('/pets/search', query_string={"q": "lab OR NEAR(cat"}).status_code == 200
@@ -0,0 +1,108 @@
+"""
+This module contains tests for encoding query results as JSON.
+"""
+
+import json
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import create_connection, DATABASE
+from catalogue import parse_catalogue_args, fetch_catalogue_page
+from images import attach_variants
+from main import app
+from dbfuncs import admin_headers
+import serialization
+from serialization import RowEncoder, stream_array
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        yield client
+
+
+def jsonify_bytes(value):
+    with app.app_context():
+        return app.json.response(value).get_data()
+
+
+def test_row_encoder_matches_jsonify():
+    columns = ("name", "age", "note", "score", "picture_url")
+    rows = [
+        ("Jay", 3, 'says "hi"\n', 1.5, None),
+        ("Zoë 🐈", -1, "<tab>\t", float("nan"), "/a%b.jpg"),
+    ]
+    encoder = RowEncoder(columns)
+    expected = jsonify_bytes([dict(zip(columns, row)) for row in rows])
+    assert (encoder.encode_rows(rows) + "\n").encode() == expected
+
+    extra = {"picture_variants": [{"url": "/v.webp", "width": 320}]}
+    assert (encoder.encode(rows[0], extra) + "\n").encode() == jsonify_bytes({**dict(zip(columns, rows[0])), **extra})
+
+
+def test_row_encoder_ignores_trailing_values_and_can_keep_column_order():
+    encoder = RowEncoder(("name", "age"), sort_keys=False)
+    assert encoder.encode(("Jay", 3, "sort key")) == '{"name":"Jay","age":3}'
+
+
+def test_stream_array_yields_one_valid_array():
+    encoder = RowEncoder(("id",))
+    chunks = list(stream_array(encoder, [[(1,), (2,)], [], [(3,)]]))
+    assert len(chunks) == 3
+    assert json.loads("".join(chunks)) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert "".join(stream_array(encoder, [])) == "[]"
+
+
+def test_encoders_are_pluggable():
+    with pytest.raises(ValueError):
+        serialization.get_encoder("nope")
+    serialization.register_encoder("upper", lambda obj: json.dumps(obj).upper().encode())
+    try:
+        serialization.use_encoder("upper")
+        assert serialization.dumps(["a"]) == b'["A"]'
+    finally:
+        serialization.use_encoder("json")
+        del serialization.ENCODERS["upper"]
+    assert serialization.get_encoder("auto") is serialization.ENCODERS.get("orjson", serialization.ENCODERS["json"])
+
+
+def test_catalogue_body_matches_jsonify(client):
+    conn = create_connection(DATABASE)
+    conn.execute(
+        'INSERT INTO image_variants (picture_url, width, format, url) VALUES (?, ?, ?, ?)',
+        ("/jay.jpg", 320, "webp", "/images/variants/abc-320w.webp")
+    )
+    conn.commit()
+    params = parse_catalogue_args({"limit": "2"})
+    pets, next_cursor = fetch_catalogue_page(conn.cursor(), params)
+    attach_variants(conn.cursor(), pets)
+    conn.close()
+
+    response = client.get('/pets', query_string={"limit": "2"})
+    assert response.get_data() == jsonify_bytes({"pets": pets, "next_cursor": next_cursor})
+
+
+def test_favorites_body(client):
+    client.post('/register', json={"username": "fan", "password": "secret", "email": "fan@example.com"})
+    client.post('/favorites', json={"email": "fan@example.com", "pet_name": "Jay"})
+    body = client.get('/favorites', query_string={"email": "fan@example.com"}).get_json()
+    assert [pet["name"] for pet in body["favorites"]] == ["Jay"]
+    assert "next_cursor" not in body
+    body = client.get('/favorites', query_string={"email": "fan@example.com", "limit": "1"}).get_json()
+    assert body["next_cursor"] is None
+
+
+def test_export_json_array(client):
+    response = client.get('/export/pets', query_string={"format": "json", "columns": "name,type", "where": "type=cat"},
+                          headers=admin_headers(client))
+    assert response.mimetype == "application/json"
+    assert response.get_json() == [{"name": "Luna", "type": "cat"}, {"name": "Mittens", "type": "cat"}]
@@ -0,0 +1,82 @@
+"""
+This module contains tests for the streaming table export endpoint.
+"""
+
+import json
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from connection_pool import pool
+from main import app
+from dbfuncs import admin_headers
+
+
+@pytest.fixture
+def client():
+    """Set up the Flask test client for each test."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
+        yield client
+
+
+def test_export_pets_ndjson(client):
+    response = client.get('/export/pets', query_string={"columns": "name,type", "where": "type=cat"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == [{"name": "Luna", "type": "cat"}, {"name": "Mittens", "type": "cat"}]
+
+
+def test_export_pets_csv(client):
+    response = client.get('/export/pets', query_string={
+        "format": "csv", "columns": "name,age", "where": ["type=dog", "age>=3"]
+    })
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines == ["name,age", "Bella,3", "Rocky,5"]
+
+
+def test_export_releases_connection(client):
+    response = client.get('/export/pets')
+    response.get_data()
+    response.close()
+    assert pool.stats()["in_use"] == 0
+
+
+def test_export_releases_connection_once(client, monkeypatch):
+    released = []
+    release = pool.release
+    monkeypatch.setattr(pool, "release", lambda conn: released.append(conn) or release(conn))
+    response = client.get('/export/pets')
+    response.get_data()
+    response.close()
+    assert len(released) == 1
+
+
+def test_export_requires_admin(client):
+    assert client.get('/export/users', environ_base={"HTTP_AUTHORIZATION": ""}).status_code == 401
+    client.post('/register', json={"username": "testuser", "password": "secret", "email": "t@example.com"})
+    token = client.post('/login', json={"username": "testuser", "password": "secret"}).get_json()["token"]
+    response = client.get('/export/users', environ_base={"HTTP_AUTHORIZATION": f"Bearer {token}"})
+    assert response.status_code == 403
+
+
+def test_export_never_includes_passwords(client):
+    client.post('/register', json={"username": "testuser", "password": "secret", "email": "t@example.com"})
+    response = client.get('/export/users')
+    assert "secret" not in response.get_data(as_text=True)
+    assert client.get('/export/users', query_string={"columns": "password"}).status_code == 400
+
+
+def test_export_rejects_invalid_requests(client):
+    assert client.get('/export/admins').status_code == 400
+    assert client.get('/export/pets', query_string={"where": "1=1; DROP TABLE pets"}).status_code == 400
+    assert client.get('/export/pets', query_string={"format": "xml"}).status_code == 400
@@ -0,0 +1,78 @@
+"""
+This module contains tests for image uploads and serving.
+"""
+
+import io
+import sys
+import os
+import pytest
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from main import app
+from dbfuncs import admin_headers
+import uploads
+
+JPEG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Set up the Flask test client with a temporary upload folder."""
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = admin_headers(client)["Authorization"]  # Admin routes
+        yield client
+
+
+def test_upload_is_stored_once_under_its_hash(client, tmp_path):
+    response = client.post('/images', data=JPEG, content_type='image/jpeg')
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["url"].startswith("/images/") and body["url"].endswith(".jpg")
+    assert body["size"] == len(JPEG) and not body["deduplicated"]
+
+    response = client.post('/images', data={"file": (io.BytesIO(JPEG), "dog.jpg")},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()["url"] == body["url"]
+    assert response.get_json()["deduplicated"]
+    assert sorted(os.listdir(tmp_path)) == [".tmp", body["url"].rsplit("/", 1)[1]]
+    assert os.stat(tmp_path / body["url"].rsplit("/", 1)[1]).st_mode & 0o777 == uploads.FILE_MODE
+    assert os.listdir(tmp_path / ".tmp") == []
+
+
+def test_served_images_are_immutable_and_support_ranges(client):
+    url = client.post('/images', data=JPEG, content_type='image/jpeg').get_json()["url"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == JPEG
+    assert response.mimetype == "image/jpeg"
+    assert "immutable" in response.headers["Cache-Control"]
+
+    response = client.get(url, headers={"Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert response.data == JPEG[:4]
+    assert response.headers["Content-Range"] == f"bytes 0-3/{len(JPEG)}"
+
+    response = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_rejected_uploads_leave_nothing_behind(client, tmp_path, monkeypatch):
+    response = client.post('/images', data=b"not an image", content_type='image/jpeg')
+    assert response.status_code == 415
+    assert client.post('/images', data=b"", content_type='image/jpeg').status_code == 400
+
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 100)
+    assert client.post('/images', data=JPEG, content_type='image/jpeg').status_code == 413
+    with pytest.raises(uploads.UploadError):
+        uploads.store_stream(io.BytesIO(JPEG))  # No Content-Length to check up front
+    assert os.listdir(tmp_path / ".tmp") == []
+    assert client.get('/images/missing.jpg').status_code == 404
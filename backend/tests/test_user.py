@@ -96,7 +96,9 @@ def test_login_user():
 
     print(f'\nStatus code of login_user\'s post request {response.status_code}\n')
     assert response.status_code == 200
-    assert json.loads(response.data.decode()) == {"message": "Login successful"}
+    response_json = json.loads(response.data.decode())
+    assert response_json["message"] == "Login successful"
+    assert response_json["token"] and response_json["role"] == "user"
 
 def test_unsuccessful_login_username_not_found():
     """
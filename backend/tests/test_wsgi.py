@@ -0,0 +1,40 @@
+"""
+This module contains tests for the production entry point's per-worker warm-up.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path so we can import from the /backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from database import initialize_database
+from catalogue_cache import catalogue_cache
+from connection_pool import pool
+import metrics
+import wsgi
+
+
+@pytest.fixture
+def fresh_database():
+    """
+    Start from a fresh database with an empty catalogue cache.
+    """
+    if os.path.exists("database.db"):
+        os.remove("database.db")
+    initialize_database()
+    catalogue_cache.clear()
+
+
+def test_warm_up_opens_connections_and_fills_caches(fresh_database):
+    wsgi.warm_up(3)
+
+    stats = pool.stats()
+    assert stats["idle"] >= 3 and stats["in_use"] == 0
+    assert catalogue_cache.stats()["entries"] == len(wsgi.WARM_UP_PATHS)
+    # Warm-up requests are not reported as traffic
+    assert 'route="/pets"' not in metrics.render()
+
+    wsgi.shutdown()
+    assert pool.stats()["idle"] == 0
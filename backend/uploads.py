@@ -0,0 +1,175 @@
+"""
+Module: uploads
+This module stores uploaded pet pictures and serves stored images.
+
+`POST /images` copies the upload to a temporary file in fixed-size chunks,
+hashing it on the way. A raw request body is streamed straight from the socket,
+so it never sits in memory whole; the `file` field of a multipart form is first
+parsed by Werkzeug, which keeps files up to 500 KB in memory and spools larger
+ones to its own temporary file, so multipart uploads are written twice. The file
+is then made world-readable (FILE_MODE) and renamed to its SHA-256 content hash,
+which deduplicates identical uploads: the second copy is simply discarded. The
+returned `/images/<hash>.<ext>` URL can be used as a pet's `picture_url`.
+
+Stored files never change, so they are served with one-year immutable caching,
+ETags and Range support by `send_from_directory`. The file body is handed to the
+WSGI server's `wsgi.file_wrapper`, which production servers send with sendfile();
+behind a proxy, set USE_X_SENDFILE=1 to let the proxy send the file instead.
+"""
+
+import hashlib
+import os
+import tempfile
+from flask import request, jsonify, send_from_directory
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(BACKEND_DIR, "media", "uploads"))
+UPLOAD_URL_PREFIX = "/images/"
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 31536000  # One year
+FILE_MODE = 0o644  # mkstemp creates files readable by their owner only; proxies sending them need more
+
+# Leading bytes identifying each accepted image type, with the extension it is stored under
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+
+class UploadError(Exception):
+    """Raised for an upload that cannot be stored, with the HTTP status to answer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def sniff_extension(head):
+    """Returns the file extension for an image's first bytes, or None if it is not a supported image."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def store_stream(stream, upload_dir=None, max_bytes=None):
+    """
+    Copies a stream to disk chunk by chunk and files it under its content hash.
+
+    :return: A tuple of (filename, sha256 hex digest, size, deduplicated).
+    :raises UploadError: If the stream is empty, too large or not a supported image.
+    """
+    upload_dir = upload_dir or UPLOAD_DIR
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    temporary_dir = os.path.join(upload_dir, ".tmp")
+    os.makedirs(temporary_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    handle, temporary = tempfile.mkstemp(dir=temporary_dir)
+    try:
+        with os.fdopen(handle, "wb") as output:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Images may be at most {max_bytes} bytes", 413)
+                if len(head) < 12:
+                    head += chunk[:12 - len(head)]
+                digest.update(chunk)
+                output.write(chunk)
+
+        if size == 0:
+            raise UploadError("An image is required")
+        extension = sniff_extension(head)
+        if extension is None:
+            raise UploadError("Only JPEG, PNG, GIF and WebP images are accepted", 415)
+
+        filename = f"{digest.hexdigest()[:32]}.{extension}"
+        path = os.path.join(upload_dir, filename)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.unlink(temporary)
+        else:
+            os.chmod(temporary, FILE_MODE)
+            os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return filename, digest.hexdigest(), size, deduplicated
+
+
+def upload_image():
+    """
+    Uploads a pet picture.
+
+    Send the image as the raw request body, which is streamed to disk, or as the
+    `file` field of a multipart form. Identical images are stored once.
+
+    ---
+    tags:
+      - Images
+    responses:
+      201:
+        description: Image stored; `url` can be used as a pet's picture_url.
+      200:
+        description: The same image was already stored; its existing `url` is returned.
+      400:
+        description: No image was sent.
+      413:
+        description: The image is too large.
+      415:
+        description: The file is not a JPEG, PNG, GIF or WebP image.
+    """
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES:
+        return jsonify({"message": f"Images may be at most {MAX_UPLOAD_BYTES} bytes"}), 413
+
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"message": "A file field is required"}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
+
+    try:
+        filename, sha256, size, deduplicated = store_stream(stream)
+    except UploadError as e:
+        return jsonify({"message": e.message}), e.status
+
+    return jsonify({
+        "url": UPLOAD_URL_PREFIX + filename,
+        "sha256": sha256,
+        "size": size,
+        "deduplicated": deduplicated,
+    }), 200 if deduplicated else 201
+
+
+def send_immutable(directory, filename):
+    """
+    Serves a file whose name changes whenever its content does.
+
+    Handles conditional and Range requests, and lets clients and proxies keep the
+    response for a year without revalidating.
+    """
+    response = send_from_directory(directory, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
+def serve_image(filename):
+    """
+    Serves an uploaded image.
+    """
+    return send_immutable(UPLOAD_DIR, filename)
@@ -1,9 +1,35 @@
 """
-This module provides user registration and login functionality using SQLite and mock checks.
+This module provides user registration and login functionality using SQLite.
+
+Registration queues the user's background check as a job (see background_checks.py)
+and returns at once with the check 'pending'. A successful login returns a signed session token (see auth.py).
+
+Passwords are stored as scrypt hashes computed in the bounded worker pool from
+`passwords`; when the pool is saturated, register and login answer 503.
 """
 
 from flask import jsonify
 from utils import get_json_data, connect_to_database
+from passwords import hasher, HasherBusy
+from identity_cache import identity_cache
+from auth import issue_token, role_for_user, TOKEN_MAX_AGE
+from background_checks import enqueue_background_check
+
+RETRY_AFTER_SECONDS = "1"
+
+
+def hasher_busy_response():
+    """Returns the response sent when the password hashing queue is full."""
+    response = jsonify({"message": "Server busy, please retry"})
+    response.headers["Retry-After"] = RETRY_AFTER_SECONDS
+    return response, 503
+
+
+def password_error(data):
+    """Returns an error message if the submitted password is not a string, else None."""
+    if not isinstance(data["password"], str):
+        return "Password must be a string"
+    return None
 
 
 def register_user():
@@ -43,8 +69,11 @@ def register_user():
                 message:
                   type: string
                   example: "User 'johndoe' registered successfully"
+                background_check_status:
+                  type: string
+                  example: "pending"
       400:
-        description: Username or email already exists or missing fields.
+        description: Username or email already exists, missing fields, or a password that is not a string.
         content:
           application/json:
             schema:
@@ -53,43 +82,41 @@ def register_user():
                 message:
                   type: string
                   example: "Username or email already exists"
-      401:
-        description: Background check failed.
-        content:
-          application/json:
-            schema:
-              type: object
-              properties:
-                message:
-                  type: string
-                  example: "Background check failed"
+      503:
+        description: Too many password hashing requests in progress; retry later.
     """
     data, error = get_json_data(required_fields=["username", "password", "email"])
+    error = error or password_error(data)
     if error:
         return jsonify({"message": error}), 400
 
     conn, cursor = connect_to_database()
+    # Usernames listed in `admins` are reserved, so nobody can sign up as an admin
     cursor.execute(
-    'SELECT user_id FROM users WHERE username = ? OR email = ?',
-    (data["username"], data["email"])
+    'SELECT user_id FROM users WHERE username = ? OR email = ? '
+    'UNION ALL SELECT admin_id FROM admins WHERE username = ?',
+    (data["username"], data["email"], data["username"])
     )
     if cursor.fetchone():
-        conn.close()
         return jsonify({"message": "Username or email already exists"}), 400
 
-    # Mock background check
-    background_check_passed = True
-    if background_check_passed:
-        cursor.execute(
-            '''INSERT INTO users (username, password, email) VALUES (?, ?, ?)''',
-            (data["username"], data["password"], data["email"]),
-        )
-        conn.commit()
-        conn.close()
-        return jsonify({"message": f"User '{data['username']}' registered successfully"}), 200
-
-    conn.close()
-    return jsonify({"message": "Background check failed"}), 401
+    try:
+        password_hash = hasher.hash_password(data["password"])
+    except HasherBusy:
+        return hasher_busy_response()
+    cursor.execute(
+        '''INSERT INTO users (username, password, email) VALUES (?, ?, ?)''',
+        (data["username"], password_hash, data["email"]),
+    )
+    user_id = cursor.lastrowid
+    # Committed together with the user, so no registration is left without its check
+    enqueue_background_check(conn, user_id)
+    conn.commit()
+    identity_cache.put(data["email"], user_id)
+    return jsonify({
+        "message": f"User '{data['username']}' registered successfully",
+        "background_check_status": "pending",
+    }), 200
 
 
 def login_user():
@@ -125,8 +152,17 @@ def login_user():
                 message:
                   type: string
                   example: "Login successful"
+                token:
+                  type: string
+                  description: Signed session token, sent back as "Authorization: Bearer <token>".
+                role:
+                  type: string
+                  example: "user"
+                expires_in:
+                  type: integer
+                  description: Seconds until the token expires.
       400:
-        description: Missing required fields.
+        description: Missing required fields or a password that is not a string.
         content:
           application/json:
             schema:
@@ -145,16 +181,41 @@ def login_user():
                 message:
                   type: string
                   example: "Invalid credentials"
+      503:
+        description: Too many password hashing requests in progress; retry later.
     """
     data, error = get_json_data(required_fields=["username", "password"])
+    error = error or password_error(data)
     if error:
         return jsonify({"message": error}), 400
 
     conn, cursor = connect_to_database()
-    cursor.execute('SELECT password FROM users WHERE username = ?', (data["username"],))
+    cursor.execute(
+        'SELECT user_id, password, email FROM users WHERE username = ?', (data["username"],)
+    )
     user = cursor.fetchone()
-    conn.close()
+    if not user:
+        return jsonify({"message": "Invalid credentials"}), 401
+
+    try:
+        matches, needs_rehash = hasher.verify_password(data["password"], user["password"])
+        if matches and needs_rehash:
+            # Upgrade plaintext or old-cost hashes while the password is at hand
+            cursor.execute(
+                'UPDATE users SET password = ? WHERE user_id = ?',
+                (hasher.hash_password(data["password"]), user["user_id"])
+            )
+            conn.commit()
+    except HasherBusy:
+        return hasher_busy_response()
 
-    if user and data["password"] == user[0]:
-        return jsonify({"message": "Login successful"}), 200
+    if matches:
+        identity_cache.put(user["email"], user["user_id"])
+        role = role_for_user(cursor, data["username"])
+        return jsonify({
+            "message": "Login successful",
+            "token": issue_token(user["user_id"], role),
+            "role": role,
+            "expires_in": TOKEN_MAX_AGE,
+        }), 200
     return jsonify({"message": "Invalid credentials"}), 401
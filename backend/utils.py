@@ -2,8 +2,8 @@
 Utility functions for common operations in the application.
 """
 
-import sqlite3
 from flask import request  # Removed unused jsonify import
+from connection_pool import get_db
 
 
 def get_json_data(required_fields=None):
@@ -26,13 +26,15 @@ def get_json_data(required_fields=None):
     return data, None
 
 
-def connect_to_database(db_name='database.db'):
+def connect_to_database():
     """
-    Establishes a connection to the SQLite database.
+    Returns the pooled SQLite connection for the current request.
+
+    The connection is returned to the pool when the app context tears down,
+    so callers must not close it.
 
-    :param db_name: Name of the SQLite database file.
     :return: A tuple of (connection, cursor).
     """
-    conn = sqlite3.connect(db_name)
+    conn = get_db()
     cursor = conn.cursor()
     return conn, cursor
@@ -0,0 +1,47 @@
+"""
+Module: wsgi
+This module is the production entry point for the backend.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py imports the app once in the master process (migrating the schema
+there), then forks WEB_WORKERS processes that serve WEB_THREADS threads each. Every
+worker runs `warm_up` before it accepts traffic and `shutdown` when it exits.
+"""
+
+from main import app
+from connection_pool import pool
+from passwords import hasher
+import metrics
+
+WARM_UP_PATHS = ("/pets?limit=20", "/pets")
+
+
+def warm_up(connections=None):
+    """
+    Prepares a freshly forked worker to serve its first requests at full speed.
+
+    Connections inherited from the master are dropped, then `connections` pooled
+    connections are opened and warmed, and the first catalogue pages
+    are rendered into the catalogue cache.
+
+    :param connections: How many connections to open; defaults to the pool size.
+    """
+    pool.close_all()  # SQLite connections must not cross a fork
+    # The pool warms every connection it opens
+    opened = [pool.acquire() for _ in range(min(connections or pool.max_size, pool.max_size))]
+    for conn in opened:
+        pool.release(conn)
+
+    client = app.test_client()
+    for path in WARM_UP_PATHS:
+        client.get(path).close()
+    metrics.registry.clear()  # Warm-up requests are not traffic
+
+
+def shutdown():
+    """Releases a worker's resources once it has finished its last request."""
+    hasher.shutdown()
+    pool.close_all()
+    if metrics.METRICS_DIR:
+        metrics.flush(force=True)
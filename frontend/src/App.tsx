@@ -5,6 +5,7 @@ import Catalogue from './components/Catalogue';
 import EditPet from './components/EditPet';
 import AddPet from './components/AddPet'; // Import the AddPet component
 import './App.css';
+import { clearSession } from './session';
 
 // Define types for favorites
 interface Favorite {
@@ -37,6 +38,7 @@ const App: React.FC = () => {
 
   // Handles user logout
   const handleLogout = () => {
+    clearSession();
     setUserEmail('');
     setIsAuthenticated(false);
     setCurrentScreen('home');
@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import './AddPet.css';
+import { authHeaders } from '../session';
 
 interface AddPetProps {
   onBack: () => void;
@@ -34,7 +35,7 @@ const AddPet: React.FC<AddPetProps> = ({ onBack }) => {
     try {
       const response = await fetch(`${backendUrl}/pets`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders(),
         body: JSON.stringify({ ...formData, admin_id: 1 }),
       });
 
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import './Catalogue.css';
+import { isAdmin as hasAdminRole } from '../session';
 
 interface Pet {
   name: string; // Use name for identification
@@ -30,8 +31,8 @@ export default function Catalogue({ userEmail, onEdit, onNavigate }: CataloguePr
 
   const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://127.0.0.1:5000';
 
-  // Check if the user is an admin based on their email domain
-  const isAdmin = userEmail.endsWith('@admin.com');
+  // Admin controls follow the role returned at login
+  const isAdmin = hasAdminRole();
 
   useEffect(() => {
     setLoading(true);
@@ -185,7 +186,7 @@ export default function Catalogue({ userEmail, onEdit, onNavigate }: CataloguePr
           {error && <p>{error}</p>}
           {!loading && !error && renderPetCards()}
         </div>
-        {userEmail.endsWith('@admin.com') && (
+        {isAdmin && (
           <button
             className="add-button"
             onClick={() => onNavigate('add')}
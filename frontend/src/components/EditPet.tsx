@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import './EditPet.css';
+import { authHeaders } from '../session';
 
 // Define types for pet
 interface Pet {
@@ -67,7 +68,7 @@ export default function EditPet({ petName, onBack }: EditPetProps) {
 
     fetch(`${backendUrl}/pets`, {
       method: 'PUT',
-      headers: { 'Content-Type': 'application/json' },
+      headers: authHeaders(),
       body: JSON.stringify(updatedFormData),
     })
       .then((response) => {
@@ -99,7 +100,7 @@ export default function EditPet({ petName, onBack }: EditPetProps) {
 
     fetch(`${backendUrl}/pets`, {
       method: 'DELETE',
-      headers: { 'Content-Type': 'application/json' },
+      headers: authHeaders(),
       body: JSON.stringify({ name: petName, location: formData.location }),
     })
       .then((response) => {
@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import './Login.css';
+import { saveSession } from '../session';
 
 const Login: React.FC<{ onLogin: (email: string) => void }> = ({ onLogin }) => {
   const [isRegistering, setIsRegistering] = useState<boolean>(false);
@@ -24,6 +25,7 @@ const Login: React.FC<{ onLogin: (email: string) => void }> = ({ onLogin }) => {
 
       const data = await response.json();
       if (response.ok) {
+        saveSession(data.token, data.role); // Sent with admin requests
         onLogin(email); // Notify parent component of successful login
         setError('');
       } else {
@@ -0,0 +1,26 @@
+// Keeps the session token returned by /login for the rest of the tab's lifetime
+const TOKEN_KEY = 'token';
+const ROLE_KEY = 'role';
+
+export function saveSession(token: string, role: string) {
+  sessionStorage.setItem(TOKEN_KEY, token);
+  sessionStorage.setItem(ROLE_KEY, role);
+}
+
+export function clearSession() {
+  sessionStorage.removeItem(TOKEN_KEY);
+  sessionStorage.removeItem(ROLE_KEY);
+}
+
+// The role is only used to show or hide admin controls; the backend checks the token
+export function isAdmin(): boolean {
+  return sessionStorage.getItem(ROLE_KEY) === 'admin';
+}
+
+// Headers for JSON requests, with the bearer token when logged in
+export function authHeaders(): Record<string, string> {
+  const token = sessionStorage.getItem(TOKEN_KEY);
+  return token
+    ? { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` }
+    : { 'Content-Type': 'application/json' };
+}